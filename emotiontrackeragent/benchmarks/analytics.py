@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""Mood history analytics: cold load, incremental append and query latency.
+
+Fills a throwaway journal store with --days of synthetic history for one
+user (1-3 entries a day), then times loading the aggregates from the store,
+folding new entries in with `record`, and the frequency/timeline/streak
+queries, against a baseline that rescans and decodes every stored entry.
+
+    python benchmarks/analytics.py [--days 365] [--repeat 50]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+MOODS = ("happy", "sad", "anxious", "angry", "overwhelmed", "neutral")
+USER_ID = "bench-user"
+
+
+def _median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    from emotiontrackeragent.analytics import MoodAnalytics
+    from emotiontrackeragent.journal_store import JournalStore
+
+    store = JournalStore(os.path.join(tempfile.mkdtemp(), "journal.db"))
+    rng = random.Random(args.seed)
+    first_day = date.today() - timedelta(days=args.days)
+    for offset in range(args.days):
+        day = (first_day + timedelta(days=offset)).isoformat()
+        for _ in range(rng.randint(1, 3)):
+            store.append({"date": day, "mood": rng.choice(MOODS), "confidence": round(rng.random(), 2),
+                          "reflections": []}, user_id=USER_ID)
+
+    analytics = MoodAnalytics(store)
+    start = time.perf_counter()
+    history = analytics.history(USER_ID)
+    load_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    today = date.today().isoformat()
+    queries = {
+        "frequency_day": lambda: analytics.frequency(USER_ID, "day"),
+        "frequency_week": lambda: analytics.frequency(USER_ID, "week"),
+        "timeline": lambda: analytics.timeline(USER_ID),
+        "streaks": lambda: analytics.streaks(USER_ID, today=today),
+        "summary": lambda: analytics.summary(USER_ID),
+    }
+    query_ms = {name: _median_ms(fn, args.repeat) for name, fn in queries.items()}
+
+    def rescan():
+        # What the history view would cost without aggregates: read and decode every entry per query
+        per_day = {}
+        for row in store.list_entries(user_id=USER_ID):
+            per_day.setdefault(row["date"], Counter())[row["entry"]["mood"]] += 1
+        return per_day
+
+    rescan_ms = _median_ms(rescan, max(1, args.repeat // 10))
+
+    start = time.perf_counter()
+    appends = 1000
+    for i in range(appends):
+        analytics.record({"date": today, "mood": rng.choice(MOODS), "confidence": 0.8},
+                         entry_id=f"bench-{i}", user_id=USER_ID)
+    record_us = round((time.perf_counter() - start) / appends * 1e6, 2)
+
+    report = {
+        "benchmark": "analytics",
+        "timestamp": time.time(),
+        "days": args.days,
+        "entries": history.entries - appends,
+        "cold_load_ms": load_ms,
+        "record_us": record_us,
+        "query_ms": query_ms,
+        "rescan_baseline_ms": rescan_ms,
+    }
+    print(json.dumps(report, indent=2))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "analytics.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""Local load test for the HTTP API.
+
+Starts nothing itself: run the server with the stub LLM first, e.g.
+
+    cd src/emotiontrackeragent
+    MOOD_LLM=stub STUB_LLM_LATENCY_MS=300 RESULT_CACHE=0 MOOD_MAX_PENDING_JOBS=64 \
+        MOOD_USER_JOBS_PER_MINUTE=0 uvicorn emotiontrackeragent.api:app --port 8000
+
+then fire N concurrent clients at it:
+
+    python benchmarks/api_load.py --url http://127.0.0.1:8000 --concurrency 16 --requests 200 [--audio meme.wav]
+
+Each client submits entries with ?wait=60 as its own user and records
+end-to-end latency; 503 (backpressure) and 429 (per-user limit) responses
+are counted and retried after Retry-After.
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+CORPUS_PATH = os.path.join(ROOT, "benchmarks", "corpus.jsonl")
+
+
+def _post_text(url, text, user_id):
+    body = json.dumps({"text": text, "user_id": user_id}).encode()
+    return urllib.request.Request(f"{url}/entries/text?wait=60", data=body,
+                                  headers={"Content-Type": "application/json"}, method="POST")
+
+
+def _post_audio(url, audio_bytes, filename, user_id):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"user_id\"\r\n\r\n{user_id}\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: audio/wav\r\n\r\n"
+    ).encode() + audio_bytes + f"\r\n--{boundary}--\r\n".encode()
+    return urllib.request.Request(f"{url}/entries/audio?wait=60", data=body,
+                                  headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                                  method="POST")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--audio", help="upload this file instead of posting corpus texts")
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH) as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+    audio = open(args.audio, "rb").read() if args.audio else None
+
+    latencies, errors = [], []
+    rejected = {503: 0, 429: 0}
+    counter = iter(range(args.requests))
+    lock = threading.Lock()
+
+    def client():
+        user_id = f"load-test-{uuid.uuid4().hex[:8]}"
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            while True:
+                request = (_post_audio(args.url, audio, os.path.basename(args.audio), user_id) if audio
+                           else _post_text(args.url, f"{texts[i % len(texts)]} (#{i})", user_id))
+                try:
+                    with urllib.request.urlopen(request, timeout=120) as response:
+                        response.read()
+                        ok = response.status == 200
+                    break
+                except urllib.error.HTTPError as e:
+                    if e.code in rejected:
+                        with lock:
+                            rejected[e.code] += 1
+                        time.sleep(float(e.headers.get("Retry-After", "1")))
+                        continue
+                    ok = False
+                    break
+                except OSError:
+                    ok = False
+                    break
+            with lock:
+                (latencies if ok else errors).append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    report = {
+        "benchmark": "api_load",
+        "timestamp": time.time(),
+        "kind": "audio" if audio else "text",
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "rejected_503": rejected[503],
+        "rejected_429": rejected[429],
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_s": {
+            "p50": round(statistics.median(latencies), 3) if latencies else None,
+            "p95": round(latencies[int(len(latencies) * 0.95) - 1], 3) if latencies else None,
+            "max": round(latencies[-1], 3) if latencies else None,
+        },
+    }
+    print(json.dumps(report, indent=2))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "api_load.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""Decode + transcribe time and peak RSS per minute of audio.
+
+Each sample WAV is tiled to --minutes of audio, then every case runs in a
+fresh process so its peak RSS is its own:
+
+    memory   upload bytes -> in-process WAV decode -> trim/cap -> model (the current path)
+    ffmpeg   temp file path -> ffmpeg decode -> model (the previous path; skipped without ffmpeg)
+
+    python benchmarks/audio_preprocess.py [--minutes 1] [--model-size tiny] [--decode-only]
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def _tiled_wav(path, minutes):
+    """WAV bytes of `path` repeated until it is `minutes` long, in the file's own format."""
+    with wave.open(path) as wav:
+        params = wav.getparams()
+        frames = wav.readframes(wav.getnframes())
+    repeats = max(1, int(minutes * 60 * params.framerate / params.nframes + 0.999))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setparams(params)
+        out.writeframes(frames * repeats)
+    return buffer.getvalue(), repeats * params.nframes / params.framerate
+
+
+def _run_case(case, audio, model_size, decode_only):
+    sys.path.insert(0, SRC_DIR)
+    from emotiontrackeragent.transcription import _decode_ffmpeg, get_pool, preprocess_audio
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    samples = preprocess_audio(audio) if case == "memory" else _decode_ffmpeg(audio)
+    decode_s = time.perf_counter() - start
+    result = {"decode_s": round(decode_s, 4), "model_seconds": round(len(samples) / 16000, 2)}
+    if not decode_only:
+        pool = get_pool()
+        pool.warm([model_size])
+        start = time.perf_counter()
+        pool.transcribe(samples, size=model_size)
+        result["transcribe_s"] = round(time.perf_counter() - start, 3)
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    result["startup_rss_mb"] = round(baseline_kb / 1024, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=1.0)
+    parser.add_argument("--model-size", default="tiny")
+    parser.add_argument("--decode-only", action="store_true", help="skip Whisper (no model download needed)")
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    samples = sorted(f for f in os.listdir(PACKAGE_DIR) if f.endswith(".wav"))
+    cases = ["memory"] + (["ffmpeg"] if shutil.which("ffmpeg") else [])
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for name in samples:
+        data, seconds = _tiled_wav(os.path.join(PACKAGE_DIR, name), args.minutes)
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+            tmp.write(data)
+        try:
+            for case in cases:
+                audio = data if case == "memory" else tmp.name
+                with context.Pool(1) as pool:
+                    result = pool.apply(_run_case, (case, audio, args.model_size, args.decode_only))
+                per_minute = 60 / seconds
+                result.update({
+                    "file": name,
+                    "case": case,
+                    "audio_seconds": round(seconds, 2),
+                    "decode_s_per_min": round(result["decode_s"] * per_minute, 4),
+                    "rss_growth_mb_per_min": round((result["peak_rss_mb"] - result["startup_rss_mb"]) * per_minute, 1),
+                })
+                if "transcribe_s" in result:
+                    result["transcribe_s_per_min"] = round(result["transcribe_s"] * per_minute, 3)
+                rows.append(result)
+                print(json.dumps(result))
+        finally:
+            os.unlink(tmp.name)
+
+    report = {
+        "benchmark": "audio_preprocess",
+        "timestamp": time.time(),
+        "minutes": args.minutes,
+        "model_size": None if args.decode_only else args.model_size,
+        "ffmpeg_available": "ffmpeg" in cases,
+        "rows": rows,
+    }
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "audio_preprocess.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""Compare two benchmark reports and flag regressions.
+
+Reads reports written by benchmarks/pipeline.py (any benchmark's JSON lines
+work) and compares every numeric metric they share. Metrics ending in
+_ms / _s / _mb / factor are lower-is-better, those ending in _per_s are
+higher-is-better; a change of more than --threshold in the wrong direction
+is a regression and makes the script exit with status 1, so it can gate CI.
+
+    python benchmarks/compare.py                         # last two runs in results/pipeline.jsonl
+    python benchmarks/compare.py --base 1a2b3c --head 4d5e6f [--threshold 0.15]
+    python benchmarks/compare.py --base old.json --head new.json
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "pipeline.jsonl")
+LOWER_IS_BETTER = ("_ms", "_s", "_mb", "factor")
+HIGHER_IS_BETTER = ("_per_s",)
+
+
+def load_history(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def pick(ref, history):
+    """A report from a JSON file, a commit prefix (latest run on it) or an index into the history."""
+    if os.path.isfile(ref):
+        with open(ref) as f:
+            return json.load(f)
+    matches = [r for r in history if (r.get("git") or {}).get("commit", "") and r["git"]["commit"].startswith(ref)]
+    if matches:
+        return matches[-1]
+    try:
+        return history[int(ref)]
+    except (ValueError, IndexError):
+        raise SystemExit(f"No report matches '{ref}'")
+
+
+def flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def direction(metric):
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(base, head, threshold):
+    base_metrics = dict(flatten(base.get("cases", base)))
+    head_metrics = dict(flatten(head.get("cases", head)))
+    rows = []
+    for metric in sorted(set(base_metrics) & set(head_metrics)):
+        sign = direction(metric)
+        old, new = base_metrics[metric], head_metrics[metric]
+        if not sign or not old:
+            continue
+        change = (new - old) / abs(old)
+        rows.append({"metric": metric, "base": old, "head": new, "change": round(change, 4),
+                     "regression": change * sign < -threshold})
+    return rows
+
+
+def _label(report):
+    return ((report.get("git") or {}).get("commit") or "?")[:10]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", default=RESULTS_PATH)
+    parser.add_argument("--base", default="-2")
+    parser.add_argument("--head", default="-1")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts as a regression")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    history = load_history(args.results) if os.path.exists(args.results) else []
+    base, head = pick(args.base, history), pick(args.head, history)
+    rows = compare(base, head, args.threshold)
+    regressions = [row for row in rows if row["regression"]]
+    if args.json:
+        print(json.dumps({"base": base.get("git"), "head": head.get("git"), "metrics": rows}, indent=2))
+    else:
+        print(f"base {_label(base)}  ->  head {_label(head)}  (threshold {args.threshold:.0%})")
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['metric']:50} {row['base']:>12} {row['head']:>12} {row['change']:>+8.1%}{flag}")
+        print(f"\n{len(regressions)} regression(s) in {len(rows)} metrics")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
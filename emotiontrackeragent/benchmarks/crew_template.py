@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""Crew template: per-request crew construction cost, and a concurrency check of `main.run`.
+
+    construction  instantiate a Crew from the compiled template (what each crew-mode request does),
+                  against re-reading the YAML config on every request, as a @CrewBase class does
+    concurrency   --concurrency simultaneous main.run calls in crew mode on distinct corpus entries;
+                  every result must match the mood the same text got when run alone, and every
+                  stored row must hold its own text, or the script exits with status 1
+
+Uses the deterministic stub LLM (MOOD_LLM=stub) and a throwaway journal store,
+with the result cache, entry memory and journal tool off. Needs crewai installed.
+
+    python benchmarks/crew_template.py [--repeat 200] [--concurrency 50]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+CORPUS_PATH = os.path.join(ROOT, "benchmarks", "corpus.jsonl")
+
+
+def _stats(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"p50_ms": round(statistics.median(timings), 3), "p95_ms": round(timings[int(0.95 * len(timings))], 3)}
+
+
+def bench_construction(main, repeat):
+    from emotiontrackeragent.crew import CrewTemplate
+    start = time.perf_counter()
+    template = CrewTemplate.from_config()
+    compile_ms = round((time.perf_counter() - start) * 1000, 3)
+    main.new_crew()  # import crewai and build the LLM clients before timing anything
+
+    def from_yaml():
+        CrewTemplate.from_config().instantiate(main.get_agent_llm, main.agent_tools, max_retry_limit=0)
+
+    return {"compile_ms": compile_ms, "template": _stats(main.new_crew, repeat),
+            "yaml_per_request": _stats(from_yaml, repeat), "template_agents": len(template.agents),
+            "template_tasks": len(template.tasks)}
+
+
+def bench_concurrency(main, concurrency):
+    from emotiontrackeragent.journal_store import get_store
+    with open(CORPUS_PATH) as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+    texts = [texts[i % len(texts)] + f" (entry {i})" for i in range(concurrency)]
+    expected = {text: main.run(text, mode="crew")["mood"] for text in texts}  # each text alone first
+
+    barrier = threading.Barrier(concurrency)
+    results = [None] * concurrency
+    errors = []
+
+    def one(i):
+        barrier.wait()
+        try:
+            results[i] = main.run(texts[i], request_id=f"concurrent-{i}", user_id=f"user-{i}", mode="crew")
+        except Exception as e:
+            errors.append(f"{i}: {e}")
+
+    threads = [threading.Thread(target=one, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stored = get_store().get_many([f"concurrent-{i}" for i in range(concurrency)])
+    mismatches = [i for i, result in enumerate(results) if result is None or result["mood"] != expected[texts[i]]]
+    crossed = [i for i in range(concurrency) if (stored.get(f"concurrent-{i}") or {}).get("text") != texts[i]]
+    return {"runs": concurrency, "wall_s": round(elapsed, 3), "errors": errors[:5], "mood_mismatches": mismatches,
+            "stored_text_mismatches": crossed, "ok": not (errors or mismatches or crossed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--stub-latency-ms", type=float, default=20)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update(MOOD_LLM="stub", STUB_LLM_LATENCY_MS=str(args.stub_latency_ms), RESULT_CACHE="0",
+                      MEMORY="0", JOURNAL_TOOL="0", JOURNAL_DB=os.path.join(workdir, "journal.db"),
+                      TRACE_LOG=os.path.join(workdir, "traces.jsonl"))
+    os.environ.pop("MOOD_PRECLASSIFY_THRESHOLD", None)  # every entry goes through the crew
+    sys.path.insert(0, SRC_DIR)
+    try:
+        import crewai  # noqa: F401
+    except ImportError:
+        raise SystemExit("crewai is not installed; this benchmark needs it")
+    from emotiontrackeragent import main as pipeline
+
+    report = {
+        "benchmark": "crew_template",
+        "timestamp": time.time(),
+        "construction": bench_construction(pipeline, args.repeat),
+        "concurrency": bench_concurrency(pipeline, args.concurrency),
+    }
+    print(json.dumps(report, indent=2))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "crew_template.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+    if not report["concurrency"]["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""Local OpenAI-compatible chat server that injects faults, for testing the LLM resilience layer.
+
+Answers POST /v1/chat/completions with the stub LLM's deterministic
+replies, after a configurable delay, and fails a configurable share of
+requests with 500s, 429s, hangs or slow (tail-latency) responses. The
+fault profile can be changed while it runs with POST /faults {...} and
+read with GET /faults.
+
+    python benchmarks/fake_llm_server.py --port 8765 --latency-ms 200 --error-rate 0.1 --slow-rate 0.05
+
+Point the app at it with:
+
+    LLM_BASE_URL=http://127.0.0.1:8765/v1 MODEL=openai/fake streamlit run src/emotiontrackeragent/mood_app.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+
+DEFAULT_FAULTS = {
+    "latency_ms": 100.0,
+    "jitter_ms": 20.0,
+    "error_rate": 0.0,  # 500 Internal Server Error
+    "rate_limit_rate": 0.0,  # 429 Too Many Requests
+    "hang_rate": 0.0,  # sleep hang_seconds, then answer
+    "hang_seconds": 30.0,
+    "slow_rate": 0.0,  # answer after latency_ms * slow_factor
+    "slow_factor": 10.0,
+}
+
+
+class FaultState:
+    def __init__(self, **faults):
+        self.faults = dict(DEFAULT_FAULTS, **faults)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def update(self, faults):
+        with self.lock:
+            self.faults.update({k: float(v) for k, v in faults.items() if k in DEFAULT_FAULTS})
+            return dict(self.faults)
+
+    def draw(self):
+        """(status code, delay seconds) for the next request."""
+        with self.lock:
+            faults = dict(self.faults)
+            self.requests += 1
+        delay = max(0.0, random.gauss(faults["latency_ms"], faults["jitter_ms"])) / 1000
+        roll = random.random()
+        for kind in ("error_rate", "rate_limit_rate", "hang_rate", "slow_rate"):
+            if roll < faults[kind]:
+                break
+            roll -= faults[kind]
+        else:
+            return 200, delay
+        if kind == "error_rate":
+            return 500, delay
+        if kind == "rate_limit_rate":
+            return 429, delay / 10
+        if kind == "hang_rate":
+            return 200, faults["hang_seconds"]
+        return 200, delay * faults["slow_factor"]
+
+
+def make_handler(state, stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/faults":
+                self._send(200, dict(state.faults, requests=state.requests))
+            else:
+                self._send(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if self.path == "/faults":
+                self._send(200, state.update(self._body()))
+                return
+            if not self.path.endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            request = self._body()
+            status, delay = state.draw()
+            time.sleep(delay)
+            if status != 200:
+                headers = {"Retry-After": "1"} if status == 429 else None
+                self._send(status, {"error": {"message": f"injected {status}", "type": "server_error"}}, headers)
+                return
+            prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+            answer = stub._answer(prompt)
+            self._send(200, {
+                "id": f"chatcmpl-{state.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(answer) // 4,
+                          "total_tokens": (len(prompt) + len(answer)) // 4},
+            })
+
+    return Handler
+
+
+def start_server(host="127.0.0.1", port=0, **faults):
+    """Start the server in a background thread; returns (server, FaultState). Port 0 picks a free one."""
+    sys.path.insert(0, SRC_DIR)
+    from emotiontrackeragent.stub_llm import StubLLM
+
+    state = FaultState(**faults)
+    server = ThreadingHTTPServer((host, port), make_handler(state, StubLLM(latency_s=0, per_token_s=0)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-llm-server", daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for name, default in DEFAULT_FAULTS.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=float, default=default)
+    args = parser.parse_args()
+    faults = {name: getattr(args, name) for name in DEFAULT_FAULTS}
+    server, _ = start_server(args.host, args.port, **faults)
+    print(f"Fake LLM listening on http://{args.host}:{server.server_address[1]}/v1 with {faults}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""Compare the three-agent crew with the single-call fast path.
+
+Runs every entry in benchmarks/corpus.jsonl through `main.analyze` in both
+modes against the deterministic stub LLM (MOOD_LLM=stub), and reports
+latency, LLM calls, token usage and how often the two modes agree on the
+mood label. Results are printed and appended to
+benchmarks/results/fast_vs_crew.jsonl.
+
+    python benchmarks/fast_vs_crew.py [--latency-ms 300] [--per-token-ms 2]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+CORPUS_PATH = os.path.join(ROOT, "benchmarks", "corpus.jsonl")
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_mode(main, mode, corpus):
+    # The crew's coach calls a streaming LLM of its own
+    llms = [main.get_fast_llm()] if mode == "fast" else list({id(llm): llm for llm in (
+        main.get_llm(), main.get_stream_llm())}.values())
+    for llm in llms:
+        llm.reset_usage()
+    latencies = []
+    outputs = {}
+    for item in corpus:
+        start = time.perf_counter()
+        outputs[item["id"]] = main.analyze(item["text"], mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+    usage = {key: sum(llm.usage[key] for llm in llms) for key in ("calls", "prompt_tokens", "completion_tokens")}
+    return {
+        "mode": mode,
+        "entries": len(corpus),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 2),
+            "p50": round(statistics.median(latencies), 2),
+            "max": round(max(latencies), 2),
+        },
+        "llm_calls_per_entry": round(usage["calls"] / len(corpus), 2),
+        "prompt_tokens_per_entry": round(usage["prompt_tokens"] / len(corpus), 1),
+        "completion_tokens_per_entry": round(usage["completion_tokens"] / len(corpus), 1),
+    }, outputs
+
+
+def agreement(crew_outputs, fast_outputs):
+    ids = sorted(set(crew_outputs) & set(fast_outputs))
+    same_mood = sum(
+        str(crew_outputs[i]["mood"]).lower() == str(fast_outputs[i]["mood"]).lower() for i in ids
+    )
+    confidence_gap = [
+        abs(float(crew_outputs[i]["confidence"]) - float(fast_outputs[i]["confidence"])) for i in ids
+    ]
+    return {
+        "entries": len(ids),
+        "mood_agreement": round(same_mood / len(ids), 3) if ids else None,
+        "mean_confidence_gap": round(statistics.mean(confidence_gap), 3) if ids else None,
+        "disagreements": [
+            {"id": i, "crew": crew_outputs[i]["mood"], "fast": fast_outputs[i]["mood"]}
+            for i in ids if str(crew_outputs[i]["mood"]).lower() != str(fast_outputs[i]["mood"]).lower()
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300, help="stub LLM latency per call")
+    parser.add_argument("--per-token-ms", type=float, default=2, help="stub LLM latency per completion token")
+    parser.add_argument("--modes", default="crew,fast")
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["MOOD_LLM"] = "stub"
+    os.environ["STUB_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["STUB_LLM_PER_TOKEN_MS"] = str(args.per_token_ms)
+    os.environ["RESULT_CACHE"] = "0"
+    os.environ.setdefault("JOURNAL_DB", os.path.join(tempfile.mkdtemp(), "journal.db"))
+    sys.path.insert(0, SRC_DIR)
+    from emotiontrackeragent import main as pipeline
+
+    corpus = load_corpus()
+    report = {"benchmark": "fast_vs_crew", "timestamp": time.time(), "stub_latency_ms": args.latency_ms,
+              "stub_per_token_ms": args.per_token_ms, "modes": {}}
+    outputs = {}
+    for mode in args.modes.split(","):
+        try:
+            report["modes"][mode], outputs[mode] = run_mode(pipeline, mode, corpus)
+        except ImportError as e:
+            # The crew mode needs crewai installed; the fast path does not
+            report["modes"][mode] = {"skipped": f"missing dependency: {e.name}"}
+    if "crew" in outputs and "fast" in outputs:
+        report["agreement"] = agreement(outputs["crew"], outputs["fast"])
+
+    print(json.dumps(report, indent=2))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "fast_vs_crew.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""Startup benchmark: how long does `import emotiontrackeragent.main` take?
+
+Runs `python -X importtime -c "import emotiontrackeragent.<module>"` in a fresh interpreter,
+reports the cumulative import time of the module and its slowest
+dependencies, and appends one JSON line per run to
+benchmarks/results/importtime.jsonl so the numbers can be tracked over time.
+
+    python benchmarks/importtime.py [--module main] [--budget-ms 200] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def measure_once(module):
+    module = f"emotiontrackeragent.{module}"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+
+    total_us = next((cum for name, _, cum in rows if name.strip() == module), None)
+    if total_us is None:
+        raise RuntimeError(f"no importtime entry found for {module}")
+    top_level = [(name.strip(), cum) for name, _, cum in rows if not name.startswith("  ")]
+    return total_us, sorted(top_level, key=lambda item: item[1], reverse=True)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "200")))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-record", action="store_true", help="don't append to the results file")
+    args = parser.parse_args()
+
+    samples = []
+    slowest = []
+    for _ in range(args.repeat):
+        total_us, top_level = measure_once(args.module)
+        samples.append(total_us / 1000)
+        slowest = top_level[:10]
+
+    median_ms = statistics.median(samples)
+    result = {
+        "benchmark": "importtime",
+        "module": args.module,
+        "timestamp": time.time(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "median_ms": round(median_ms, 2),
+        "min_ms": round(min(samples), 2),
+        "max_ms": round(max(samples), 2),
+        "budget_ms": args.budget_ms,
+        "within_budget": median_ms <= args.budget_ms,
+        "slowest_imports_ms": {name: round(us / 1000, 2) for name, us in slowest},
+    }
+    print(json.dumps(result, indent=2))
+
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "importtime.jsonl"), "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+    return 0 if result["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
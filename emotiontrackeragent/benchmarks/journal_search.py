@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""Journal-search tool: index build time, per-call latency and answer size.
+
+Fills a throwaway journal store with --days of synthetic history for one
+user (1-3 entries a day, with text), builds that user's search indexes and
+times the tool's calls (mood in a date range, confidence trend, keyword
+search) through `journal_index.answer`, the function the CrewAI tool wraps.
+Each call's answer size is reported in estimated tokens, next to a baseline
+that decodes every stored row and filters it in Python.
+
+    python benchmarks/journal_search.py [--days 1095] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+MOODS = ("happy", "sad", "anxious", "angry", "overwhelmed", "neutral")
+USER_ID = "bench-user"
+SENTENCES = (
+    "Work was stressful and the deadline for the project keeps moving.",
+    "Had dinner with my sister and we talked about mom for hours.",
+    "Couldn't sleep again, kept thinking about the presentation.",
+    "Went for a long run in the park, felt great afterwards.",
+    "My boss praised the report in front of the whole team.",
+    "Argued with my partner about money and the rent.",
+    "The dog was sick so I stayed home from the gym.",
+    "Exam results came out today and I passed everything.",
+)
+
+
+def _stats(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"p50_ms": round(statistics.median(timings), 4), "p95_ms": round(timings[int(0.95 * len(timings))], 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=1095)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    from emotiontrackeragent.journal_index import JournalIndexes, answer
+    from emotiontrackeragent.journal_store import JournalStore
+    from emotiontrackeragent.token_budget import estimate_tokens
+
+    store = JournalStore(os.path.join(tempfile.mkdtemp(), "journal.db"))
+    rng = random.Random(args.seed)
+    today = date.today()
+    first_day = today - timedelta(days=args.days)
+    for offset in range(args.days):
+        day = (first_day + timedelta(days=offset)).isoformat()
+        for _ in range(rng.randint(1, 3)):
+            store.append({"date": day, "mood": rng.choice(MOODS), "confidence": round(rng.random(), 2),
+                          "reflections": []}, user_id=USER_ID, text=" ".join(rng.sample(SENTENCES, 3)))
+
+    indexes = JournalIndexes(store)
+    start = time.perf_counter()
+    index = indexes.index(USER_ID)
+    build_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    last_quarter = (today - timedelta(days=90)).isoformat()
+    calls = {
+        "mood_in_range": {"action": "entries", "mood": "anxious", "date_from": last_quarter},
+        "trend_90_days": {"action": "trend", "days": 90},
+        "trend_all": {"action": "trend"},
+        "keyword": {"action": "search", "query": "sister dinner"},
+        "keyword_common": {"action": "search", "query": "work deadline sleep"},
+        "keyword_mood": {"action": "search", "query": "presentation", "mood": "anxious"},
+    }
+    results = {}
+    for name, call in calls.items():
+        text = answer(index, **call)
+        results[name] = {**_stats(lambda: answer(index, **call), args.repeat), "answer_tokens": estimate_tokens(text)}
+
+    def rescan():
+        # Without the indexes: decode every stored row and filter in Python, per call
+        return [row for row in store.list_entries(user_id=USER_ID, date_from=last_quarter)
+                if row["entry"]["mood"] == "anxious"]
+
+    report = {
+        "benchmark": "journal_search",
+        "timestamp": time.time(),
+        "days": args.days,
+        "entries": len(index),
+        "terms": len(index.postings),
+        "build_ms": build_ms,
+        "calls": results,
+        "rescan_baseline": _stats(rescan, max(1, args.repeat // 10)),
+    }
+    print(json.dumps(report, indent=2))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "journal_search.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
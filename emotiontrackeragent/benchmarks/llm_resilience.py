@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""Latency and success rate of LLM calls with and without the resilience layer, under injected faults.
+
+Starts two fake LLM servers in-process (benchmarks/fake_llm_server.py): a
+primary with the fault profile below and a healthy fallback. Each policy
+sends --requests fast-path calls from --concurrency threads and reports
+success rate and latency percentiles; the "outage" phase then fails every
+primary request to show the circuit breaker failing over.
+
+    python benchmarks/llm_resilience.py [--requests 200] [--error-rate 0.1] [--slow-rate 0.05]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+CORPUS_PATH = os.path.join(ROOT, "benchmarks", "corpus.jsonl")
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+
+
+class HTTPChatLLM:
+    """Bare OpenAI-compatible client, so the benchmark needs neither crewai nor litellm."""
+
+    def __init__(self, base_url, socket_timeout=60):
+        self.model = "fake"
+        self.base_url = base_url
+        self.socket_timeout = socket_timeout
+
+    def call(self, messages, **kwargs):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        body = json.dumps({"model": self.model, "messages": messages}).encode()
+        request = urllib.request.Request(self.base_url + "/chat/completions", data=body,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.socket_timeout) as response:
+                return json.loads(response.read())["choices"][0]["message"]["content"]
+        except urllib.error.HTTPError as e:
+            raise HTTPStatusError(e.code, e.read().decode(errors="replace")) from None
+
+
+def _run(llm, messages, requests, concurrency):
+    latencies, failures = [], 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            llm.call(messages[i % len(messages)])
+            ok = True
+        except Exception:
+            ok = False
+        with lock:
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    return latencies, failures, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--hang-rate", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=2.0, help="per-attempt deadline for the wrapped policies")
+    parser.add_argument("--hedge-after", type=float, default=0.3)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    sys.path.insert(0, SRC_DIR)
+    from fake_llm_server import start_server
+    from emotiontrackeragent.fast_path import build_messages
+    from emotiontrackeragent.resilient_llm import CircuitBreaker, ResilientLLM, percentiles
+
+    faults = {"latency_ms": args.latency_ms, "error_rate": args.error_rate, "rate_limit_rate": args.rate_limit_rate,
+              "slow_rate": args.slow_rate, "hang_rate": args.hang_rate, "hang_seconds": 10}
+    primary_server, primary_state = start_server(**faults)
+    fallback_server, _ = start_server(latency_ms=args.latency_ms)
+    primary_url = f"http://127.0.0.1:{primary_server.server_address[1]}/v1"
+    fallback_url = f"http://127.0.0.1:{fallback_server.server_address[1]}/v1"
+
+    with open(CORPUS_PATH) as f:
+        messages = [build_messages(json.loads(line)["text"]) for line in f if line.strip()]
+
+    def wrapped(hedge_after=None, fallback=False):
+        return ResilientLLM(HTTPChatLLM(primary_url, socket_timeout=args.timeout), timeout=args.timeout,
+                            max_retries=3, backoff_base=0.05, hedge_after=hedge_after,
+                            fallbacks=[HTTPChatLLM(fallback_url)] if fallback else [],
+                            circuit=CircuitBreaker(failure_threshold=5, reset_seconds=2))
+
+    policies = {
+        "bare": HTTPChatLLM(primary_url, socket_timeout=30),
+        "retries": wrapped(),
+        "retries+hedging": wrapped(hedge_after=args.hedge_after),
+        "retries+hedging+fallback": wrapped(hedge_after=args.hedge_after, fallback=True),
+    }
+    results = {}
+    for name, llm in policies.items():
+        latencies, failures, elapsed = _run(llm, messages, args.requests, args.concurrency)
+        results[name] = {
+            "success_rate": round(len(latencies) / args.requests, 4),
+            "latency_s": percentiles(latencies),
+            "throughput_rps": round(args.requests / elapsed, 1),
+        }
+        if hasattr(llm, "metrics"):
+            results[name]["wrapper"] = {k: v for k, v in llm.metrics().items() if k != "latency_s"}
+        print(name, json.dumps(results[name]))
+
+    # Full primary outage: the breaker should open and route straight to the fallback
+    primary_state.update({"error_rate": 1.0, "rate_limit_rate": 0, "slow_rate": 0, "hang_rate": 0})
+    llm = wrapped(hedge_after=args.hedge_after, fallback=True)
+    latencies, failures, elapsed = _run(llm, messages, args.requests, args.concurrency)
+    results["outage"] = {
+        "success_rate": round(len(latencies) / args.requests, 4),
+        "latency_s": percentiles(latencies),
+        "wrapper": {k: v for k, v in llm.metrics().items() if k != "latency_s"},
+    }
+    print("outage", json.dumps(results["outage"]))
+
+    primary_server.shutdown()
+    fallback_server.shutdown()
+    report = {"benchmark": "llm_resilience", "timestamp": time.time(), "requests": args.requests,
+              "concurrency": args.concurrency, "faults": faults, "policies": results}
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "llm_resilience.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
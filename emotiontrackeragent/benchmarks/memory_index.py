@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""Entry memory: build time, recall@k and query latency at 10k and 1M entries.
+
+For each --sizes value, fills a throwaway index and measures:
+
+    single_user  one user owning every row: exact scan vs the IVF index, with recall@k of
+                 IVF against the exact top-k for each --nprobe value
+    many_users   rows spread over users with --entries-per-user each (about three years of
+                 daily journaling): the per-user exact scan that normal users get
+
+Up to --text-limit rows are synthetic journal sentences run through the hashing
+embedder; larger sizes use clustered random unit vectors, since embedding a
+million sentences would only time the embedder. Reopen time and disk size
+are reported too.
+
+    python benchmarks/memory_index.py [--sizes 10000,1000000] [--queries 200] [--nprobe 4,8,16,32,64]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+BATCH = 50000
+
+FEELINGS = ("anxious", "calm", "tired", "grateful", "angry", "lonely", "excited", "sad", "hopeful", "stressed",
+            "overwhelmed", "relieved", "frustrated", "proud", "nervous", "content")
+TOPICS = ("work", "presentation", "deadline", "boss", "sister", "mother", "dog", "exam", "run", "gym", "sleep",
+          "dinner", "friend", "partner", "rent", "doctor", "garden", "trip", "meeting", "kids", "school", "money",
+          "weekend", "birthday", "interview", "move", "coffee", "rain", "book", "project")
+PLACES = ("at home", "in the office", "on the train", "at the park", "in class", "at the hospital", "downtown")
+
+
+def synthetic_text(rng):
+    topics = rng.sample(TOPICS, 3)
+    return (f"Today I felt {rng.choice(FEELINGS)} about the {topics[0]} {rng.choice(PLACES)}. "
+            f"The {topics[1]} made me {rng.choice(FEELINGS)}, and later the {topics[2]} left me {rng.choice(FEELINGS)}.")
+
+
+def batches(size, args, seed):
+    """Yield unit float32 vectors in blocks, from text below --text-limit and clustered noise above it."""
+    import numpy as np
+    from emotiontrackeragent.memory_index import HashingEmbedder
+    rng = random.Random(seed)
+    if size <= args.text_limit:
+        embedder = HashingEmbedder(args.dim)
+        for start in range(0, size, BATCH):
+            yield embedder.embed([synthetic_text(rng) for _ in range(min(BATCH, size - start))])
+        return
+    # Same topic centers for every seed, so queries land near the indexed rows
+    centers = np.random.default_rng(args.seed).standard_normal((args.clusters, args.dim)).astype(np.float32)
+    nrng = np.random.default_rng(seed)
+    for start in range(0, size, BATCH):
+        count = min(BATCH, size - start)
+        block = centers[nrng.integers(0, args.clusters, count)] + nrng.standard_normal((count, args.dim),
+                                                                                       dtype=np.float32)
+        yield block / np.linalg.norm(block, axis=1, keepdims=True)
+
+
+def queries(size, args):
+    """Fresh vectors (not in the index) from the same distribution as its rows."""
+    text_args = argparse.Namespace(**dict(vars(args), text_limit=args.text_limit if size <= args.text_limit else 0))
+    return next(batches(args.queries, text_args, args.seed + 1))
+
+
+def build(path, size, args, user_of, **index_kwargs):
+    from emotiontrackeragent.memory_index import VectorIndex
+    index = VectorIndex(path, args.dim, **index_kwargs)
+    start = time.perf_counter()
+    row = 0
+    for block in batches(size, args, args.seed):
+        ids = [f"e{row + i}" for i in range(len(block))]
+        index.add(ids, [user_of(row + i) for i in range(len(block))], block)
+        row += len(block)
+    return index, time.perf_counter() - start
+
+
+def latency_ms(fn, items):
+    timings = []
+    results = []
+    for item in items:
+        start = time.perf_counter()
+        results.append(fn(item))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return results, {"p50_ms": round(timings[len(timings) // 2], 3),
+                     "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 3)}
+
+
+def disk_mb(path):
+    return round(sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2 ** 20, 1)
+
+
+def bench_single_user(size, args, workdir):
+    from emotiontrackeragent.memory_index import VectorIndex
+    path = os.path.join(workdir, f"single-{size}")
+    # Force the IVF path for this user; it is trained once the index reaches its size threshold
+    index, build_s = build(path, size, args, lambda row: "user", exact_rows=0,
+                           ivf_min_rows=min(size, args.ivf_min_rows))
+    qs = queries(size, args)
+    exact, exact_latency = latency_ms(lambda q: index.search(q, "user", args.k, exact=True), qs)
+    sweep = {}
+    for nprobe in args.nprobe:
+        index.nprobe = nprobe
+        approx, latency = latency_ms(lambda q: index.search(q, "user", args.k), qs)
+        hits = sum(len({e for e, _ in a} & {e for e, _ in b}) for a, b in zip(approx, exact))
+        sweep[str(nprobe)] = {f"recall_at_{args.k}": round(hits / (args.k * len(qs)), 4), **latency}
+    clusters = len(index.centroids) if index.centroids is not None else 0
+    index.close()
+    start = time.perf_counter()
+    VectorIndex(path, args.dim).close()
+    return {"build_s": round(build_s, 2), "reopen_s": round(time.perf_counter() - start, 3),
+            "disk_mb": disk_mb(path), "ivf_lists": clusters, "exact": exact_latency, "ivf": sweep}
+
+
+def bench_many_users(size, args, workdir):
+    path = os.path.join(workdir, f"users-{size}")
+    users = max(1, size // args.entries_per_user)
+    index, build_s = build(path, size, args, lambda row: f"u{row % users}", ivf_min_rows=size + 1)
+    qs = queries(size, args)
+    rng = random.Random(args.seed)
+    _, latency = latency_ms(lambda q: index.search(q, f"u{rng.randrange(users)}", args.k), qs)
+    index.close()
+    return {"users": users, "entries_per_user": args.entries_per_user, "build_s": round(build_s, 2),
+            "disk_mb": disk_mb(path), "per_user": latency}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nprobe", default="4,8,16,32,64")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=2000, help="topic clusters of the random vectors")
+    parser.add_argument("--text-limit", type=int, default=100000)
+    parser.add_argument("--ivf-min-rows", type=int, default=50000)
+    parser.add_argument("--entries-per-user", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+    args.nprobe = [int(n) for n in args.nprobe.split(",")]
+
+    sys.path.insert(0, SRC_DIR)
+    report = {"benchmark": "memory_index", "timestamp": time.time(), "python": platform.python_version(),
+              "params": {key: value for key, value in vars(args).items() if key != "no_record"}, "sizes": {}}
+    workdir = tempfile.mkdtemp()
+    try:
+        for size in (int(n) for n in args.sizes.split(",")):
+            result = {"single_user": bench_single_user(size, args, workdir),
+                      "many_users": bench_many_users(size, args, workdir)}
+            report["sizes"][str(size)] = result
+            print(size, json.dumps(result), flush=True)
+            shutil.rmtree(workdir)
+            os.makedirs(workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "memory_index.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""Fuzz and benchmark suite for output_parser.
+
+Seeds come from real logged crew outputs (src/emotiontrackeragent/logs/*.json,
+e.g. journal_entry.json) plus the reflection shapes the models have produced
+(list of question/response objects, dict of prompt -> answer, nested dicts
+with "reason" keys, plain strings). Each seed is mutated: fenced/unfenced,
+leading prose, trailing text, truncated at random points, and with random
+garbage. Every variant must parse without raising and yield a well-formed
+JournalEntry; seeds with a complete JSON body must keep their mood.
+
+It then times parse_crew_output on the seeds and on growing inputs to check
+that cost grows linearly with output size.
+
+    python benchmarks/parser_fuzz.py [--iterations 2000] [--seed 0]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+sys.path.insert(0, SRC_DIR)
+
+from emotiontrackeragent.output_parser import JournalEntry, parse_crew_output, parse_text  # noqa: E402
+
+REFLECTION_SHAPES = [
+    [{"question": "What triggered it?", "response": "A meeting."}, {"question": "How did you respond?", "response": "Calmly."}],
+    [{"prompt": "What stood out today?", "response": ""}],
+    {"What triggered it?": "A meeting.", "What helped?": "A walk."},
+    {"Work stress": {"feeling": "tense", "trigger": "deadline", "reason": "too many tasks"}},
+    ["What are you grateful for?", "What would you change?"],
+    "What is one thing you need right now?",
+]
+
+
+def load_seeds():
+    seeds = []
+    for path in sorted(glob.glob(os.path.join(PACKAGE_DIR, "logs", "*.json"))):
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict) and "raw" in data:
+            seeds.append(data)
+    for i, reflections in enumerate(REFLECTION_SHAPES):
+        body = {"date": "2024-01-01", "mood": f"mood{i}", "confidence": 0.7, "reflections": reflections}
+        raw = "```json\n" + json.dumps(body, indent=2) + "\n```"
+        seeds.append({
+            "raw": raw,
+            "tasks_output": [
+                {"raw": f"Mood: mood{i}\nConfidence: 70%"},
+                {"raw": "1. A question?\n2. Another?"},
+                {"raw": raw},
+            ],
+        })
+    return seeds
+
+
+def mutate(raw, rng):
+    """Return (mutated_text, json_body_intact)."""
+    body_start = raw.find("{")
+    body = raw[body_start:raw.rfind("}") + 1] if body_start != -1 else raw
+    choice = rng.randrange(7)
+    if choice == 0:
+        return body, True
+    if choice == 1:
+        return "```json\n" + body + "\n```", True
+    if choice == 2:
+        return "Here is the structured journal entry you asked for:\n\n```json\n" + body + "\n```\nLet me know!", True
+    if choice == 3:
+        return body + "\n\nNote: the date above is approximate. {not json}", True
+    if choice == 4:
+        return "Sure {like this}. " + body, True
+    if choice == 5:
+        return body[:rng.randrange(1, max(2, len(body)))], False  # truncated stream
+    garbage = "".join(rng.choice('{}[]":,abc \n\\') for _ in range(rng.randrange(1, 200)))
+    return garbage, False
+
+
+def check_entry(entry):
+    assert isinstance(entry, JournalEntry), type(entry)
+    assert isinstance(entry.mood, str) and entry.mood, entry.mood
+    assert isinstance(entry.confidence, float) and 0.0 <= entry.confidence <= 1.0, entry.confidence
+    assert isinstance(entry.reflections, list)
+    for reflection in entry.reflections:
+        assert set(reflection) == {"prompt", "response"}, reflection
+        assert isinstance(reflection["prompt"], str) and isinstance(reflection["response"], str), reflection
+
+
+def fuzz(seeds, iterations, rng):
+    failures = []
+    for i in range(iterations):
+        seed = rng.choice(seeds)
+        expected = parse_crew_output(seed).mood
+        text, intact = mutate(seed["raw"], rng)
+        try:
+            entry = parse_crew_output({"raw": text, "tasks_output": seed.get("tasks_output", [])})
+            check_entry(entry)
+            check_entry(parse_text(text))
+            if intact:
+                assert entry.mood == expected, (entry.mood, expected)
+        except Exception as e:  # collect, don't stop: the report lists every distinct failure
+            failures.append({"iteration": i, "error": repr(e), "input": text[:200]})
+    return failures
+
+
+def time_call(fn, arg, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    seeds = load_seeds()
+    failures = fuzz(seeds, args.iterations, rng)
+
+    per_seed_us = [time_call(parse_crew_output, seed, 200) * 1e6 for seed in seeds]
+
+    # Scaling: a valid entry with N reflections, plus the same cut off halfway
+    scaling = []
+    for n in (10, 100, 1000, 10000):
+        body = {"mood": "calm", "confidence": 0.9,
+                "reflections": [{"question": f"Question {i}?", "response": "x" * 40} for i in range(n)]}
+        text = "Prose before.\n```json\n" + json.dumps(body) + "\n```\ntrailing"
+        scaling.append({
+            "reflections": n,
+            "bytes": len(text),
+            "complete_us": round(time_call(parse_text, text, 20) * 1e6, 1),
+            "truncated_us": round(time_call(parse_text, text[:len(text) // 2], 20) * 1e6, 1),
+        })
+
+    report = {
+        "benchmark": "parser_fuzz",
+        "timestamp": time.time(),
+        "seeds": len(seeds),
+        "iterations": args.iterations,
+        "failures": len(failures),
+        "failure_examples": failures[:5],
+        "parse_crew_output_us": {"median": round(statistics.median(per_seed_us), 1), "max": round(max(per_seed_us), 1)},
+        "scaling": scaling,
+    }
+    print(json.dumps(report, indent=2))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "parser_fuzz.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+"""End-to-end benchmark suite: transcription, the full pipeline and the output parser.
+
+Every case runs in a fresh subprocess so cold-start numbers and peak RSS
+are its own. All LLM work goes to the deterministic stub LLM (MOOD_LLM=stub)
+with --stub-latency-ms per call, and the journal store, result cache and
+trace log live in a throwaway directory.
+
+    parser      parse_crew_output on the logged/synthetic crew outputs: first call, warm latency, throughput
+    run         main.run on benchmarks/corpus.jsonl: import + first request, warm latency with the result
+                cache off, time to the first progress content (the mood) and to the first streamed
+                reflection, cache-hit latency, and throughput at each --concurrency level
+    transcribe  main.transcribe_audio on the bundled meme.wav / anxious_kid.wav: first call (model load),
+                warm latency and real-time factor, cache-hit latency (skipped without whisper installed)
+
+The report carries the git commit it was measured on and is appended to
+benchmarks/results/pipeline.jsonl (and written to --output); compare two
+runs with benchmarks/compare.py.
+
+    python benchmarks/pipeline.py [--cases parser,run,transcribe] [--concurrency 1,4,16] [--output report.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+CORPUS_PATH = os.path.join(ROOT, "benchmarks", "corpus.jsonl")
+SAMPLE_AUDIO = ("meme.wav", "anxious_kid.wav")
+CASES = ("parser", "run", "transcribe")
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def latency_stats(seconds):
+    ordered = sorted(seconds)
+    p50, p95 = (ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in (0.5, 0.95))
+    return {"p50_ms": _ms(p50), "p95_ms": _ms(p95), "mean_ms": _ms(sum(ordered) / len(ordered))}
+
+
+def peak_rss_mb():
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_parser(args):
+    start = time.perf_counter()
+    from emotiontrackeragent.output_parser import parse_crew_output
+    import_s = time.perf_counter() - start
+    from parser_fuzz import load_seeds
+
+    seeds = load_seeds()
+    first_s, _ = timed(parse_crew_output, seeds[0])
+    latencies = []
+    start = time.perf_counter()
+    for i in range(args.repeat * 10):
+        latencies.append(timed(parse_crew_output, seeds[i % len(seeds)])[0])
+    elapsed = time.perf_counter() - start
+    return {
+        "seeds": len(seeds),
+        "import_ms": _ms(import_s),
+        "first_call_ms": _ms(first_s),
+        "warm": latency_stats(latencies),
+        "throughput_per_s": round(len(latencies) / elapsed, 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_run(args):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with open(CORPUS_PATH) as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+    start = time.perf_counter()
+    from emotiontrackeragent import main
+    import_s = time.perf_counter() - start
+
+    os.environ["RESULT_CACHE"] = "0"
+    first_s, _ = timed(main.run, texts[0], None, None, args.mode)
+    warm = [timed(main.run, texts[i % len(texts)], None, None, args.mode)[0] for i in range(args.repeat)]
+
+    # What the app can show before the entry is final (see progress.py): the mood, then the reflections
+    from emotiontrackeragent.progress import CONTENT_EVENTS, listen
+    first_content, first_reflection = [], []
+    for i in range(args.repeat):
+        events = []
+        start = time.time()
+        with listen(events.append):
+            main.run(texts[i % len(texts)], mode=args.mode)
+        first_content.append(next(e["at"] for e in events if e["type"] in CONTENT_EVENTS) - start)
+        first_reflection.append(next(e["at"] for e in events if e["type"] == "reflections") - start)
+
+    # Cache hits: the first pass fills the entry cache, the second is answered from it
+    os.environ["RESULT_CACHE"] = "1"
+    for text in texts:
+        main.run(text, mode=args.mode)
+    hits = [timed(main.run, texts[i % len(texts)], None, None, args.mode)[0] for i in range(args.repeat)]
+    os.environ["RESULT_CACHE"] = "0"
+
+    throughput = {}
+    for concurrency in args.concurrency:
+        requests = max(args.repeat, concurrency * 4)
+        latencies = []
+
+        def one(i):
+            latencies.append(timed(main.run, texts[i % len(texts)], None, None, args.mode)[0])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - start
+        throughput[str(concurrency)] = {"requests": requests, "requests_per_s": round(requests / elapsed, 2),
+                                        **latency_stats(latencies)}
+    return {
+        "mode": args.mode,
+        "import_ms": _ms(import_s),
+        "first_call_ms": _ms(first_s),
+        "warm": latency_stats(warm),
+        "first_content": latency_stats(first_content),
+        "first_reflection": latency_stats(first_reflection),
+        "cache_hit": latency_stats(hits),
+        "concurrency": throughput,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_transcribe(args):
+    from emotiontrackeragent.transcription import SAMPLE_RATE, preprocess_audio
+    from emotiontrackeragent import main
+
+    paths = [os.path.join(PACKAGE_DIR, name) for name in SAMPLE_AUDIO]
+    with open(paths[0], "rb") as f:
+        first_upload = f.read()
+    audio_s = sum(len(preprocess_audio(path)) for path in paths) / SAMPLE_RATE
+
+    os.environ["RESULT_CACHE"] = "0"
+    first_s, _ = timed(main.transcribe_audio, first_upload, args.model_size)
+    warm = []
+    for _ in range(max(1, args.repeat // 10)):
+        warm.append(sum(timed(main.transcribe_audio, path, args.model_size)[0] for path in paths))
+    os.environ["RESULT_CACHE"] = "1"
+    for path in paths:
+        main.transcribe_audio(path, args.model_size)
+    hits = [timed(main.transcribe_audio, paths[i % len(paths)], args.model_size)[0] for i in range(args.repeat)]
+    os.environ["RESULT_CACHE"] = "0"
+    return {
+        "model_size": args.model_size,
+        "audio_seconds": round(audio_s, 2),
+        "first_call_ms": _ms(first_s),
+        "warm_all_samples": latency_stats(warm),
+        "real_time_factor": round(min(warm) / audio_s, 4) if audio_s else None,
+        "cache_hit": latency_stats(hits),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_child(case, args, workdir):
+    env = dict(os.environ, MOOD_LLM="stub", STUB_LLM_LATENCY_MS=str(args.stub_latency_ms),
+               STUB_LLM_PER_TOKEN_MS=str(args.stub_per_token_ms), JOURNAL_DB=os.path.join(workdir, f"{case}-journal.db"),
+               RESULT_CACHE_DB=os.path.join(workdir, f"{case}-cache.db"),
+               TRACE_LOG=os.path.join(workdir, "traces.jsonl"))
+    env.pop("MOOD_PRECLASSIFY_THRESHOLD", None)  # every entry goes through the LLM tier
+    command = [sys.executable, os.path.abspath(__file__), "--child", case, "--mode", args.mode,
+               "--repeat", str(args.repeat), "--model-size", args.model_size,
+               "--concurrency", ",".join(map(str, args.concurrency))]
+    proc = subprocess.run(command, capture_output=True, text=True, env=env, cwd=workdir)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        error = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+        return {"skipped": error}
+    return json.loads(lines[-1])
+
+
+def git_info():
+    def git(*argv):
+        return subprocess.run(["git", *argv], capture_output=True, text=True, cwd=ROOT).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", ROOT))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--mode", choices=["crew", "fast"], default="fast")
+    parser.add_argument("--repeat", type=int, default=50, help="warm iterations per measurement")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--stub-latency-ms", type=float, default=50)
+    parser.add_argument("--stub-per-token-ms", type=float, default=0,
+                        help="stub decode time per completion token, so streamed answers arrive gradually")
+    parser.add_argument("--model-size", default="tiny")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    parser.add_argument("--no-record", action="store_true")
+    parser.add_argument("--child", choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.concurrency = [int(n) for n in args.concurrency.split(",")]
+
+    if args.child:
+        # Inside the per-case subprocess: print one JSON line for the parent
+        sys.path.insert(0, SRC_DIR)
+        bench = {"parser": bench_parser, "run": bench_run, "transcribe": bench_transcribe}[args.child]
+        print(json.dumps(bench(args)))
+        return
+
+    report = {
+        "benchmark": "pipeline",
+        "timestamp": time.time(),
+        "git": git_info(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"mode": args.mode, "repeat": args.repeat, "concurrency": args.concurrency,
+                   "stub_latency_ms": args.stub_latency_ms,
+                   "stub_per_token_ms": args.stub_per_token_ms, "model_size": args.model_size},
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for case in args.cases.split(","):
+            report["cases"][case] = run_child(case, args, workdir)
+            print(case, json.dumps(report["cases"][case]), flush=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "pipeline.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""Per-tier accuracy/latency report for the local mood pre-classifier.
+
+Scores every labelled entry in the corpus (benchmarks/corpus.jsonl by
+default, {"text", "label"} per line) with the local classifier and with the
+LLM tier, then sweeps MOOD_PRECLASSIFY_THRESHOLD values to show the
+trade-off: how many entries the local tier would answer, how accurate it is
+on those, and the resulting overall accuracy and mean latency. "held_out"
+repeats the sweep with k-fold predictions of models trained without the
+entry, so the confidences are out-of-sample (what the threshold sees in
+production), next to the served model's own held-out calibration.
+
+The LLM tier uses the stub LLM unless --real-llm is passed.
+
+    python benchmarks/preclassifier_report.py [--corpus file.jsonl] [--mode fast] [--real-llm]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+CORPUS_PATH = os.path.join(ROOT, "benchmarks", "corpus.jsonl")
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--mode", choices=["crew", "fast"], default="fast", help="pipeline mode for the LLM tier")
+    parser.add_argument("--real-llm", action="store_true", help="use the configured LLM instead of the stub")
+    parser.add_argument("--stub-latency-ms", type=float, default=300)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    if not args.real_llm:
+        os.environ["MOOD_LLM"] = "stub"
+        os.environ["STUB_LLM_LATENCY_MS"] = str(args.stub_latency_ms)
+    os.environ["RESULT_CACHE"] = "0"
+    os.environ.setdefault("JOURNAL_DB", os.path.join(tempfile.mkdtemp(), "journal.db"))
+    sys.path.insert(0, SRC_DIR)
+    from emotiontrackeragent import main as pipeline
+    from emotiontrackeragent.preclassifier import MoodClassifier, fold_indices, get_classifier
+
+    with open(args.corpus) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    classifier = get_classifier()
+
+    rows = []
+    for item in corpus:
+        start = time.perf_counter()
+        local_mood, local_confidence = classifier.predict(item["text"])
+        local_us = (time.perf_counter() - start) * 1e6
+        start = time.perf_counter()
+        llm_mood = str(pipeline.analyze(item["text"], args.mode)["mood"]).lower()
+        llm_ms = (time.perf_counter() - start) * 1000
+        rows.append({
+            "label": item["label"].lower(),
+            "local": local_mood,
+            "confidence": local_confidence,
+            "local_us": local_us,
+            "llm": llm_mood,
+            "llm_ms": llm_ms,
+        })
+
+    def accuracy(pairs):
+        pairs = list(pairs)
+        return round(sum(a == b for a, b in pairs) / len(pairs), 3) if pairs else None
+
+    held_out = []
+    texts, labels = [item["text"] for item in corpus], [item["label"].lower() for item in corpus]
+    for train, test in fold_indices(len(corpus)):
+        fold_model = MoodClassifier().fit([texts[i] for i in train], [labels[i] for i in train])
+        held_out.extend((*fold_model.predict(texts[i]), labels[i]) for i in test)
+
+    report = {
+        "benchmark": "preclassifier",
+        "timestamp": time.time(),
+        "entries": len(rows),
+        "classifier_trained_on": classifier.trained_on,
+        "classifier_calibration": classifier.calibration,
+        "llm": "configured" if args.real_llm else "stub",
+        "tiers": {
+            "local": {
+                "accuracy": accuracy((r["local"], r["label"]) for r in rows),
+                "mean_latency_us": round(statistics.mean(r["local_us"] for r in rows), 1),
+            },
+            "llm": {
+                "accuracy": accuracy((r["llm"], r["label"]) for r in rows),
+                "mean_latency_ms": round(statistics.mean(r["llm_ms"] for r in rows), 1),
+            },
+        },
+        "thresholds": [],
+    }
+    for threshold in THRESHOLDS:
+        local = [r for r in rows if r["confidence"] >= threshold]
+        routed = [r for r in rows if r["confidence"] < threshold]
+        answers = [(r["local"], r["label"]) for r in local] + [(r["llm"], r["label"]) for r in routed]
+        report["thresholds"].append({
+            "threshold": threshold,
+            "local_share": round(len(local) / len(rows), 3),
+            "local_accuracy": accuracy((r["local"], r["label"]) for r in local),
+            "overall_accuracy": accuracy(answers),
+            "mean_latency_ms": round(
+                (sum(r["local_us"] / 1000 for r in local) + sum(r["llm_ms"] for r in routed)) / len(rows), 2
+            ),
+        })
+
+    report["held_out"] = {
+        "accuracy": accuracy((mood, label) for mood, _, label in held_out),
+        "mean_confidence": round(statistics.mean(confidence for _, confidence, _ in held_out), 3),
+        "thresholds": [],
+    }
+    for threshold in THRESHOLDS:
+        local = [(mood, confidence, label) for mood, confidence, label in held_out if confidence >= threshold]
+        report["held_out"]["thresholds"].append({
+            "threshold": threshold,
+            "local_share": round(len(local) / len(held_out), 3),
+            "local_accuracy": accuracy((mood, label) for mood, _, label in local),
+            "mean_confidence": round(statistics.mean(c for _, c, _ in local), 3) if local else None,
+        })
+
+    print(json.dumps(report, indent=2))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "preclassifier.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
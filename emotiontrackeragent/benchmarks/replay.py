@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""Checkpoint replay: LLM calls and time of resuming at each crew task, against full runs.
+
+Runs benchmarks/corpus.jsonl through the crew once (with the stub LLM, so
+every task checkpoints its output), then replays every request from each
+task in turn, as when iterating on a later agent's prompt or recovering
+from a late failure. --from-task 4 only re-parses the stored logger output.
+
+    python benchmarks/replay.py [--stub-latency-ms 50]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+CORPUS_PATH = os.path.join(ROOT, "benchmarks", "corpus.jsonl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stub-latency-ms", type=float, default=50)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update(MOOD_LLM="stub", STUB_LLM_LATENCY_MS=str(args.stub_latency_ms), RESULT_CACHE="0",
+                      MEMORY="0", JOURNAL_TOOL="0", JOURNAL_DB=os.path.join(workdir, "journal.db"),
+                      CHECKPOINT_DB=os.path.join(workdir, "checkpoints.db"),
+                      TRACE_LOG=os.path.join(workdir, "traces.jsonl"))
+    os.environ.pop("MOOD_PRECLASSIFY_THRESHOLD", None)  # every entry goes through the crew
+    sys.path.insert(0, SRC_DIR)
+    try:
+        import crewai  # noqa: F401
+    except ImportError:
+        raise SystemExit("crewai is not installed; this benchmark needs it")
+    from emotiontrackeragent import main as pipeline
+    from emotiontrackeragent.crew import get_template
+
+    with open(CORPUS_PATH) as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+    request_ids = [f"bench-{i}" for i in range(len(texts))]
+
+    def measure(fn):
+        start = time.perf_counter()
+        entries = [fn(i) for i in range(len(texts))]
+        return {"llm_calls": sum(entry["usage"]["calls"] for entry in entries),
+                "tokens": sum(entry["usage"]["prompt_tokens"] + entry["usage"]["completion_tokens"]
+                              for entry in entries),
+                "seconds": round(time.perf_counter() - start, 3),
+                "moods": [entry["mood"] for entry in entries]}
+
+    full = measure(lambda i: pipeline.run(texts[i], request_id=request_ids[i], mode="crew"))
+    replays = {}
+    for from_task in range(1, len(get_template().tasks) + 2):
+        replays[str(from_task)] = measure(lambda i: pipeline.replay(request_ids[i], from_task))
+    for result in replays.values():
+        result["same_moods"] = result.pop("moods") == full["moods"]
+        result["call_fraction"] = round(result["llm_calls"] / full["llm_calls"], 3) if full["llm_calls"] else None
+    full.pop("moods")
+
+    report = {
+        "benchmark": "replay",
+        "timestamp": time.time(),
+        "entries": len(texts),
+        "stub_latency_ms": args.stub_latency_ms,
+        "full_run": full,
+        "replay_from_task": replays,
+    }
+    print(json.dumps(report, indent=2))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "replay.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""Time-to-first-result and peak memory: streamed vs whole-file transcription.
+
+Each mode runs in its own subprocess so peak RSS is measured independently.
+Use a long recording to see the difference (the bundled samples are short;
+`ffmpeg -stream_loop 20 -i meme.wav long.wav` makes a longer one).
+
+    python benchmarks/streaming.py path/to/long.wav [--model-size base] [--window 30]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+_CHILD = r"""
+import json, resource, sys, time
+sys.path.insert(0, sys.argv[1])
+mode, audio, size, window = sys.argv[2], sys.argv[3], sys.argv[4], float(sys.argv[5])
+from emotiontrackeragent.transcription import get_pool, transcribe_stream
+get_pool().warm([size])  # model load is not what we're measuring
+start = time.perf_counter()
+first = None
+if mode == "stream":
+    chunks = 0
+    for chunk in transcribe_stream(audio, size=size, window_seconds=window):
+        chunks += 1
+        if first is None:
+            first = time.perf_counter() - start
+else:
+    get_pool().transcribe(audio, size=size)
+    chunks = 1
+total = time.perf_counter() - start
+print(json.dumps({
+    "mode": mode,
+    "chunks": chunks,
+    "time_to_first_text_s": round(first if first is not None else total, 3),
+    "total_s": round(total, 3),
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+}))
+"""
+
+
+def audio_seconds(path):
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+        capture_output=True, text=True,
+    ).stdout.strip()
+    return float(out) if out else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio")
+    parser.add_argument("--model-size", default=os.getenv("WHISPER_MODEL", "base"))
+    parser.add_argument("--window", type=float, default=30.0)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    audio = os.path.abspath(args.audio)
+    report = {"benchmark": "streaming", "timestamp": time.time(), "audio": os.path.basename(audio),
+              "audio_seconds": audio_seconds(audio), "model_size": args.model_size, "modes": []}
+    for mode in ("whole", "stream"):
+        proc = subprocess.run(
+            [sys.executable, "-c", _CHILD, SRC_DIR, mode, audio, args.model_size, str(args.window)],
+            capture_output=True, text=True, check=True,
+        )
+        report["modes"].append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(json.dumps(report, indent=2))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "streaming.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
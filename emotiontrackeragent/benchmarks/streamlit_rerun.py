@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Per-rerun server time and payload size of the Streamlit page.
+
+"before" replays what every rerun used to do for the header video: read
+art.mp4, base64-encode it and inline it into the page markup. "after" runs
+the real app through streamlit.testing.AppTest and measures each rerun's
+wall time and the size of the element payloads it produced. The video is
+now sent as a URL, and its bytes are read once per process.
+
+    python benchmarks/streamlit_rerun.py [--reruns 20]
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def legacy_inline_video(reruns):
+    times = []
+    payload = 0
+    for _ in range(reruns):
+        start = time.perf_counter()
+        with open(os.path.join(PACKAGE_DIR, "art.mp4"), "rb") as f:
+            encoded = base64.b64encode(f.read()).decode()
+        html = f'<video autoplay loop muted playsinline><source src="data:video/mp4;base64,{encoded}"></video>'
+        times.append((time.perf_counter() - start) * 1000)
+        payload = len(html)
+    return {"video_ms_per_rerun": round(statistics.median(times), 2), "video_bytes_per_rerun": payload}
+
+
+def element_bytes(node):
+    """Rough size of what a rerun sends: the serialized protos of every element."""
+    proto = getattr(node, "proto", None)
+    total = proto.ByteSize() if proto is not None and hasattr(proto, "ByteSize") else 0
+    for child in getattr(node, "children", {}).values():
+        total += element_bytes(child)
+    return total
+
+
+def app_reruns(reruns):
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(PACKAGE_DIR)  # the app opens its assets relative to its own directory
+    app = AppTest.from_file(os.path.join(PACKAGE_DIR, "mood_app.py"), default_timeout=60)
+    times = []
+    sizes = []
+    for i in range(reruns + 1):
+        start = time.perf_counter()
+        app.run()
+        elapsed = (time.perf_counter() - start) * 1000
+        if i == 0:
+            first = elapsed  # cold: includes the one-time asset read
+            continue
+        times.append(elapsed)
+        sizes.append(element_bytes(app._tree))
+    return {"first_run_ms": round(first, 2), "rerun_ms": round(statistics.median(times), 2),
+            "rerun_payload_bytes": int(statistics.median(sizes))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    report = {
+        "benchmark": "streamlit_rerun",
+        "timestamp": time.time(),
+        "before": legacy_inline_video(args.reruns),
+        "after": app_reruns(args.reruns),
+    }
+    print(json.dumps(report, indent=2))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "streamlit_rerun.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
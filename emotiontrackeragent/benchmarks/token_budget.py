@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""Tokens, cost and latency per entry on long transcripts, with and without an input budget.
+
+Builds long "transcripts" by padding corpus entries with neutral filler
+speech, then runs the pipeline with the stub LLM under each
+MAX_INPUT_TOKENS setting (charging a simulated prefill delay per prompt
+token), and reports prompt tokens, estimated cost, latency and whether the mood still
+matches the label.
+
+    python benchmarks/token_budget.py [--mode fast] [--budgets 0,2000,500] [--filler-sentences 400]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+CORPUS_PATH = os.path.join(ROOT, "benchmarks", "corpus.jsonl")
+FILLER = [
+    "So anyway I went to the store after that.",
+    "Then I had lunch at the usual place near the office.",
+    "The bus was a few minutes late this morning.",
+    "We talked about the schedule for next week.",
+    "I checked my email and replied to a couple of messages.",
+    "It rained a little in the afternoon.",
+    "I watched part of a show before going to bed.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["crew", "fast"], default="fast")
+    parser.add_argument("--budgets", default="0,2000,500", help="MAX_INPUT_TOKENS values; 0 = unlimited")
+    parser.add_argument("--strategy", choices=["summarize", "truncate"], default="summarize")
+    parser.add_argument("--filler-sentences", type=int, default=400)
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.05,
+                        help="simulated LLM latency per prompt token")
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["MOOD_LLM"] = "stub"
+    os.environ["RESULT_CACHE"] = "0"
+    os.environ.setdefault("JOURNAL_DB", os.path.join(tempfile.mkdtemp(), "journal.db"))
+    sys.path.insert(0, SRC_DIR)
+    from emotiontrackeragent import token_budget
+    from emotiontrackeragent import main as pipeline
+    from emotiontrackeragent.token_budget import estimate_cost, track_usage
+
+    rng = random.Random(0)
+    with open(CORPUS_PATH) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    transcripts = []
+    for item in corpus:
+        filler = [rng.choice(FILLER) for _ in range(args.filler_sentences)]
+        middle = len(filler) // 2
+        transcripts.append((item, " ".join(filler[:middle] + [item["text"]] + filler[middle:])))
+
+    per_token_s = args.prefill_ms_per_token / 1000
+    rows = []
+    for budget in (int(b) for b in args.budgets.split(",")):
+        token_budget.MAX_INPUT_TOKENS = budget or 10 ** 9
+        token_budget.INPUT_BUDGET_STRATEGY = args.strategy
+        prompt_tokens, completion_tokens, latencies, correct = [], [], [], 0
+        for item, text in transcripts:
+            with track_usage() as usage:
+                start = time.perf_counter()
+                entry = pipeline.analyze(text, args.mode)
+                summary = usage.summary()
+                # The stub's own delay only models completion size, so charge prompt size here
+                time.sleep(summary["prompt_tokens"] * per_token_s)
+                latencies.append(time.perf_counter() - start)
+            prompt_tokens.append(summary["prompt_tokens"])
+            completion_tokens.append(summary["completion_tokens"])
+            correct += str(entry.get("mood", "")).lower() == item["label"].lower()
+        rows.append({
+            "max_input_tokens": budget or None,
+            "prompt_tokens_per_entry": round(statistics.mean(prompt_tokens), 1),
+            "completion_tokens_per_entry": round(statistics.mean(completion_tokens), 1),
+            "cost_per_entry_usd": estimate_cost(statistics.mean(prompt_tokens), statistics.mean(completion_tokens)),
+            "latency_s_mean": round(statistics.mean(latencies), 4),
+            "mood_accuracy": round(correct / len(transcripts), 3),
+        })
+        print(json.dumps(rows[-1]))
+
+    report = {"benchmark": "token_budget", "timestamp": time.time(), "mode": args.mode, "strategy": args.strategy,
+              "filler_sentences": args.filler_sentences, "rows": rows}
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "token_budget.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""Accuracy/latency sweep over Whisper backends, model sizes and compute types.
+
+Transcribes every sample WAV in the package with each configuration and
+reports load time, median latency, real-time factor and word error rate.
+WER is measured against --reference (JSON {"file.wav": "transcript"}) or,
+without one, against the first configuration that succeeded with the
+largest model in the sweep. The cheapest configuration within --max-wer is
+printed as the recommendation.
+
+    python benchmarks/whisper_backends.py --sizes tiny,base,small \\
+        --configs openai:float32,faster:int8 [--threads 4] [--reference refs.json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+PACKAGE_DIR = os.path.join(SRC_DIR, "emotiontrackeragent")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SIZE_ORDER = ("tiny", "base", "small", "medium", "large", "large-v2", "large-v3")
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9']+", (text or "").lower())
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="tiny,base,small")
+    parser.add_argument("--configs", default="openai:float32,faster:int8",
+                        help="comma-separated backend:compute_type pairs")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reference", help="JSON file mapping sample file names to reference transcripts")
+    parser.add_argument("--max-wer", type=float, default=0.15)
+    parser.add_argument("--no-record", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    from emotiontrackeragent.transcription import SAMPLE_RATE, WhisperModelPool, preprocess_audio
+    from emotiontrackeragent.whisper_backends import make_backend
+
+    samples = {name: preprocess_audio(os.path.join(PACKAGE_DIR, name))
+               for name in sorted(os.listdir(PACKAGE_DIR)) if name.endswith(".wav")}
+    audio_seconds = sum(len(audio) for audio in samples.values()) / SAMPLE_RATE
+    sizes = sorted(args.sizes.split(","), key=lambda s: SIZE_ORDER.index(s) if s in SIZE_ORDER else len(SIZE_ORDER))
+
+    runs = []
+    for size in sizes:
+        for config in args.configs.split(","):
+            backend_name, _, compute_type = config.partition(":")
+            run = {"backend": backend_name, "compute_type": compute_type or None, "size": size,
+                   "threads": args.threads}
+            try:
+                backend = make_backend(backend_name, compute_type or None, args.threads)
+                pool = WhisperModelPool(backend=backend)
+                start = time.perf_counter()
+                pool.warm([size])
+                run["load_s"] = round(time.perf_counter() - start, 2)
+                run["transcripts"], latencies = {}, []
+                for name, audio in samples.items():
+                    timings = []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        text = pool.transcribe(audio, size=size)["text"].strip()
+                        timings.append(time.perf_counter() - start)
+                    run["transcripts"][name] = text
+                    latencies.append(statistics.median(timings))
+                run["latency_s"] = round(sum(latencies), 3)
+                run["real_time_factor"] = round(sum(latencies) / audio_seconds, 4)
+            except Exception as e:  # backend not installed, unsupported compute type, ...
+                run["error"] = f"{type(e).__name__}: {e}"
+            runs.append(run)
+            print(json.dumps({k: v for k, v in run.items() if k != "transcripts"}))
+
+    if args.reference:
+        with open(args.reference) as f:
+            references, reference_source = json.load(f), args.reference
+    else:
+        ok = [run for run in runs if "error" not in run]
+        # Sizes run smallest first, so this is the first configuration of the largest model that worked
+        best = next((run for run in ok if run["size"] == ok[-1]["size"]), None) if ok else None
+        references = best["transcripts"] if best else {}
+        reference_source = f"{best['backend']}:{best['compute_type']}:{best['size']}" if best else None
+
+    for run in runs:
+        if "error" in run or not references:
+            continue
+        run["wer"] = round(statistics.mean(word_error_rate(references.get(name, ""), text)
+                                           for name, text in run["transcripts"].items()), 4)
+    acceptable = [run for run in runs if run.get("wer") is not None and run["wer"] <= args.max_wer]
+    recommended = min(acceptable, key=lambda run: run["latency_s"]) if acceptable else None
+
+    report = {
+        "benchmark": "whisper_backends",
+        "timestamp": time.time(),
+        "audio_seconds": round(audio_seconds, 2),
+        "reference": reference_source,
+        "max_wer": args.max_wer,
+        "runs": runs,
+        "recommended": {k: recommended[k] for k in ("backend", "compute_type", "size", "latency_s", "wer")}
+        if recommended else None,
+    }
+    print(json.dumps({"reference": reference_source, "recommended": report["recommended"]}, indent=2))
+    if recommended:
+        print(f"WHISPER_BACKEND={recommended['backend']} WHISPER_MODEL={recommended['size']}"
+              + (f" WHISPER_COMPUTE_TYPE={recommended['compute_type']}" if recommended["compute_type"] else "")
+              + (f" WHISPER_THREADS={args.threads}" if args.threads else ""))
+    if not args.no_record:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(os.path.join(RESULTS_DIR, "whisper_backends.jsonl"), "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Mood history analytics over the journal store.
+
+Each user's history is kept as two day-by-mood NumPy matrices (entry counts
+and summed confidence) that are updated in place as entries are appended,
+so frequency, timeline and streak queries are array slices and reductions
+instead of a rescan of the stored JSON.
+"""
+import threading
+import time
+from datetime import date as Date
+
+import numpy as np
+
+from .journal_store import get_store
+
+
+INITIAL_DAYS = 64
+UNKNOWN_MOOD = "unknown"
+# A history is re-synced from the store at most this often, to pick up
+# entries written by other processes (batch runs, API workers)
+SYNC_INTERVAL_SECONDS = 2.0
+# Overlap when re-syncing, so rows committed slightly out of created_at order aren't missed
+SYNC_OVERLAP_SECONDS = 5.0
+
+
+def _day(entry, created_at=None):
+    value = entry.get("date")
+    if isinstance(value, str):
+        try:
+            return Date.fromisoformat(value[:10]).toordinal()
+        except ValueError:
+            pass
+    return Date.fromtimestamp(created_at or time.time()).toordinal()
+
+
+def _mood(entry):
+    mood = str(entry.get("mood") or "").strip().lower()
+    return mood or UNKNOWN_MOOD
+
+
+def _confidence(entry):
+    try:
+        return min(max(float(entry.get("confidence", 0.5)), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return 0.5
+
+
+def _runs(mask):
+    """(starts, lengths) of every run of True in a 1-D boolean array."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return edges[::2], edges[1::2] - edges[::2]
+
+
+class MoodHistory:
+    """One user's entries as running per-day, per-mood aggregates."""
+
+    def __init__(self):
+        self.moods = []
+        self._mood_index = {}
+        self.first_day = None  # ordinal date of row 0
+        self.days = 0  # rows in use
+        self.counts = np.zeros((0, 0), dtype=np.int32)
+        self.weights = np.zeros((0, 0), dtype=np.float64)
+        self.entries = 0
+        self.ids = set()
+        self.last_created_at = 0.0
+        self.synced_at = 0.0
+
+    def _column(self, mood):
+        column = self._mood_index.get(mood)
+        if column is None:
+            column = self._mood_index[mood] = len(self.moods)
+            self.moods.append(mood)
+            if column >= self.counts.shape[1]:
+                extra = max(4, self.counts.shape[1])
+                rows = self.counts.shape[0]
+                self.counts = np.hstack([self.counts, np.zeros((rows, extra), dtype=self.counts.dtype)])
+                self.weights = np.hstack([self.weights, np.zeros((rows, extra), dtype=self.weights.dtype)])
+        return column
+
+    def _row(self, day):
+        if self.first_day is None:
+            self.first_day = day
+        if day < self.first_day:
+            # Back-dated entry: shift everything down (rare, so no spare capacity at the front)
+            shift = self.first_day - day
+            columns = self.counts.shape[1]
+            self.counts = np.vstack([np.zeros((shift, columns), dtype=self.counts.dtype), self.counts])
+            self.weights = np.vstack([np.zeros((shift, columns), dtype=self.weights.dtype), self.weights])
+            self.first_day = day
+            self.days += shift
+        row = day - self.first_day
+        if row >= self.counts.shape[0]:
+            # Grow geometrically so a year of daily appends costs a handful of copies
+            capacity = max(row + 1, 2 * self.counts.shape[0], INITIAL_DAYS)
+            columns = self.counts.shape[1]
+            counts = np.zeros((capacity, columns), dtype=self.counts.dtype)
+            weights = np.zeros((capacity, columns), dtype=self.weights.dtype)
+            counts[:self.days] = self.counts[:self.days]
+            weights[:self.days] = self.weights[:self.days]
+            self.counts, self.weights = counts, weights
+        self.days = max(self.days, row + 1)
+        return row
+
+    def add(self, entry, entry_id=None, created_at=None):
+        """Fold one stored entry into the aggregates; returns False if it was already counted."""
+        if entry_id is not None:
+            if entry_id in self.ids:
+                return False
+            self.ids.add(entry_id)
+        column = self._column(_mood(entry))
+        row = self._row(_day(entry, created_at))
+        self.counts[row, column] += 1
+        self.weights[row, column] += _confidence(entry)
+        self.entries += 1
+        if created_at is not None:
+            self.last_created_at = max(self.last_created_at, created_at)
+        return True
+
+    def _window(self, date_from=None, date_to=None):
+        lo, hi = 0, self.days
+        if date_from is not None:
+            lo = max(lo, Date.fromisoformat(date_from).toordinal() - self.first_day)
+        if date_to is not None:
+            hi = min(hi, Date.fromisoformat(date_to).toordinal() - self.first_day + 1)
+        return lo, max(lo, hi)
+
+    def _matrices(self, lo, hi):
+        columns = len(self.moods)
+        return self.counts[lo:hi, :columns], self.weights[lo:hi, :columns]
+
+    def frequency(self, period="day", date_from=None, date_to=None):
+        """Entry counts per mood for each day (or ISO week) in the range.
+
+        Returns {"periods": [date, ...], "moods": [...], "counts": array (periods x moods)};
+        weekly periods are labelled with their Monday.
+        """
+        if period not in ("day", "week"):
+            raise ValueError(f"Unknown period {period!r}; expected 'day' or 'week'")
+        if not self.entries:
+            return {"periods": [], "moods": [], "counts": np.zeros((0, 0), dtype=np.int32)}
+        lo, hi = self._window(date_from, date_to)
+        counts, _ = self._matrices(lo, hi)
+        days = np.arange(self.first_day + lo, self.first_day + hi)
+        if period == "week" and len(days):
+            weeks = (days - 1) // 7  # ordinal 1 (0001-01-01) is a Monday
+            starts = np.flatnonzero(np.concatenate(([True], weeks[1:] != weeks[:-1])))
+            counts = np.add.reduceat(counts, starts, axis=0)
+            days = weeks[starts] * 7 + 1
+        return {
+            "periods": [Date.fromordinal(int(day)).isoformat() for day in days],
+            "moods": list(self.moods),
+            "counts": counts.copy(),
+        }
+
+    def timeline(self, date_from=None, date_to=None):
+        """Confidence-weighted mood mix for each day that has entries.
+
+        Returns {"dates", "moods", "shares" (days x moods, rows sum to 1),
+        "dominant" (mood per day), "strength" (dominant mood's share)}.
+        """
+        lo, hi = self._window(date_from, date_to)
+        counts, weights = self._matrices(lo, hi)
+        active = np.flatnonzero(counts.sum(axis=1))
+        weights = weights[active]
+        totals = weights.sum(axis=1, keepdims=True)
+        # Days whose entries all had zero confidence still count, spread evenly
+        shares = np.divide(weights, totals, out=np.full_like(weights, 1.0 / max(1, weights.shape[1])),
+                           where=totals > 0)
+        dominant = shares.argmax(axis=1) if len(active) else np.zeros(0, dtype=np.intp)
+        return {
+            "dates": [Date.fromordinal(int(self.first_day + lo + row)).isoformat() for row in active],
+            "moods": list(self.moods),
+            "shares": shares,
+            "dominant": [self.moods[column] for column in dominant],
+            "strength": shares[np.arange(len(active)), dominant],
+        }
+
+    def streaks(self, today=None):
+        """Journaling streaks (consecutive days with an entry) and same-mood streaks.
+
+        A streak still counts as current if its last day is today or yesterday.
+        """
+        result = {"current_days": 0, "longest_days": 0, "current_mood": None, "current_mood_days": 0,
+                  "longest_mood": None, "longest_mood_days": 0}
+        if not self.entries:
+            return result
+        counts, weights = self._matrices(0, self.days)
+        active = counts.sum(axis=1) > 0
+        today_row = (Date.fromisoformat(today) if today else Date.today()).toordinal() - self.first_day
+
+        starts, lengths = _runs(active)
+        result["longest_days"] = int(lengths.max())
+        if starts[-1] + lengths[-1] - 1 >= today_row - 1:
+            result["current_days"] = int(lengths[-1])
+
+        dominant = np.where(active, weights.argmax(axis=1), -1)
+        # Same-mood runs: split wherever the dominant mood changes, keep the active ones
+        starts = np.flatnonzero(np.concatenate(([True], dominant[1:] != dominant[:-1])))
+        lengths = np.diff(np.concatenate((starts, [len(dominant)])))
+        keep = dominant[starts] >= 0
+        starts, lengths = starts[keep], lengths[keep]
+        best = int(lengths.argmax())
+        result["longest_mood"] = self.moods[dominant[starts[best]]]
+        result["longest_mood_days"] = int(lengths[best])
+        if starts[-1] + lengths[-1] - 1 >= today_row - 1:
+            result["current_mood"] = self.moods[dominant[starts[-1]]]
+            result["current_mood_days"] = int(lengths[-1])
+        return result
+
+
+class MoodAnalytics:
+    """Per-user MoodHistory objects, loaded from the store once and then kept current.
+
+    `record` folds a just-stored entry into any loaded history; queries also
+    pull rows other processes have written since the last sync.
+    """
+
+    def __init__(self, store=None):
+        self._store = store
+        self._histories = {}
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    def _sync(self, history, user_id, since=None):
+        for row in self.store.list_entries(user_id=user_id, created_after=since):
+            history.add(row["entry"], entry_id=row["id"], created_at=row["created_at"])
+        history.synced_at = time.monotonic()
+
+    def _history(self, user_id):
+        history = self._histories.get(user_id)
+        if history is None:
+            history = self._histories[user_id] = MoodHistory()
+            self._sync(history, user_id)
+        elif time.monotonic() - history.synced_at > SYNC_INTERVAL_SECONDS:
+            self._sync(history, user_id, since=history.last_created_at - SYNC_OVERLAP_SECONDS)
+        return history
+
+    def record(self, entry, entry_id=None, user_id=None, created_at=None):
+        """Update loaded histories with an entry that was just appended to the store.
+
+        Histories that were never queried are left alone; they load everything on first use.
+        """
+        created_at = time.time() if created_at is None else created_at
+        with self._lock:
+            for key in {user_id, None}:
+                history = self._histories.get(key)
+                if history is not None:
+                    history.add(entry, entry_id=entry_id, created_at=created_at)
+
+    def history(self, user_id=None):
+        """The user's MoodHistory (every user's entries when user_id is None)."""
+        with self._lock:
+            return self._history(user_id)
+
+    def frequency(self, user_id=None, period="day", date_from=None, date_to=None):
+        with self._lock:
+            return self._history(user_id).frequency(period, date_from, date_to)
+
+    def timeline(self, user_id=None, date_from=None, date_to=None):
+        with self._lock:
+            return self._history(user_id).timeline(date_from, date_to)
+
+    def streaks(self, user_id=None, today=None):
+        with self._lock:
+            return self._history(user_id).streaks(today)
+
+    def summary(self, user_id=None):
+        """Entry count, per-mood totals and average confidence, for headline numbers."""
+        with self._lock:
+            history = self._history(user_id)
+            counts, weights = history._matrices(0, history.days)
+            totals = counts.sum(axis=0)
+            return {
+                "entries": history.entries,
+                "days": int((counts.sum(axis=1) > 0).sum()),
+                "moods": {mood: int(total) for mood, total in zip(history.moods, totals)},
+                "average_confidence": float(weights.sum() / totals.sum()) if history.entries else None,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._histories.clear()
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_analytics():
+    """Process-wide analytics over the default journal store."""
+    global _analytics
+    if _analytics is None:
+        with _analytics_lock:
+            if _analytics is None:
+                _analytics = MoodAnalytics()
+    return _analytics
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""Headless HTTP API for the mood pipeline.
+
+    uvicorn emotiontrackeragent.api:app --port 8000        (or: python -m emotiontrackeragent.api --port 8000)
+
+Endpoints:
+    POST /entries/text    {"text": ..., "user_id": ...}          -> 202 {"job_id": ...}
+    POST /entries/audio   multipart "file" (+ optional user_id)  -> 202 {"job_id": ...}
+    GET  /jobs/{job_id}                                          -> job status / result
+    WS   /jobs/{job_id}/events                                   -> status, partial, progress and final events
+    GET  /healthz, /readyz, /metrics
+
+Add ?wait=<seconds> to the POST endpoints to block for the result. When the
+service already has MOOD_MAX_PENDING_JOBS unfinished jobs, submissions get
+503 with Retry-After instead of queueing without bound; a user_id over
+MOOD_USER_JOBS_PER_MINUTE or MOOD_USER_MAX_PENDING gets 429. Set WHISPER_BATCH=1
+to micro-batch Whisper across concurrent uploads, and MOOD_LLM=stub to load
+test without calling Gemini.
+"""
+import asyncio
+import math
+import os
+
+from fastapi import FastAPI, File, Form, HTTPException, Query, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .service import RateLimited, ServiceBusy, get_service
+
+
+MAX_UPLOAD_BYTES = int(os.getenv("MOOD_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+
+app = FastAPI(title="Emotion Tracker Agent API")
+
+
+class TextEntry(BaseModel):
+    text: str
+    user_id: str | None = None
+
+
+def _configure_llm_connections():
+    # One keep-alive connection pool for every LLM call this process makes,
+    # instead of a new TLS handshake per request
+    try:
+        import httpx
+        import litellm
+    except ImportError:
+        return
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+    litellm.client_session = httpx.Client(limits=limits, timeout=120)
+    litellm.aclient_session = httpx.AsyncClient(limits=limits, timeout=120)
+
+
+@app.on_event("startup")
+def startup():
+    _configure_llm_connections()
+    app.state.ready = False
+    service = get_service()
+    app.state.service = service
+
+    def warm():
+        from . import main
+        main.get_llm()  # builds the LLM and imports crewai before the first request
+        app.state.ready = True
+
+    service._llm_pool.submit(warm)
+
+
+@app.on_event("shutdown")
+def shutdown():
+    app.state.service.shutdown(wait=False)
+
+
+def _job_payload(job):
+    return job.to_dict()
+
+
+async def _respond(job_id, wait):
+    service = app.state.service
+    if wait:
+        job = await asyncio.to_thread(service.wait, job_id, wait)
+        if job.finished:
+            return JSONResponse(_job_payload(job), status_code=200 if not job.error else 500)
+    return JSONResponse({"job_id": job_id, "status_url": f"/jobs/{job_id}"}, status_code=202)
+
+
+def _busy(e):
+    if isinstance(e, RateLimited):
+        # This user is over their own limit; the service itself may be idle
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+@app.post("/entries/text")
+async def submit_text(entry: TextEntry, wait: float = Query(0, ge=0, le=300)):
+    if not entry.text.strip():
+        raise HTTPException(status_code=422, detail="text must not be empty")
+    try:
+        job_id = app.state.service.submit_text(entry.text, user_id=entry.user_id)
+    except ServiceBusy as e:
+        _busy(e)
+    return await _respond(job_id, wait)
+
+
+@app.post("/entries/audio")
+async def submit_audio(file: UploadFile = File(...), user_id: str | None = Form(None),
+                       wait: float = Query(0, ge=0, le=300)):
+    # Kept in memory and decoded from there, so no temporary file to write or clean up
+    data = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="upload too large")
+    if not data:
+        raise HTTPException(status_code=422, detail="empty upload")
+    try:
+        job_id = app.state.service.submit_audio(data, user_id=user_id)
+    except ServiceBusy as e:
+        _busy(e)
+    return await _respond(job_id, wait)
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = app.state.service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+    return _job_payload(job)
+
+
+@app.websocket("/jobs/{job_id}/events")
+async def job_events(websocket: WebSocket, job_id: str):
+    await websocket.accept()
+    job = app.state.service.get(job_id)
+    if job is None:
+        await websocket.send_json({"type": "error", "detail": "unknown job"})
+        await websocket.close(code=4404)
+        return
+    last_status = last_partial = last_progress = None
+    try:
+        while True:
+            if job.status != last_status:
+                last_status = job.status
+                await websocket.send_json({"type": "status", "status": job.status})
+            if job.partial is not None and job.partial is not last_partial:
+                last_partial = job.partial
+                await websocket.send_json({"type": "partial", "entry": job.partial})
+            if job.progress is not None and job.progress is not last_progress:
+                # Mood and reflections so far (see progress.fold), before the entry is final
+                last_progress = job.progress
+                await websocket.send_json({"type": "progress", "progress": job.progress})
+            if job.finished:
+                await websocket.send_json({"type": "final", "job": _job_payload(job)})
+                break
+            await asyncio.sleep(0.1)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+def metrics():
+    from . import main
+    body = {"pending_jobs": app.state.service.pending}
+    for name, llm in (("llm", main._llm), ("stream_llm", main._stream_llm), ("fast_llm", main._fast_llm)):
+        if llm is not None and hasattr(llm, "metrics"):
+            body[name] = llm.metrics()  # call counts, retries, hedges, circuit state, latency percentiles
+    from .result_cache import cache_enabled, get_cache
+    if cache_enabled():
+        body["cache"] = {name: get_cache(name).metrics() for name in ("entries", "transcripts")}
+    return body
+
+
+@app.get("/readyz")
+def readyz():
+    service = app.state.service
+    ready = getattr(app.state, "ready", False)
+    saturated = service.max_pending is not None and service.pending >= service.max_pending
+    body = {"ready": ready and not saturated, "pending_jobs": service.pending, "max_pending": service.max_pending}
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the mood pipeline HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+"""Batch journal ingestion.
+
+Point it at a directory of recordings / .txt entries or at a JSON-lines
+manifest ({"id": ..., "audio": path} or {"id": ..., "text": ...}, optional
+"user_id"). Audio is transcribed on a small process pool (each worker holds
+its own Whisper model, so BATCH_TRANSCRIBE_WORKERS caps it at 2 by default,
+with the cores split between them as torch threads), texts go through the mood pipeline with bounded concurrency and a
+rate limit, and results are appended to the output file as they finish.
+Items with an empty text or neither field count as failed; the rest still run.
+
+Re-running the same command resumes: entries already in the output file are
+skipped, and transcripts saved in the checkpoint file are not redone. Each
+item is stored under a request ID derived from the output file and its item
+ID, so an entry that reached the journal store before a crash is written to
+the output from the store instead of being analyzed and stored twice.
+
+    python -m emotiontrackeragent.batch recordings/ -o results.jsonl --concurrency 4 --rate 2
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".webm")
+MAX_TRANSCRIBE_WORKERS = int(os.getenv("BATCH_TRANSCRIBE_WORKERS", "2"))
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def load_items(source):
+    """Yield dicts with "id" and normally "audio" or "text"; `BatchRunner` fails the ones without either."""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            stem, ext = os.path.splitext(name)
+            if ext.lower() in AUDIO_EXTENSIONS:
+                yield {"id": stem, "audio": os.path.abspath(path)}
+            elif ext.lower() == ".txt":
+                with open(path, encoding="utf-8") as f:
+                    yield {"id": stem, "text": f.read()}
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            item.setdefault("id", f"line-{line_no}")
+            if item.get("audio") and not os.path.isabs(item["audio"]):
+                item["audio"] = os.path.join(base, item["audio"])
+            yield item
+
+
+def invalid_reason(item):
+    """Why `item` can't be analyzed (an empty text, no audio path), or None."""
+    if "text" in item:
+        if not isinstance(item["text"], str) or not item["text"].strip():
+            return "empty text"
+    elif "audio" in item:
+        if not isinstance(item["audio"], str) or not item["audio"]:
+            return "empty audio path"
+    else:
+        return "needs 'audio' or 'text'"
+    return None
+
+
+def _read_jsonl(path):
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A killed run can leave a truncated last line; that entry is simply redone
+                pass
+    return records
+
+
+def _init_transcriber(model_size, threads):
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)  # don't let N workers each grab every core
+        except ImportError:
+            pass
+    from .transcription import get_pool
+    get_pool().warm([model_size] if model_size else None)
+
+
+def _transcribe(item_id, audio_path, model_size):
+    from .main import transcribe_audio
+    return item_id, transcribe_audio(audio_path, model_size)
+
+
+class BatchRunner:
+    def __init__(self, output_path, concurrency=4, rate=0.0, transcribe_workers=None, model_size=None, mode=None):
+        self.output_path = output_path
+        self.checkpoint_path = output_path + ".checkpoint"
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate)
+        self.transcribe_workers = transcribe_workers or min(available_cores(), max(1, MAX_TRANSCRIBE_WORKERS))
+        self.model_size = model_size
+        self.mode = mode
+        self._write_lock = threading.Lock()
+        self.stats = {"skipped": 0, "transcribed": 0, "recovered": 0, "completed": 0, "failed": 0}
+
+    def _count(self, name):
+        with self._write_lock:
+            self.stats[name] += 1
+
+    def _append(self, path, record):
+        with self._write_lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def request_id(self, item_id):
+        """Stable store ID of an item: the same on every resume of this output file, distinct across files."""
+        key = f"{os.path.abspath(self.output_path)}\0{item_id}"
+        return "batch-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+
+    def _analyze(self, item, text):
+        from . import main
+        from .journal_store import get_store
+        request_id = self.request_id(item["id"])
+        start = time.perf_counter()
+        entry = get_store().get(request_id)
+        if entry is not None:
+            # Stored by a run that was killed before it wrote the output line: don't analyze or store it again
+            entry["id"] = request_id
+            self._count("recovered")
+        else:
+            self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                entry = main.run(text, request_id=request_id, user_id=item.get("user_id"), mode=self.mode)
+            except Exception as e:
+                self._count("failed")
+                print(f"[batch] {item['id']} failed: {e}", file=sys.stderr)
+                return
+        self._append(self.output_path, {
+            "id": item["id"],
+            "source": item.get("audio"),
+            "text": text,
+            "entry": entry,
+            "seconds": round(time.perf_counter() - start, 3),
+        })
+        self._count("completed")
+
+    def run(self, items):
+        done = {record["id"] for record in _read_jsonl(self.output_path) if "entry" in record}
+        transcripts = {record["id"]: record["text"] for record in _read_jsonl(self.checkpoint_path)}
+
+        pending_text, pending_audio = [], []
+        for item in items:
+            reason = invalid_reason(item)
+            if item["id"] in done:
+                self.stats["skipped"] += 1
+            elif reason:
+                self.stats["failed"] += 1
+                print(f"[batch] {item['id']} failed: {reason}", file=sys.stderr)
+            elif "text" in item:
+                pending_text.append((item, item["text"]))
+            elif item["id"] in transcripts:
+                pending_text.append((item, transcripts[item["id"]]))
+            else:
+                pending_audio.append(item)
+
+        # The semaphore bounds in-flight LLM work so transcripts don't pile up in memory
+        in_flight = threading.BoundedSemaphore(self.concurrency * 2)
+
+        def submit(pool, item, text):
+            in_flight.acquire()
+            future = pool.submit(self._analyze, item, text)
+            future.add_done_callback(lambda _: in_flight.release())
+            return future
+
+        audio_pool = None
+        audio_futures = []
+        if pending_audio:
+            # Start transcribing first so Whisper runs while the text-only entries hit the LLM
+            workers = min(self.transcribe_workers, len(pending_audio))
+            audio_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_transcriber,
+                initargs=(self.model_size, max(1, available_cores() // workers)),
+            )
+            audio_futures = [
+                audio_pool.submit(_transcribe, item["id"], item["audio"], self.model_size)
+                for item in pending_audio
+            ]
+        by_id = {item["id"]: item for item in pending_audio}
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch-llm") as llm_pool:
+                futures = [submit(llm_pool, item, text) for item, text in pending_text]
+                for future in as_completed(audio_futures):
+                    try:
+                        item_id, text = future.result()
+                    except Exception as e:
+                        self._count("failed")
+                        print(f"[batch] transcription failed: {e}", file=sys.stderr)
+                        continue
+                    self._append(self.checkpoint_path, {"id": item_id, "text": text})
+                    self._count("transcribed")
+                    futures.append(submit(llm_pool, by_id[item_id], text))
+
+                for future in futures:
+                    future.result()
+        finally:
+            if audio_pool is not None:
+                audio_pool.shutdown(wait=True, cancel_futures=True)
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="directory of audio/.txt files, or a JSON-lines manifest")
+    parser.add_argument("-o", "--output", required=True, help="JSON-lines file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=4, help="max LLM pipelines running at once")
+    parser.add_argument("--rate", type=float, default=0.0, help="max pipelines started per second (0 = unlimited)")
+    parser.add_argument("--transcribe-workers", type=int, default=None,
+                        help="transcription processes, each with its own Whisper model "
+                             "(default: BATCH_TRANSCRIBE_WORKERS, 2, or fewer cores)")
+    parser.add_argument("--model-size", default=None, help="Whisper model size (default: WHISPER_MODEL)")
+    parser.add_argument("--mode", choices=["crew", "fast"], default=None, help="pipeline mode (default: MOOD_PIPELINE_MODE)")
+    args = parser.parse_args()
+
+    runner = BatchRunner(
+        args.output,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        transcribe_workers=args.transcribe_workers,
+        model_size=args.model_size,
+        mode=args.mode,
+    )
+    start = time.perf_counter()
+    stats = runner.run(list(load_items(args.source)))
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(stats))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Per-request checkpoints of each pipeline stage, so a failed or changed step can be rerun alone.
+
+For every request (keyed by its request/entry ID) the store keeps:
+
+    transcript  the journal text that entered the pipeline (typed, or Whisper's
+                transcript) with its mode, user and recalled history
+    task1..3    each crew task's raw output: mood, reflections, the logger's JSON
+
+`replay <request-id> --from-task N` (the console script) resumes from task N
+using the stored transcript and earlier outputs, so neither Whisper nor the
+earlier agents run again. Checkpoints live in CHECKPOINT_DB (logs/checkpoints.db) and
+are dropped after CHECKPOINT_TTL_DAYS (30). CHECKPOINTS=0 turns them off.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = os.getenv("CHECKPOINT_DB", os.path.join("logs", "checkpoints.db"))
+CHECKPOINT_TTL_DAYS = float(os.getenv("CHECKPOINT_TTL_DAYS", "30"))
+TRANSCRIPT = "transcript"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    request_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (request_id, stage)
+);
+CREATE INDEX IF NOT EXISTS checkpoints_age ON checkpoints (stored_at);
+"""
+
+
+def checkpoints_enabled():
+    return os.getenv("CHECKPOINTS", "1").lower() not in ("0", "false", "no", "off")
+
+
+def task_stage(number):
+    """Stage name of crew task `number` (1-based)."""
+    return f"task{number}"
+
+
+class CheckpointStore:
+    """Stage outputs per request in SQLite (WAL mode); saving a stage again replaces it."""
+
+    def __init__(self, path=None, ttl_seconds=CHECKPOINT_TTL_DAYS * 24 * 3600):
+        self.path = path or DEFAULT_CHECKPOINT_PATH
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self.prune()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, request_id, stage, value):
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO checkpoints (request_id, stage, stored_at, value) VALUES (?, ?, ?, ?)",
+                         (request_id, stage, time.time(), json.dumps(value)))
+
+    def load(self, request_id):
+        """{stage: value} of everything stored for the request ({} if nothing is)."""
+        rows = self._connect().execute("SELECT stage, value FROM checkpoints WHERE request_id = ?", (request_id,))
+        return {stage: json.loads(value) for stage, value in rows}
+
+    def request_ids(self, limit=None):
+        """Requests with a stored transcript, oldest first."""
+        query = "SELECT request_id FROM checkpoints WHERE stage = ? ORDER BY stored_at"
+        params = [TRANSCRIPT]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return [row[0] for row in self._connect().execute(query, params)]
+
+    def prune(self):
+        if self.ttl_seconds:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM checkpoints WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoints():
+    """Process-wide checkpoint store at CHECKPOINT_DB."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CheckpointStore()
+    return _store
+
+
+def save_checkpoint(request_id, stage, value):
+    """Checkpoint one stage; a failed write is logged, since the request itself can still succeed."""
+    if not checkpoints_enabled() or request_id is None:
+        return
+    try:
+        get_checkpoints().save(request_id, stage, value)
+    except sqlite3.Error:
+        logger.warning("Could not checkpoint %s of request %s", stage, request_id, exc_info=True)
@@ -1,64 +1,114 @@
-from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
-from crewai.agents.agent_builder.base_agent import BaseAgent
-from typing import List
-# If you want to run a snippet of code before or after the crew starts,
-# you can use the @before_kickoff and @after_kickoff decorators
-# https://docs.crewai.com/concepts/crews#example-crew-class-with-decorators
-
-@CrewBase
-class Resumeagent():
-    """Resumeagent crew"""
-
-    agents: List[BaseAgent]
-    tasks: List[Task]
-
-    # Learn more about YAML configuration files here:
-    # Agents: https://docs.crewai.com/concepts/agents#yaml-configuration-recommended
-    # Tasks: https://docs.crewai.com/concepts/tasks#yaml-configuration-recommended
-    
-    # If you would like to add tools to your agents, you can learn more about it here:
-    # https://docs.crewai.com/concepts/agents#agent-tools
-    @agent
-    def researcher(self) -> Agent:
-        return Agent(
-            config=self.agents_config['researcher'], # type: ignore[index]
-            verbose=True
-        )
-
-    @agent
-    def reporting_analyst(self) -> Agent:
-        return Agent(
-            config=self.agents_config['reporting_analyst'], # type: ignore[index]
-            verbose=True
-        )
-
-    # To learn more about structured task outputs,
-    # task dependencies, and task callbacks, check out the documentation:
-    # https://docs.crewai.com/concepts/tasks#overview-of-a-task
-    @task
-    def research_task(self) -> Task:
-        return Task(
-            config=self.tasks_config['research_task'], # type: ignore[index]
-        )
-
-    @task
-    def reporting_task(self) -> Task:
-        return Task(
-            config=self.tasks_config['reporting_task'], # type: ignore[index]
-            output_file='report.md'
-        )
-
-    @crew
-    def crew(self) -> Crew:
-        """Creates the Resumeagent crew"""
-        # To learn how to add knowledge sources to your crew, check out the documentation:
-        # https://docs.crewai.com/concepts/knowledge#what-is-knowledge
-
-        return Crew(
-            agents=self.agents, # Automatically created by the @agent decorator
-            tasks=self.tasks, # Automatically created by the @task decorator
-            process=Process.sequential,
-            verbose=True,
-            # process=Process.hierarchical, # In case you wanna use that instead https://docs.crewai.com/how-to/Hierarchical/
-        )
+"""The mood crew, defined in config/agents.yaml and config/tasks.yaml.
+
+The YAML is read and checked once into a CrewTemplate: read-only agent and
+task specs. Each request instantiates its own Agents, Tasks and Crew from
+the template. CrewAI agents and tasks keep per-run state (executors, task
+outputs), so concurrent runs must not share them. Only the LLM clients and
+tools passed in are shared, and those are thread-safe.
+"""
+import os
+import threading
+from types import MappingProxyType
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config")
+AGENT_FIELDS = ("role", "goal", "backstory")
+TASK_FIELDS = ("agent", "description", "expected_output")
+
+
+def _load_yaml(path):
+    import yaml
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+class CrewTemplate:
+    """Agent and task specs of a sequential crew, validated up front and immutable afterwards."""
+
+    def __init__(self, agents, tasks):
+        self.agents = MappingProxyType({
+            name: MappingProxyType({key: str(value).strip() for key, value in spec.items()})
+            for name, spec in agents.items()
+        })
+        specs = []
+        seen = set()
+        for name, spec in tasks.items():
+            missing = [key for key in TASK_FIELDS if not spec.get(key)]
+            if missing:
+                raise ValueError(f"Task '{name}' is missing {', '.join(missing)}")
+            if spec["agent"] not in self.agents:
+                raise ValueError(f"Task '{name}' uses unknown agent '{spec['agent']}'")
+            context = tuple(spec.get("context") or ())
+            unknown = [dep for dep in context if dep not in seen]
+            if unknown:
+                raise ValueError(f"Task '{name}' has context {unknown} that doesn't run before it")
+            specs.append(MappingProxyType({
+                "name": name,
+                "agent": spec["agent"],
+                "description": spec["description"].strip(),
+                "expected_output": spec["expected_output"].strip(),
+                "context": context,
+            }))
+            seen.add(name)
+        for name, spec in self.agents.items():
+            missing = [key for key in AGENT_FIELDS if not spec.get(key)]
+            if missing:
+                raise ValueError(f"Agent '{name}' is missing {', '.join(missing)}")
+        self.tasks = tuple(specs)
+
+    @classmethod
+    def from_config(cls, config_dir=CONFIG_DIR):
+        return cls(_load_yaml(os.path.join(config_dir, "agents.yaml")),
+                   _load_yaml(os.path.join(config_dir, "tasks.yaml")))
+
+    @property
+    def agent_names(self):
+        return tuple(self.agents)
+
+    def fingerprint(self):
+        """Plain-data copy of every prompt, for cache keys."""
+        return [{name: dict(spec) for name, spec in self.agents.items()},
+                [dict(spec, context=list(spec["context"])) for spec in self.tasks]]
+
+    def instantiate(self, llm_for, tools_for=None, start=1, outputs=(), on_output=None, **agent_kwargs):
+        """A new Crew for one request; `llm_for(name)` and `tools_for(name)` supply each agent's LLM and tools.
+
+        The crew runs tasks `start`, `start + 1`, ... (1-based); earlier tasks don't run but pass their
+        raw `outputs` on as context, e.g. checkpointed ones. `on_output(number, raw)` is called as each
+        task finishes.
+        """
+        from crewai import Agent, Crew, Task
+        from crewai.tasks.task_output import TaskOutput
+        if not 1 <= start <= len(self.tasks) or len(outputs) < start - 1:
+            raise ValueError(f"Can't start at task {start} of {len(self.tasks)} with {len(outputs)} earlier outputs")
+        agents = {
+            name: Agent(llm=llm_for(name), tools=tools_for(name) if tools_for else [], **spec, **agent_kwargs)
+            for name, spec in self.agents.items()
+        }
+        tasks = {}
+        for number, spec in enumerate(self.tasks, 1):
+            task = tasks[spec["name"]] = Task(
+                agent=agents[spec["agent"]],
+                description=spec["description"],
+                expected_output=spec["expected_output"],
+                context=[tasks[name] for name in spec["context"]],
+                callback=(lambda output, number=number: on_output(number, output.raw)) if on_output else None,
+            )
+            if number < start:
+                task.output = TaskOutput(description=spec["description"], raw=outputs[number - 1],
+                                         agent=agents[spec["agent"]].role)
+        running = list(tasks.values())[start - 1:]
+        return Crew(agents=list({id(task.agent): task.agent for task in running}.values()), tasks=running)
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_template():
+    """The mood crew template from config/, loaded on first use."""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = CrewTemplate.from_config()
+    return _template
@@ -0,0 +1,59 @@
+import json
+
+from .output_parser import parse_text
+from .tracing import span
+
+
+# One schema-constrained call that does the work of the mood, coach and logger agents
+FAST_SYSTEM_PROMPT = (
+    "You are a compassionate journaling assistant. Read the user's journal entry, detect its "
+    "emotional tone, and write 2-3 personalized, introspective reflection prompts that encourage "
+    "the user to explore that emotion. Respond with a single JSON object and nothing else."
+)
+
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "mood": {"type": "string", "description": "Single-word mood label, e.g. 'anxious'"},
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+        "reflections": {
+            "type": "array",
+            "minItems": 2,
+            "maxItems": 3,
+            "items": {
+                "type": "object",
+                "properties": {"prompt": {"type": "string"}, "response": {"type": "string"}},
+                "required": ["prompt"],
+            },
+        },
+    },
+    "required": ["mood", "confidence", "reflections"],
+}
+
+
+def build_messages(journal_text, history=""):
+    # History goes after the static schema, so the cacheable prefix stays the same for every entry
+    return [
+        {"role": "system", "content": FAST_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": "JSON schema for your answer:\n" + json.dumps(RESPONSE_SCHEMA)
+            + history + "\n\nJournal entry:\n" + journal_text,
+        },
+    ]
+
+
+def parse_response(text):
+    """Turn the model's JSON answer into the entry shape the app expects."""
+    if not isinstance(text, str):
+        text = json.dumps(text)
+    entry = parse_text(text).to_dict()
+    del entry["date"]
+    return entry
+
+
+def analyze_fast(journal_text, llm, history=""):
+    """Single LLM round trip returning mood, confidence and reflections."""
+    response = llm.call(build_messages(journal_text, history))
+    with span("parse"):
+        return parse_response(response)
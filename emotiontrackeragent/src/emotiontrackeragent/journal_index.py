@@ -0,0 +1,322 @@
+"""In-memory search indexes over the journal store, for the agents' journal-search tool.
+
+Each user's entries are loaded from the store once and kept as:
+
+- a date index: entry dates (ordinals) in sorted order, for range queries by bisection;
+- a mood index: the same, per mood;
+- an inverted index: word -> rows containing it (stopwords left out).
+
+Queries slice and intersect these instead of reading stored JSON, and return
+compact rows (date, mood, confidence and a short snippet of the text), so a
+tool call costs well under a millisecond and a few dozen tokens per entry.
+Like analytics.py, indexes pick up rows written by other processes on the
+next query and are updated in place by `record` for entries stored here.
+
+The agents don't know who they are talking to, so the tool searches the
+entries of whichever user `user_scope` has set for the current context.
+Without a user there is nothing to search: indexes are only ever per user,
+never over everyone's entries.
+"""
+import array
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+from datetime import date as Date, timedelta
+
+import numpy as np
+
+from .analytics import SYNC_INTERVAL_SECONDS, SYNC_OVERLAP_SECONDS, _confidence, _day, _mood
+from .journal_store import get_store
+from .memory_index import STOPWORDS
+from .preclassifier import tokenize
+
+SNIPPET_CHARS = 80
+TREND_POINTS = 12
+
+_current_user = contextvars.ContextVar("journal_user", default=None)
+
+
+@contextlib.contextmanager
+def user_scope(user_id):
+    """Make `user_id` the user whose journal the search tool sees in this context."""
+    token = _current_user.set(user_id)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+def current_user():
+    return _current_user.get()
+
+
+def _terms(text):
+    return [token for token in tokenize(text) if token not in STOPWORDS]
+
+
+def _snippet(text):
+    text = " ".join((text or "").split())
+    if len(text) <= SNIPPET_CHARS:
+        return text
+    return text[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+
+
+def _ordinal(value):
+    return Date.fromisoformat(value).toordinal() if value else None
+
+
+class SortedRows:
+    """Rows kept in date order: parallel sorted ordinals and row numbers, sliced by bisection."""
+
+    def __init__(self):
+        self.days = array.array("i")
+        self.rows = array.array("i")
+
+    def add(self, day, row):
+        # Entries almost always arrive in date order, so this is an append
+        at = len(self.days) if not self.days or day >= self.days[-1] else bisect.bisect_right(self.days, day)
+        self.days.insert(at, day)
+        self.rows.insert(at, row)
+
+    def between(self, first=None, last=None):
+        lo = 0 if first is None else bisect.bisect_left(self.days, first)
+        hi = len(self.days) if last is None else bisect.bisect_right(self.days, last)
+        return self.rows[lo:hi]
+
+
+class JournalIndex:
+    """One user's entries with date, mood and word indexes."""
+
+    def __init__(self):
+        self.ids = []
+        self.days = array.array("i")
+        self.moods = []
+        self.mood_codes = array.array("i")
+        self._codes = {}
+        self.confidence = array.array("f")
+        self.snippets = []
+        self.by_date = SortedRows()
+        self.by_mood = {}
+        self.postings = {}
+        self._seen = set()
+        self._lock = threading.Lock()
+        self.last_created_at = 0.0
+        self.synced_at = 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, entry, entry_id=None, text=None, created_at=None):
+        """Index one stored entry; returns False if it was already indexed."""
+        terms = set(_terms(text or ""))
+        with self._lock:
+            return self._add(entry, entry_id, text, created_at, terms)
+
+    def _add(self, entry, entry_id, text, created_at, terms):
+        if entry_id is not None:
+            if entry_id in self._seen:
+                return False
+            self._seen.add(entry_id)
+        row = len(self.ids)
+        day = _day(entry, created_at)
+        mood = _mood(entry)
+        self.ids.append(entry_id)
+        self.days.append(day)
+        self.moods.append(mood)
+        self.mood_codes.append(self._codes.setdefault(mood, len(self._codes)))
+        self.confidence.append(_confidence(entry))
+        self.snippets.append(_snippet(text))
+        self.by_date.add(day, row)
+        self.by_mood.setdefault(mood, SortedRows()).add(day, row)
+        for term in terms:
+            self.postings.setdefault(term, array.array("i")).append(row)
+        if created_at is not None:
+            self.last_created_at = max(self.last_created_at, created_at)
+        return True
+
+    def _range(self, mood=None, date_from=None, date_to=None):
+        """Rows in the inclusive date range (and with the mood, if given), oldest first."""
+        first, last = _ordinal(date_from), _ordinal(date_to)
+        with self._lock:
+            if mood is not None:
+                rows = self.by_mood.get(mood.strip().lower())
+                return rows.between(first, last) if rows else array.array("i")
+            return self.by_date.between(first, last)
+
+    def row(self, row):
+        return {"date": Date.fromordinal(self.days[row]).isoformat(), "mood": self.moods[row],
+                "confidence": round(self.confidence[row], 2), "text": self.snippets[row]}
+
+    def entries(self, mood=None, date_from=None, date_to=None, limit=5):
+        """Most recent entries in the range, newest first, plus how many matched in total."""
+        rows = self._range(mood, date_from, date_to)
+        return {"matches": len(rows), "entries": [self.row(row) for row in reversed(rows[-limit:])]}
+
+    def trend(self, mood=None, date_from=None, date_to=None, points=TREND_POINTS):
+        """Average confidence over time, in at most `points` equal date buckets, with a linear slope per week."""
+        rows = np.array(self._range(mood, date_from, date_to), dtype=np.int32)
+        if not len(rows):
+            return {"matches": 0, "points": [], "slope_per_week": None}
+        with self._lock:
+            days = np.array(self.days, dtype=np.int32)[rows]
+            values = np.array(self.confidence, dtype=np.float64)[rows]
+        first = int(days[0])
+        width = max(1, -(-(int(days[-1]) - first + 1) // points))
+        buckets = (days - first) // width
+        totals, counts = np.bincount(buckets, weights=values), np.bincount(buckets)
+        result = [[Date.fromordinal(first + int(bucket) * width).isoformat(),
+                   round(float(totals[bucket] / counts[bucket]), 2), int(counts[bucket])]
+                  for bucket in np.flatnonzero(counts)]
+        # Least-squares slope of confidence against day, scaled to a week
+        offsets = days - days.mean()
+        spread = float(offsets @ offsets)
+        slope = float(offsets @ (values - values.mean())) / spread if spread else 0.0
+        return {"matches": len(rows), "average": round(float(values.mean()), 2), "slope_per_week": round(slope * 7, 3),
+                "points": result}
+
+    def search(self, query, mood=None, date_from=None, date_to=None, limit=5):
+        """Entries containing every query word, newest first.
+
+        If no entry has all of them, entries are ranked by how many they contain instead.
+        """
+        terms = list(dict.fromkeys(_terms(query)))
+        with self._lock:
+            # Copies, not views: add() can't grow an array.array that numpy still points into
+            postings = [np.array(self.postings[term], dtype=np.int32) for term in terms if term in self.postings]
+            days = np.array(self.days, dtype=np.int32)
+            codes = np.array(self.mood_codes, dtype=np.int32)
+        if not postings:
+            return {"matches": 0, "entries": []}
+        if len(postings) == len(terms):
+            # Postings are sorted row lists, so intersecting them (rarest first) is a merge in C
+            postings.sort(key=len)
+            hits = postings[0]
+            for rows in postings[1:]:
+                hits = np.intersect1d(hits, rows, assume_unique=True)
+            hits = self._filter(hits, days, codes, mood, date_from, date_to)
+        else:
+            hits = postings[0][:0]  # some word was never used, so no entry has them all
+        if len(hits):
+            ranked = hits[np.lexsort((hits, days[hits]))[::-1][:limit]]
+            return {"matches": len(hits), "match": "all", "entries": [self.row(int(row)) for row in ranked]}
+        rows, counts = np.unique(np.concatenate(postings), return_counts=True)
+        keep = np.isin(rows, self._filter(rows, days, codes, mood, date_from, date_to), assume_unique=True)
+        rows, counts = rows[keep], counts[keep]
+        ranked = rows[np.lexsort((rows, days[rows], counts))[::-1][:limit]]
+        return {"matches": len(rows), "match": "any", "entries": [self.row(int(row)) for row in ranked]}
+
+    def _filter(self, rows, days, codes, mood=None, date_from=None, date_to=None):
+        """The given rows (a sorted array) that have the mood and fall in the inclusive date range."""
+        if mood is not None:
+            code = self._codes.get(mood.strip().lower())
+            if code is None:
+                return rows[:0]
+            rows = rows[codes[rows] == code]
+        if date_from is not None:
+            rows = rows[days[rows] >= _ordinal(date_from)]
+        if date_to is not None:
+            rows = rows[days[rows] <= _ordinal(date_to)]
+        return rows
+
+
+class JournalIndexes:
+    """Per-user JournalIndex objects, loaded from the store once and then kept current (see MoodAnalytics)."""
+
+    def __init__(self, store=None):
+        self._store = store
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    def _sync(self, index, user_id, since=None):
+        for row in self.store.list_entries(user_id=user_id, created_after=since):
+            index.add(row["entry"], entry_id=row["id"], text=row["text"], created_at=row["created_at"])
+        index.synced_at = time.monotonic()
+
+    def index(self, user_id):
+        """The user's JournalIndex. There is no index across users, so user_id is required."""
+        if user_id is None:
+            raise ValueError("Journal indexes are per user; no user given")
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                index = self._indexes[user_id] = JournalIndex()
+                self._sync(index, user_id)
+            elif time.monotonic() - index.synced_at > SYNC_INTERVAL_SECONDS:
+                self._sync(index, user_id, since=index.last_created_at - SYNC_OVERLAP_SECONDS)
+            return index
+
+    def record(self, entry, entry_id=None, user_id=None, text=None, created_at=None):
+        """Index a just-stored entry in its user's index, if that is loaded."""
+        if user_id is None:
+            return
+        created_at = time.time() if created_at is None else created_at
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                index.add(entry, entry_id=entry_id, text=text, created_at=created_at)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+def date_window(days=None, date_from=None, date_to=None, today=None):
+    """(date_from, date_to) as ISO strings, with `days` meaning the last N days up to today."""
+    if days:
+        today = Date.fromisoformat(today) if today else Date.today()
+        return (today - timedelta(days=int(days) - 1)).isoformat(), today.isoformat()
+    return date_from, date_to
+
+
+def _entry_lines(result):
+    return "\n".join(f"{row['date']} {row['mood']} {row['confidence']:.2f} | {row['text']}"
+                     for row in result["entries"])
+
+
+def answer(index, action, query=None, mood=None, days=None, date_from=None, date_to=None, limit=5):
+    """One journal-search tool call as the short text the agent gets back (one line per entry or point)."""
+    try:
+        date_from, date_to = date_window(days, date_from, date_to)
+        limit = min(max(int(limit), 1), 10)
+        if action == "trend":
+            result = index.trend(mood, date_from, date_to)
+            if not result["matches"]:
+                return "No matching entries."
+            points = "\n".join(f"{day} {value:.2f} ({count})" for day, value, count in result["points"])
+            return (f"{result['matches']} entries, average confidence {result['average']:.2f}, "
+                    f"slope {result['slope_per_week']:+.3f}/week\n{points}")
+        if action == "search":
+            if not query:
+                return "Give the words to search for in `query`."
+            result = index.search(query, mood, date_from, date_to, limit)
+        elif action == "entries":
+            result = index.entries(mood, date_from, date_to, limit)
+        else:
+            return f"Unknown action {action!r}; use 'entries', 'trend' or 'search'."
+    except ValueError as e:
+        # Bad dates or numbers: tell the agent instead of failing its task
+        return f"Invalid arguments: {e}"
+    if not result["entries"]:
+        return "No matching entries."
+    order = "closest first (none has every word)" if result.get("match") == "any" else "newest first"
+    return f"{len(result['entries'])} of {result['matches']} matching entries, {order}:\n" + _entry_lines(result)
+
+
+_indexes = None
+_indexes_lock = threading.Lock()
+
+
+def get_journal_indexes():
+    """Process-wide indexes over the default journal store."""
+    global _indexes
+    if _indexes is None:
+        with _indexes_lock:
+            if _indexes is None:
+                _indexes = JournalIndexes()
+    return _indexes
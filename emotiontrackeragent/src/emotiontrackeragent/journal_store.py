@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+DEFAULT_DB_PATH = os.getenv("JOURNAL_DB", os.path.join("logs", "journal.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    date TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    entry TEXT NOT NULL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_user_date ON entries (user_id, date);
+"""
+
+
+class JournalStore:
+    """Append-only journal entries in SQLite (WAL mode), keyed by request ID.
+
+    Each request gets its own row, so concurrent users never overwrite or
+    read each other's entry, and an append never rewrites earlier entries.
+    Lookup by ID goes through the primary key index.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_DB_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "text" not in columns:
+                # Stores created before the input text was kept
+                conn.execute("ALTER TABLE entries ADD COLUMN text TEXT")
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, entry, entry_id=None, user_id=None, text=None):
+        """Store a new entry (and the journal text it came from) and return its ID.
+
+        Existing IDs are never overwritten.
+        """
+        entry_id = entry_id or uuid.uuid4().hex
+        date = entry.get("date") or time.strftime("%Y-%m-%d")
+        conn = self._connect()
+        with conn:  # one transaction, committed atomically
+            conn.execute(
+                "INSERT INTO entries (id, user_id, date, created_at, entry, text) VALUES (?, ?, ?, ?, ?, ?)",
+                (entry_id, user_id, date, time.time(), json.dumps(entry), text),
+            )
+        return entry_id
+
+    def get(self, entry_id):
+        row = self._connect().execute("SELECT entry FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, entry_ids):
+        """{id: row} for the given IDs (rows shaped as in `list_entries`); missing IDs are left out."""
+        entry_ids = list(entry_ids)
+        if not entry_ids:
+            return {}
+        query = ("SELECT id, user_id, date, created_at, entry, text FROM entries WHERE id IN (%s)"
+                 % ",".join("?" * len(entry_ids)))
+        return {
+            row[0]: {"id": row[0], "user_id": row[1], "date": row[2], "created_at": row[3],
+                     "entry": json.loads(row[4]), "text": row[5]}
+            for row in self._connect().execute(query, entry_ids)
+        }
+
+    def list_entries(self, user_id=None, date_from=None, date_to=None, limit=None, created_after=None):
+        """Entries in insertion order, optionally filtered by user, inclusive date range and creation time."""
+        query = "SELECT id, user_id, date, created_at, entry, text FROM entries WHERE 1=1"
+        params = []
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        if date_from is not None:
+            query += " AND date >= ?"
+            params.append(date_from)
+        if date_to is not None:
+            query += " AND date <= ?"
+            params.append(date_to)
+        if created_after is not None:
+            query += " AND created_at > ?"
+            params.append(created_after)
+        query += " ORDER BY created_at"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return [
+            {"id": row[0], "user_id": row[1], "date": row[2], "created_at": row[3], "entry": json.loads(row[4]),
+             "text": row[5]}
+            for row in self._connect().execute(query, params)
+        ]
+
+    def latest(self, user_id=None):
+        query = "SELECT entry FROM entries"
+        params = []
+        if user_id is not None:
+            query += " WHERE user_id = ?"
+            params.append(user_id)
+        row = self._connect().execute(query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self, user_id=None):
+        if user_id is None:
+            return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return self._connect().execute("SELECT COUNT(*) FROM entries WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide store at JOURNAL_DB (logs/journal.db by default)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JournalStore()
+    return _store
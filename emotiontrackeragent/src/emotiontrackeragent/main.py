@@ -1,217 +1,487 @@
 #!/usr/bin/env python
+import contextvars
+import logging
 import sys
+import threading
+import uuid
 import warnings
 from datetime import datetime
-from crewai import Agent, Task, Crew, LLM
 from dotenv import load_dotenv
-import json
 import os
-import whisper
+from . import fast_path
+from .checkpoints import TRANSCRIPT, get_checkpoints, save_checkpoint, task_stage
+from .crew import get_template
+from .journal_index import current_user, get_journal_indexes, user_scope
+from .journal_store import get_store
+from .memory_index import format_recalled, get_memory, memory_enabled
+from .output_parser import parse_crew_output, parse_text
+from .preclassifier import preclassify
+from .progress import STREAMED_AGENTS, emit, install_provider_streaming, listen
+from .resilient_llm import LLMUnavailable, resilient_from_env
+from .result_cache import cache_enabled, entry_key, get_cache, transcript_key
+from .token_budget import (INPUT_BUDGET_STRATEGY, MAX_INPUT_TOKENS, MeteredLLM, Usage, current_usage,
+                           estimate_tokens, fit_to_budget, reporting_llm, track_usage)
+from .tracing import span, trace
+from .transcription import DEFAULT_MODEL_SIZE, get_pool, preprocess_audio, transcribe_stream
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# crewai, litellm and whisper are heavy to import, so nothing below touches
+# them until the first request actually needs an LLM or a model.
+_llm = None
+_stream_llm = None
+_fast_llm = None
+_agent_llms = {}
+_init_lock = threading.Lock()
+
+LLM_TEMPERATURE = 0.7
+PIPELINE_MODES = ("crew", "fast")
+HISTORY_HEADER = "\n\nThe user's related past journal entries (refer to them only where they help):\n"
+
+
+class PipelineError(Exception):
+    """Raised by run(); the original error is chained as __cause__."""
+
+
+def transcribe_audio(audio, model_size=None):
+    """Transcript of a file path or of an upload's raw bytes."""
+    model_size = model_size or DEFAULT_MODEL_SIZE  # WHISPER_MODEL picks the default size
+
+    def compute():
+        # Decoded once in memory (no ffmpeg for WAV), silence trimmed, length capped
+        samples = preprocess_audio(audio)
+        return get_pool().transcribe(samples, size=model_size)["text"] if len(samples) else ""
+
+    with span("transcribe", model_size=model_size):
+        if not cache_enabled():
+            return compute()
+        # Same audio bytes + model size -> same transcript, so repeats skip decoding and Whisper entirely.
+        # Otherwise the model stays warm in the process-wide pool, so only the first call pays the load.
+        return get_cache("transcripts").get_or_compute(transcript_key(audio, model_size), compute)
+
 
-def transcribe_audio(audio_path):
-    model = whisper.load_model("medium")  # Or use "small", "medium" if you want better quality
-    result = model.transcribe(audio_path)
-    return result["text"]
 #LLM
-llm = LLM(
-    provider="gemini",  # Use Gemini directly, not through LangChain
-    model=os.getenv("MODEL", "gemini-1.5-flash"),
-    api_key=os.getenv("GEMINI_API_KEY"),
-    temperature=0.7
-)
-# Agents
-mood_agent = Agent(
-    role="Mood Detector",
-    goal="Understand user's emotional tone from journal input",
-    backstory="A compassionate AI designed to detect and understand human emotions based on journal text.",
-    llm=llm  # Changed from mood_llm
-)
-
-coach_agent = Agent(
-    role="Reflection Coach",
-    goal="Encourage user to explore their emotions",
-    backstory="A thoughtful AI that guides users through introspection and emotional growth.",
-    llm=llm  # Changed from coach_llm
-)
-
-logger_agent = Agent(
-    role="Journal Logger",
-    goal="Format and log mood + reflection as structured JSON",
-    backstory="A helpful assistant that securely logs emotional reflections for personal growth.",
-    llm=llm  # Changed from logger_llm
-)
-
-audio_path = "meme.wav"
-text = transcribe_audio(audio_path)
-
-# Tasks
-task1 = Task(
-    agent=mood_agent,
-    description="Analyze the user's journal input and detect emotional tone.",
-    expected_output="Mood label (e.g., 'anxious') and confidence score.",
-    input=text
-)
-
-task2 = Task(
-    agent=coach_agent,
-    description="Based on the detected mood, ask the user personalized reflection questions.",
-    expected_output="A list of 2–3 introspective prompts encouraging emotional reflection.",
-    depends_on=[task1]
-)
-
-task3 = Task(
-    agent=logger_agent,
-    description="Take the detected mood and user responses to create a structured journal entry.",
-    expected_output="A JSON-formatted journal entry containing mood, confidence, and reflections.",
-    depends_on=[task2]
-)
-
-
-def run(journal_text):
-    try:
-        crew = Crew(
-            agents=[mood_agent, coach_agent, logger_agent],
-            tasks=[task1, task2, task3]
+def _provider_llm(model=None, **kwargs):
+    if os.getenv("MOOD_LLM") == "stub":
+        # Offline deterministic stand-in for benchmarks and load tests
+        from .stub_llm import StubLLM
+        return StubLLM(temperature=LLM_TEMPERATURE)
+    if kwargs.get("stream"):
+        install_provider_streaming()
+    # The provider call itself is cut off at the deadline too, not just abandoned by the wrapper
+    timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+    if os.getenv("LLM_BASE_URL"):
+        # Any OpenAI-compatible endpoint, e.g. benchmarks/fake_llm_server.py
+        return reporting_llm(
+            model=model or os.getenv("MODEL", "openai/fake"),
+            base_url=os.getenv("LLM_BASE_URL"),
+            api_key=os.getenv("LLM_API_KEY", "unused"),
+            temperature=LLM_TEMPERATURE,
+            timeout=timeout,
+            **kwargs
         )
-        output = crew.kickoff()
-        print(output)
-        
-        # Extract the JSON data from the raw output
-        formatted_output = {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "mood": "Unknown",
-            "confidence": 0.5,
-            "reflections": []
-        }
-        
-        # Check if we have output data
-        if hasattr(output, 'dict') and callable(output.dict):
-            output_dict = output.dict()
-            
-            # Try to extract the journal entry from the raw field
-            if 'raw' in output_dict and output_dict['raw']:
-                try:
-                    # The raw field contains a JSON string with markdown code blocks
-                    raw_text = output_dict['raw']
-                    # Extract JSON from markdown code block if present
-                    if '```json' in raw_text and '```' in raw_text.split('```json', 1)[1]:
-                        json_text = raw_text.split('```json', 1)[1].split('```', 1)[0].strip()
-                        journal_data = json.loads(json_text)
-                        
-                        # Update the formatted output with the extracted data
-                        #if 'date' in journal_data:
-                            #formatted_output['date'] = journal_data['date']
-                        if 'mood' in journal_data:
-                            formatted_output['mood'] = journal_data['mood']
-                        if 'confidence' in journal_data:
-                            formatted_output['confidence'] = journal_data['confidence']
-                        if 'reflections' in journal_data:
-                            # Handle different reflection formats
-                            if isinstance(journal_data['reflections'], dict):
-                                # Convert dict to list of prompt/response pairs
-                                reflections_list = []
-                                for key, value in journal_data['reflections'].items():
-                                    if isinstance(value, dict):
-                                        # Handle nested dict
-                                        sub_reflections = []
-                                        for sub_key, sub_value in value.items():
-                                            sub_reflections.append({
-                                                "prompt": sub_key,
-                                                "response": sub_value
-                                            })
-                                        reflections_list.append({
-                                            "prompt": key,
-                                            "response": sub_reflections
-                                        })
-                                    else:
-                                        reflections_list.append({
-                                            "prompt": key,
-                                            "response": value
-                                        })
-                                formatted_output['reflections'] = reflections_list
-                            elif isinstance(journal_data['reflections'], list):
-                                formatted_output['reflections'] = journal_data['reflections']
-                except Exception as e:
-                    print(f"Error parsing raw JSON: {e}")
-            
-            # If we still don't have reflections, try the tasks output
-            if not formatted_output['reflections'] and 'tasks_output' in output_dict:
-                if len(output_dict['tasks_output']) >= 3:
-                    task3_output = output_dict['tasks_output'][2]
-                    if 'raw' in task3_output:
-                        try:
-                            raw_text = task3_output['raw']
-                            if '```json' in raw_text and '```' in raw_text.split('```json', 1)[1]:
-                                json_text = raw_text.split('```json', 1)[1].split('```', 1)[0].strip()
-                                journal_data = json.loads(json_text)
-                                
-                                # Update formatted output if needed
-                                if 'date' in journal_data and formatted_output['date'] == datetime.now().strftime("%Y-%m-%d"):
-                                    pass
-                                    #formatted_output['date'] = journal_data['date']
-                                if 'mood' in journal_data and formatted_output['mood'] == "Unknown":
-                                    formatted_output['mood'] = journal_data['mood']
-                                if 'confidence' in journal_data and formatted_output['confidence'] == 0.5:
-                                    formatted_output['confidence'] = journal_data['confidence']
-                                
-                                # Format reflections
-                                if 'reflections' in journal_data:
-                                    if isinstance(journal_data['reflections'], dict):
-                                        # Convert to list format expected by the UI
-                                        reflections_list = []
-                                        for key, value in journal_data['reflections'].items():
-                                            if isinstance(value, dict):
-                                                detail = f"{key}:\n"
-                                                for sub_key, sub_value in value.items():
-                                                    if sub_key != 'reason':  # Skip reason keys as they're handled with their pairs
-                                                        reason = value.get(f"reason", "")
-                                                        detail += f"- {sub_key}: {sub_value}\n"
-                                                        if reason:
-                                                            detail += f"  Reason: {reason}\n"
-                                                reflections_list.append({
-                                                    "prompt": key,
-                                                    "response": detail.strip()
-                                                })
-                                            else:
-                                                reflections_list.append({
-                                                    "prompt": key,
-                                                    "response": value
-                                                })
-                                        formatted_output['reflections'] = reflections_list
-                                    elif isinstance(journal_data['reflections'], list):
-                                        formatted_output['reflections'] = journal_data['reflections']
-                        except Exception as e:
-                            print(f"Error parsing task output JSON: {e}")
-        
-        # Save the formatted output
-        os.makedirs("logs", exist_ok=True)
-        # Force use of current system date
-        formatted_output['date'] = datetime.now().strftime("%Y-%m-%d")  # Add this line
-        with open("logs/journal_entry.json", "w") as f:
-            json.dump(formatted_output, f, indent=2)
-        
-        print("Mood journaling complete. Entry saved to logs/journal_entry.json.")
-        return formatted_output
+    return reporting_llm(
+        provider="gemini",  # Use Gemini directly, not through LangChain
+        model=model or os.getenv("MODEL", "gemini-1.5-flash"),
+        api_key=os.getenv("GEMINI_API_KEY"),
+        temperature=LLM_TEMPERATURE,
+        timeout=timeout,
+        **kwargs
+    )
+
+
+def _make_llm(**kwargs):
+    # Deadlines, retries, hedging and a circuit breaker (see resilient_llm), failing over to FALLBACK_MODEL
+    fallback_model = os.getenv("FALLBACK_MODEL")
+    fallbacks = [_provider_llm(fallback_model, **kwargs)] if fallback_model else []
+    return resilient_from_env(_provider_llm(**kwargs), fallbacks)
+
+
+def llm_streaming():
+    # benchmarks/fake_llm_server.py only answers whole, so streaming is off by default against it
+    default = "0" if os.getenv("LLM_BASE_URL") else "1"
+    return os.getenv("LLM_STREAM", default).lower() not in ("0", "false", "no", "off")
+
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _init_lock:
+            if _llm is None:
+                _llm = _make_llm()
+    return _llm
+
+
+def get_stream_llm():
+    """LLM of the agents in progress.STREAMED_AGENTS: the coach's reflections are shown as they are written."""
+    global _stream_llm
+    if not llm_streaming():
+        return get_llm()
+    if _stream_llm is None:
+        with _init_lock:
+            if _stream_llm is None:
+                _stream_llm = _make_llm(stream=True)
+    return _stream_llm
+
+
+def get_fast_llm():
+    """LLM for the single-call fast path, constrained to the fast_path JSON schema."""
+    global _fast_llm
+    if _fast_llm is None:
+        with _init_lock:
+            if _fast_llm is None:
+                _fast_llm = MeteredLLM(_make_llm(response_format={
+                    "type": "json_schema",
+                    "json_schema": {"name": "journal_entry", "schema": fast_path.RESPONSE_SCHEMA},
+                }), "fast")
+    return _fast_llm
+
+
+def pipeline_mode(mode=None):
+    # "crew" runs the three agents in sequence, "fast" makes one structured call
+    mode = mode or os.getenv("MOOD_PIPELINE_MODE", "crew")
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode '{mode}' (expected one of {PIPELINE_MODES})")
+    return mode
+
+
+# The crew's agents and tasks live in config/*.yaml (see crew.py)
+AGENT_NAMES = ("mood_agent", "coach_agent", "logger_agent")
+
+
+def journal_tool_enabled():
+    return os.getenv("JOURNAL_TOOL", "1").lower() not in ("0", "false", "no", "off")
+
+
+def agent_tools(name):
+    """Tools an agent may call: the coach can look up the user's journal (JOURNAL_TOOL=0 turns it off).
+
+    Only for a known user (see journal_index.user_scope); anonymous requests have no journal to search.
+    """
+    if name != "coach_agent" or not journal_tool_enabled() or current_user() is None:
+        return []
+    from .tools.custom_tool import JournalSearchTool
+    return [JournalSearchTool()]
+
+
+def get_agent_llm(name):
+    """The LLM an agent calls through, metered under the agent's name so usage is reported per agent."""
+    # Only the user-facing answers stream; the mood and the logger's JSON come back whole
+    llm = get_stream_llm() if name in STREAMED_AGENTS else get_llm()
+    if name not in _agent_llms:
+        with _init_lock:
+            _agent_llms.setdefault(name, MeteredLLM(llm, name))
+    return _agent_llms[name]
+
+
+def new_crew(start=1, outputs=(), on_output=None):
+    """A Crew of its own for one run, instantiated from the template compiled from config/ once per process.
+
+    See CrewTemplate.instantiate for resuming at task `start` with earlier `outputs`.
+    """
+    # Retries live in the LLM wrapper; CrewAI re-running whole tasks on top would multiply them
+    return get_template().instantiate(get_agent_llm, agent_tools, start=start, outputs=outputs,
+                                      on_output=on_output, max_retry_limit=0)
+
+
+def get_agents():
+    """Return a new (mood_agent, coach_agent, logger_agent); each run builds its own (see new_crew)."""
+    return tuple(new_crew().agents)
+
+
+def entry_cache_key(journal_text, mode="crew", history="", user_id=None):
+    if mode == "fast":
+        prompts = [fast_path.FAST_SYSTEM_PROMPT, fast_path.RESPONSE_SCHEMA]
+    else:
+        # With the journal tool the coach may quote the user's own past entries, so those answers are
+        # only ever replayed to the same user (anonymous requests get no tool, see agent_tools)
+        tool_user = user_id if journal_tool_enabled() else None
+        prompts = [get_template().fingerprint(), journal_tool_enabled(), tool_user]
+    # The input budget changes what the LLM sees for long entries, so it is part of the key
+    budget = [MAX_INPUT_TOKENS, INPUT_BUDGET_STRATEGY]
+    # So is the recalled history: the same text from a user with different past entries gets a new answer
+    return entry_key(journal_text, os.getenv("MODEL", "gemini-1.5-flash"), [mode, prompts, budget, history],
+                     LLM_TEMPERATURE)
+
+
+def recall_history(journal_text, user_id=None):
+    """The user's most similar past entries as a short prompt block, or "" (see memory_index.py)."""
+    if not memory_enabled():
+        return ""
+    with span("memory.recall") as attrs:
+        try:
+            recalled = get_memory().recall(journal_text, user_id)
+        except Exception:
+            logger.warning("Could not recall past entries; continuing without history", exc_info=True)
+            return ""
+        attrs["hits"] = len(recalled)
+    return HISTORY_HEADER + format_recalled(recalled) if recalled else ""
+
+
+def __getattr__(name):
+    # Keep the old module-level names (main.llm, main.mood_agent, ...) working lazily
+    if name == "llm":
+        return get_llm()
+    if name in AGENT_NAMES:
+        return get_agents()[AGENT_NAMES.index(name)]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def emit_entry(entry, agent):
+    """Progress events for an entry that was answered all at once."""
+    emit("mood", mood=entry["mood"], confidence=entry["confidence"])
+    emit("reflections", agent=agent, reflections=[r["prompt"] for r in entry["reflections"]], done=True)
+
+
+def analyze(journal_text, mode=None, history="", request_id=None, start=1, outputs=()):
+    """Run the pipeline on one journal text and return the parsed entry (without date or ID).
+
+    `history` is the prompt block from `recall_history`; only the coach (or the fast call) sees it.
+    In crew mode each task's output is checkpointed under `request_id`, and `start`/`outputs`
+    resume at that task with the earlier tasks' outputs; a `start` past the last task only
+    re-parses `outputs`. The mood and the coach's reflections are emitted as progress events
+    as soon as they exist (see progress.py).
+    """
+    # Long transcripts are summarized down to MAX_INPUT_TOKENS before any LLM sees them
+    with span("input_budget") as attrs:
+        journal_text, original_tokens = fit_to_budget(journal_text)
+        attrs["input_tokens"] = original_tokens
+    usage = current_usage()
+    if usage is not None:
+        usage.note_input(original_tokens, estimate_tokens(journal_text))
+    if pipeline_mode(mode) == "fast":
+        entry = fast_path.analyze_fast(journal_text, get_fast_llm(), history)
+        emit_entry(entry, "fast")
+        return entry
+
+    def task_done(number, raw):
+        save_checkpoint(request_id, task_stage(number), raw)
+        if get_template().tasks[number - 1]["name"] == "mood_task":
+            # Shown right away; the coach and logger still have to run
+            mood = parse_text(raw)
+            emit("mood", mood=mood.mood, confidence=mood.confidence)
+
+    outputs = list(outputs[:start - 1])
+    if start <= len(get_template().tasks):
+        with span("crew.instantiate"):
+            crew = new_crew(start, outputs, task_done)
+        # The agent calls show up as llm.<agent> spans nested under this one
+        with span("crew.kickoff", from_task=start):
+            output = crew.kickoff(inputs={"journal_text": journal_text, "history": history})
+        logger.debug("Crew output: %s", output)
+        outputs += [task.raw for task in output.tasks_output]
+
+    # One pass over the final output, falling back to the logger and mood task outputs
+    with span("parse"):
+        return parse_crew_output({"raw": outputs[-1], "tasks_output": [{"raw": raw} for raw in outputs]}).to_dict()
+
+
+def run(journal_text, request_id=None, user_id=None, mode=None):
+    # Part of the caller's trace (e.g. a service job), or a trace of its own (see tracing.py)
+    with trace(request_id, user_id=user_id):
+        return _run(journal_text, request_id, user_id, mode)
+
+
+def _run(journal_text, request_id=None, user_id=None, mode=None):
+    try:
+        mode = pipeline_mode(mode)
+        # The ID is fixed up front so every stage can be checkpointed under it (see checkpoints.py)
+        request_id = request_id or uuid.uuid4().hex
+        emit("transcript", text=journal_text)
+        formatted_output = None
+        history = recall_history(journal_text, user_id)
+        save_checkpoint(request_id, TRANSCRIPT, {"text": journal_text, "mode": mode, "history": history,
+                                                 "user_id": user_id})
+        if cache_enabled():
+            with span("cache.lookup") as attrs:
+                cache_key = entry_cache_key(journal_text, mode, history, user_id)
+                cached = get_cache("entries").get(cache_key)
+                attrs["hit"] = cached is not None
+            if cached is not None:
+                # Marked as a hit, with no tokens spent, and shown the way a fresh answer is
+                formatted_output = dict(cached, tier="cache", usage=Usage().summary(os.getenv("MODEL")))
+                emit_entry(formatted_output, "cache")
+        if formatted_output is None:
+            # Clear-cut entries are answered by the local classifier without an LLM call
+            with span("preclassify"):
+                formatted_output = preclassify(journal_text)
+        if formatted_output is None:
+            try:
+                # The journal-search tool answers for this user only
+                with track_usage() as usage, span("analyze", mode=mode), user_scope(user_id):
+                    formatted_output = analyze(journal_text, mode, history, request_id)
+                formatted_output['tier'] = "llm"
+                if cache_enabled():
+                    get_cache("entries").set(cache_key, dict(formatted_output))
+                # Tokens and estimated cost of this entry, per agent (see token_report.py)
+                formatted_output['usage'] = usage.summary(os.getenv("MODEL"))
+            except LLMUnavailable:
+                if os.getenv("LLM_LOCAL_FALLBACK", "1") == "0":
+                    raise
+                # Provider down or circuit open: a local answer beats a failed entry (and isn't cached)
+                formatted_output = preclassify(journal_text, threshold=0.0)
+                formatted_output['tier'] = "local-fallback"
+
+        return save_entry(formatted_output, journal_text, request_id, user_id)
     except Exception as e:
-        raise Exception(f"An error occurred while running the crew: {e}")
+        raise PipelineError(f"An error occurred while running the crew: {e}") from e
 
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        audio_path = sys.argv[1]
-        journal_text = transcribe_audio(audio_path)
+def save_entry(formatted_output, journal_text, request_id=None, user_id=None):
+    """Date and store a finished entry, and fold it into the recall memory and the loaded histories."""
+    # Force use of current system date
+    formatted_output['date'] = datetime.now().strftime("%Y-%m-%d")  # Add this line
+    # Save the formatted output as its own row in the journal store
+    with span("store.write") as attrs:
+        request_id = get_store().append(formatted_output, entry_id=request_id, user_id=user_id,
+                                        text=journal_text)
+        attrs["entry_id"] = request_id
+    formatted_output['id'] = request_id
+    if memory_enabled():
+        # The entry is saved either way; a failed index update only means it won't be recalled
+        with span("memory.add"):
+            try:
+                get_memory().remember(request_id, user_id, journal_text)
+            except Exception:
+                logger.warning("Could not index entry %s for recall", request_id, exc_info=True)
+    # Keep any loaded mood history current without re-reading the store
+    from .analytics import get_analytics
+    with span("analytics.record"):
+        get_analytics().record(formatted_output, entry_id=request_id, user_id=user_id)
+        get_journal_indexes().record(formatted_output, entry_id=request_id, user_id=user_id, text=journal_text)
+    logger.info("Mood journaling complete. Entry saved to the journal store as %s.", request_id)
+    return formatted_output
+
+
+def _estimate(transcript):
+    # Published as the "partial" event, not as the final run's progress
+    with span("partial_estimate"), listen(None):
+        return analyze(transcript, "fast")
+
+
+def run_streaming(audio, request_id=None, user_id=None, mode=None, model_size=None,
+                  window_seconds=None, min_words=8):
+    """Transcribe a long recording (path or upload bytes) chunk by chunk and yield results as they arrive.
+
+    Yields events in order:
+      {"type": "transcript", "chunk": ..., "transcript": ...} after each chunk,
+      {"type": "partial", "entry": ...} when an early fast-mode mood estimate on
+          the text so far is ready (re-run on the latest text once the previous
+          estimate finishes, so estimates never queue up),
+      {"type": "final", "entry": ...} from the full pipeline on the whole transcript.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    transcript = ""
+    estimated_text = None
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mood-partial")
+    try:
+        pending = None
+        for chunk in transcribe_stream(audio, size=model_size, window_seconds=window_seconds):
+            transcript = chunk["transcript"]
+            yield {"type": "transcript", "chunk": chunk, "transcript": transcript}
+
+            if pending is not None and pending.done():
+                if pending.exception() is None:
+                    yield {"type": "partial", "entry": pending.result(), "transcript": estimated_text}
+                pending = None
+            if pending is None and transcript != estimated_text and len(transcript.split()) >= min_words:
+                estimated_text = transcript
+                # Copy the context so the estimate's spans land in this request's trace
+                pending = executor.submit(contextvars.copy_context().run, _estimate, transcript)
+    finally:
+        # The full run below supersedes any estimate still in flight: a running one is left to
+        # finish in the background instead of delaying the final result, a queued one never starts
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield {"type": "final", "entry": run(transcript, request_id=request_id, user_id=user_id, mode=mode),
+           "transcript": transcript}
+
+
+def replay(request_id, from_task=1):
+    """Re-run a checkpointed request from crew task `from_task`, reusing its transcript and earlier task outputs.
+
+    `from_task` past the last task only re-parses the stored outputs. Fast-mode requests have no
+    task checkpoints, so they always rerun their single call. The new entry is stored if the
+    original run never got that far; otherwise it is only returned, so a prompt change can be
+    tried on past requests without touching the journal.
+    """
+    stages = get_checkpoints().load(request_id)
+    if TRANSCRIPT not in stages:
+        raise KeyError(f"No checkpoint for request {request_id}")
+    source = stages[TRANSCRIPT]
+    last = len(get_template().tasks) + 1 if source["mode"] == "crew" else 1
+    if not 1 <= from_task <= last:
+        raise ValueError(f"--from-task must be between 1 and {last} for this request")
+    outputs = [stages.get(task_stage(number)) for number in range(1, from_task)]
+    if None in outputs:
+        missing = outputs.index(None) + 1
+        raise ValueError(f"Request {request_id} has no checkpoint for task {missing}; replay from task {missing}")
+
+    with trace(None, user_id=source["user_id"], replay_of=request_id, replay_from=from_task):
+        with track_usage() as usage, span("analyze", mode=source["mode"]), user_scope(source["user_id"]):
+            entry = analyze(source["text"], source["mode"], source["history"], request_id, from_task, outputs)
+        entry['tier'] = "llm"
+        entry['usage'] = usage.summary(os.getenv("MODEL"))
+        if get_store().get(request_id) is None:
+            return save_entry(entry, source["text"], request_id, source["user_id"])
+    entry['date'] = datetime.now().strftime("%Y-%m-%d")
+    entry['id'] = request_id
+    return entry
+
+
+def replay_main(argv=None):
+    """`replay <request-id>... [--from-task N]`: rerun checkpointed requests from task N, one JSON line each."""
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(prog="replay", description=replay_main.__doc__)
+    parser.add_argument("request_ids", nargs="*")
+    parser.add_argument("--from-task", type=int, default=1,
+                        help="first crew task to rerun (1 mood, 2 reflections, 3 logger; 4 re-parses only)")
+    parser.add_argument("--all", action="store_true", help="every checkpointed request, oldest first")
+    parser.add_argument("--limit", type=int, help="with --all, at most this many requests")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    request_ids = args.request_ids or (get_checkpoints().request_ids(args.limit) if args.all else None)
+    if not request_ids:
+        parser.error("give request IDs or --all")
+
+    calls = failures = 0
+    for request_id in request_ids:
+        try:
+            entry = replay(request_id, args.from_task)
+        except Exception as e:
+            failures += 1
+            print(json.dumps({"id": request_id, "error": f"{type(e).__name__}: {e}"}), flush=True)
+            continue
+        calls += entry["usage"]["calls"]
+        print(json.dumps(entry), flush=True)
+    print(f"Replayed {len(request_ids) - failures}/{len(request_ids)} requests from task {args.from_task} "
+          f"with {calls} LLM calls", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    """Command-line entry point: transcribe an audio file (or use $JOURNAL_TEXT) and run the pipeline.
+
+    `replay ...` reruns checkpointed requests instead (see replay_main).
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "replay":
+        sys.exit(replay_main(argv[1:]))
+    if argv:
+        journal_text = transcribe_audio(argv[0])
         print(f"Transcribed text: {journal_text}")
     elif os.environ.get("JOURNAL_TEXT"):
-        # Get text from environment variable (set by Streamlit)
-        audio_path = None
         journal_text = os.environ.get("JOURNAL_TEXT")
         print(f"Using provided text: {journal_text[:50]}...")
     else:
-        audio_path = "meme.wav"  # Default audio file
-        journal_text = transcribe_audio(audio_path)
+        journal_text = transcribe_audio("meme.wav")  # Default audio file
 
     run(journal_text)
+
+
+if __name__ == "__main__":
+    main()
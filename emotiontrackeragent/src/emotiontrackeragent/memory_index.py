@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+"""Local vector memory of past journal entries, so the coach can refer to a user's own history.
+
+Every stored entry is embedded on CPU and appended to an index under
+MEMORY_DIR (logs/memory): float32 vectors in a memory-mapped file, plus one
+"entry_id<TAB>user_id" line per row. `recall` returns a user's most similar
+past entries in a few milliseconds, and only a short excerpt of each goes
+into the prompt (MEMORY_MAX_CHARS in total), so history doesn't bloat it.
+
+- Users with up to MEMORY_EXACT_ROWS entries are scanned exactly.
+- Beyond that an IVF index (spherical k-means clusters, MEMORY_NPROBE of
+  them probed per query) keeps search sublinear. It is trained once the
+  index holds MEMORY_IVF_MIN_ROWS rows and retrained each time it grows 4x.
+
+The default embedder hashes word unigrams and bigrams into
+MEMORY_EMBEDDING_DIM dimensions: no model download, and the same vector in
+every process. Set MEMORY_EMBEDDING_MODEL to a sentence-transformers model
+to use that instead; delete MEMORY_DIR when switching embedders.
+
+One process should write a given MEMORY_DIR (the app or the API server).
+Backfill an existing journal store with:
+
+    python -m emotiontrackeragent.memory_index rebuild
+"""
+import array
+import logging
+import os
+import threading
+import zlib
+
+from .preclassifier import tokenize
+
+logger = logging.getLogger(__name__)
+
+MEMORY_DIR = os.getenv("MEMORY_DIR", os.path.join("logs", "memory"))
+EMBEDDING_DIM = int(os.getenv("MEMORY_EMBEDDING_DIM", "256"))
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "3"))
+MEMORY_MIN_SCORE = float(os.getenv("MEMORY_MIN_SCORE", "0.15"))
+MEMORY_MAX_CHARS = int(os.getenv("MEMORY_MAX_CHARS", "600"))
+EXACT_ROWS = int(os.getenv("MEMORY_EXACT_ROWS", "20000"))
+IVF_MIN_ROWS = int(os.getenv("MEMORY_IVF_MIN_ROWS", "50000"))
+NPROBE = int(os.getenv("MEMORY_NPROBE", "16"))
+
+
+# Function words carry no topic; left in, they make every pair of entries look alike
+STOPWORDS = frozenset(
+    "a about after all also am an and any are as at be been but by can could did do does for from had has have he "
+    "her him his how i i'm if in into is it it's its just me more my myself of on or our out she so some than that "
+    "the their them then there they this to too up us was we were what when which who will with would you your".split()
+)
+
+
+def memory_enabled():
+    return os.getenv("MEMORY", "1").lower() not in ("0", "false", "no", "off")
+
+
+class HashingEmbedder:
+    """Signed feature hashing of word unigrams and bigrams, log-scaled and L2-normalized."""
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def embed(self, texts):
+        import numpy as np
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = [token for token in tokenize(text) if token not in STOPWORDS]
+            counts = {}
+            for feature in tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]:
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                # crc32, not hash(): Python salts str hashes per process, and vectors live on disk
+                h = zlib.crc32(feature.encode())
+                out[row, h % self.dim] += (1.0 + np.log(count)) * (1 if h & 0x80000000 else -1)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts):
+        import numpy as np
+        return np.asarray(self.model.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+
+def make_embedder():
+    model_name = os.getenv("MEMORY_EMBEDDING_MODEL")
+    return SentenceTransformerEmbedder(model_name) if model_name else HashingEmbedder()
+
+
+def kmeans(vectors, clusters, iterations=10, seed=0, chunk=65536):
+    """Spherical k-means on unit vectors; returns unit centroids (clusters, dim)."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    centroids = np.asarray(vectors[rng.choice(len(vectors), clusters, replace=False)], dtype=np.float32)
+    for _ in range(iterations):
+        sums = np.zeros_like(centroids)
+        counts = np.zeros(clusters, dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+            nearest = np.argmax(block @ centroids.T, axis=1)
+            np.add.at(sums, nearest, block)
+            counts += np.bincount(nearest, minlength=clusters)
+        empty = counts == 0
+        # Re-seed empty clusters from random points so every list gets used
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class VectorIndex:
+    """Append-only, memory-mapped vector index with per-user exact search and an IVF path for large users."""
+
+    def __init__(self, path, dim, exact_rows=EXACT_ROWS, ivf_min_rows=IVF_MIN_ROWS, nprobe=NPROBE):
+        import numpy as np
+        self.path = path
+        self.dim = dim
+        self.exact_rows = exact_rows
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._rows_path = os.path.join(path, "rows.tsv")
+        self._ivf_path = os.path.join(path, "ivf.npz")
+        self._lock = threading.Lock()
+
+        self.entry_ids = []
+        self._id_set = set()
+        self._user_codes = {}
+        self._row_user = array.array("i")
+        self._user_rows = []  # user code -> array of rows
+        # The rows file is the source of truth: a vector is written before its row line
+        if os.path.exists(self._rows_path):
+            with open(self._rows_path) as f:
+                for line in f:
+                    entry_id, _, user_id = line.rstrip("\n").partition("\t")
+                    self._append_row(entry_id, user_id)
+        self._rows_file = open(self._rows_path, "a")
+        capacity = max(1024, len(self.entry_ids))
+        if os.path.exists(self._vectors_path):
+            capacity = max(capacity, os.path.getsize(self._vectors_path) // (4 * dim))
+        self._open_vectors(capacity)
+
+        self.centroids = None
+        self._lists = []  # cluster -> rows (numpy), plus rows added since training in _tails
+        self._tails = []
+        self._trained_rows = 0
+        if os.path.exists(self._ivf_path):
+            saved = np.load(self._ivf_path)
+            self._set_ivf(saved["centroids"], saved["assign"][:len(self.entry_ids)])
+
+    def __len__(self):
+        return len(self.entry_ids)
+
+    def _open_vectors(self, capacity):
+        import numpy as np
+        if not os.path.exists(self._vectors_path) or os.path.getsize(self._vectors_path) < capacity * 4 * self.dim:
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(capacity * 4 * self.dim)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _append_row(self, entry_id, user_id):
+        code = self._user_codes.setdefault(user_id or "", len(self._user_codes))
+        if code == len(self._user_rows):
+            self._user_rows.append(array.array("i"))
+        self._user_rows[code].append(len(self.entry_ids))
+        self._row_user.append(code)
+        self.entry_ids.append(entry_id)
+        self._id_set.add(entry_id)
+
+    def __contains__(self, entry_id):
+        return entry_id in self._id_set
+
+    def add(self, entry_ids, user_ids, vectors):
+        """Append rows; IDs already in the index are skipped. Vectors must be unit-normalized."""
+        with self._lock:
+            new = [i for i, entry_id in enumerate(entry_ids) if entry_id not in self._id_set]
+            if not new:
+                return 0
+            start = len(self.entry_ids)
+            if start + len(new) > len(self._vectors):
+                capacity = len(self._vectors)
+                while capacity < start + len(new):
+                    capacity *= 2
+                self._vectors.flush()
+                self._open_vectors(capacity)
+            self._vectors[start:start + len(new)] = vectors[new]
+            lines = []
+            for i in new:
+                self._append_row(entry_ids[i], user_ids[i])
+                lines.append(f"{entry_ids[i]}\t{user_ids[i] or ''}\n")
+            self._rows_file.write("".join(lines))
+            self._rows_file.flush()
+            if self.centroids is not None:
+                self._assign_new(start)
+            if len(self.entry_ids) >= self.ivf_min_rows and len(self.entry_ids) >= 4 * max(self._trained_rows, 1):
+                self._train()
+            return len(new)
+
+    def _set_ivf(self, centroids, assign):
+        import numpy as np
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(self.centroids) + 1))
+        self._lists = [order[bounds[c]:bounds[c + 1]].astype(np.int32) for c in range(len(self.centroids))]
+        self._tails = [array.array("i") for _ in range(len(self.centroids))]
+        self._trained_rows = len(assign)
+        if len(assign) < len(self.entry_ids):
+            self._assign_new(len(assign))
+
+    def _assign_new(self, start, chunk=65536):
+        import numpy as np
+        for begin in range(start, len(self.entry_ids), chunk):
+            block = np.asarray(self._vectors[begin:min(begin + chunk, len(self.entry_ids))], dtype=np.float32)
+            for offset, cluster in enumerate(np.argmax(block @ self.centroids.T, axis=1)):
+                self._tails[cluster].append(begin + offset)
+
+    def _train(self):
+        import numpy as np
+        count = len(self.entry_ids)
+        clusters = max(16, int(np.sqrt(count)))
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(count, min(count, clusters * 64), replace=False))
+        centroids = kmeans(np.asarray(self._vectors[sample], dtype=np.float32), clusters)
+        assign = np.empty(count, dtype=np.int32)
+        for begin in range(0, count, 65536):
+            block = np.asarray(self._vectors[begin:min(begin + 65536, count)], dtype=np.float32)
+            assign[begin:begin + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        np.savez(self._ivf_path + ".tmp.npz", centroids=centroids, assign=assign)
+        os.replace(self._ivf_path + ".tmp.npz", self._ivf_path)
+        self._set_ivf(centroids, assign)
+
+    def _candidates(self, query, code):
+        import numpy as np
+        # A copy: add() can't grow an array.array while a numpy view of it is still alive
+        user_rows = np.array(self._user_rows[code], dtype=np.int32)
+        if self.centroids is None or len(user_rows) <= self.exact_rows:
+            return user_rows, True
+        probe = np.argpartition(-(self.centroids @ query), min(self.nprobe, len(self.centroids) - 1))[:self.nprobe]
+        rows = np.concatenate([self._lists[c] for c in probe]
+                              + [np.frombuffer(self._tails[c], dtype=np.int32) for c in probe])
+        if len(self._user_codes) > 1:
+            rows = rows[np.frombuffer(self._row_user, dtype=np.int32)[rows] == code]
+        return np.sort(rows), False
+
+    def search(self, query, user_id=None, k=MEMORY_TOP_K, exact=False):
+        """[(entry_id, score)] of the user's k rows most similar to the unit vector `query`."""
+        import numpy as np
+        with self._lock:
+            code = self._user_codes.get(user_id or "")
+            if code is None:
+                return []
+            query = np.asarray(query, dtype=np.float32)
+            if exact:
+                rows = np.array(self._user_rows[code], dtype=np.int32)
+            else:
+                rows, _ = self._candidates(query, code)
+            if not len(rows):
+                return []
+            scores = np.asarray(self._vectors[rows], dtype=np.float32) @ query
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.entry_ids[rows[i]], float(scores[i])) for i in top]
+
+    def close(self):
+        with self._lock:
+            self._vectors.flush()
+            self._rows_file.close()
+
+
+class EntryMemory:
+    """Embeds and indexes stored entries, and recalls a user's similar past entries for the prompts."""
+
+    def __init__(self, path=None, embedder=None):
+        self.embedder = embedder or make_embedder()
+        self.index = VectorIndex(path or MEMORY_DIR, self.embedder.dim)
+
+    def remember(self, entry_id, user_id, text):
+        if text and entry_id not in self.index:
+            self.index.add([entry_id], [user_id], self.embedder.embed([text]))
+
+    def recall(self, text, user_id=None, k=MEMORY_TOP_K, min_score=MEMORY_MIN_SCORE):
+        """The user's most similar past entries: [{"id", "date", "mood", "score", "excerpt"}], best first."""
+        if not text or not len(self.index):
+            return []
+        hits = [(entry_id, score) for entry_id, score in self.index.search(self.embedder.embed([text])[0], user_id, k)
+                if score >= min_score]
+        if not hits:
+            return []
+        from .journal_store import get_store
+        rows = get_store().get_many([entry_id for entry_id, _ in hits])
+        recalled = []
+        for entry_id, score in hits:
+            row = rows.get(entry_id)
+            if row is None:
+                continue
+            recalled.append({"id": entry_id, "date": row["date"], "mood": row["entry"].get("mood"),
+                             "score": round(score, 3), "excerpt": " ".join((row["text"] or "").split())})
+        return recalled
+
+
+def format_recalled(recalled, max_chars=MEMORY_MAX_CHARS):
+    """Compact prompt block: one "- date (mood): excerpt" line per entry, MEMORY_MAX_CHARS in total."""
+    if not recalled:
+        return ""
+    per_entry = max(60, max_chars // len(recalled))
+    lines = []
+    for item in recalled:
+        excerpt = item["excerpt"]
+        if len(excerpt) > per_entry:
+            excerpt = excerpt[:per_entry].rsplit(" ", 1)[0] + "..."
+        lines.append(f"- {item['date']} ({item['mood'] or 'unknown'}): {excerpt}")
+    return "\n".join(lines)
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_memory():
+    """Process-wide entry memory at MEMORY_DIR."""
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = EntryMemory()
+    return _memory
+
+
+def rebuild(batch_size=1000):
+    """Index every entry in the journal store that isn't indexed yet; returns how many were added."""
+    from .journal_store import get_store
+    memory = get_memory()
+    rows = [row for row in get_store().list_entries() if row["text"] and row["id"] not in memory.index]
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        memory.index.add([row["id"] for row in batch], [row["user_id"] for row in batch],
+                         memory.embedder.embed([row["text"] for row in batch]))
+    return len(rows)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="index journal store entries that aren't indexed yet")
+    query = sub.add_parser("query", help="show a user's past entries most similar to some text")
+    query.add_argument("text")
+    query.add_argument("--user-id")
+    query.add_argument("--k", type=int, default=MEMORY_TOP_K)
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        print(f"Indexed {rebuild()} entries into {MEMORY_DIR} ({len(get_memory().index)} in total)")
+    else:
+        for item in get_memory().recall(args.text, args.user_id, k=args.k, min_score=-1.0):
+            print(f"{item['score']:.3f}  {item['date']}  {item['mood'] or '-':10}  {item['excerpt'][:100]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import streamlit as st
-import subprocess
-import json
+import pandas as pd
 import os
-import tempfile
+import uuid
 from datetime import datetime
+from emotiontrackeragent.analytics import get_analytics
+from emotiontrackeragent.service import RateLimited, ServiceBusy, get_service
 
 
 # Set page configuration
@@ -54,33 +55,17 @@ st.markdown("""
 st.markdown("<h1 class='main-header'>Emotion Tracker Agent</h1>", unsafe_allow_html=True)
 st.markdown("Analyze your emotions through audio or text journal entries")
 
-# With custom CSS for video container
-st.markdown("""
-<style>
-.video-container {
-    margin: 20px 0;
-    border-radius: 10px;
-    overflow: hidden;
-}
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def load_static_asset(path):
+    # Read once per server process instead of on every rerun
+    with open(path, "rb") as f:
+        return f.read()
 
-video_html = """
-<div class="video-container">
-  <video autoplay loop muted playsinline style="width:100%; height:auto;">
-    <source src="data:video/mp4;base64,{}" type="video/mp4">
-    Your browser does not support the video tag.
-  </video>
-</div>
-"""
-# Read and encode the video file
-import base64
-with open("art.mp4", "rb") as video_file:
-    video_bytes = video_file.read()
-    video_base64 = base64.b64encode(video_bytes).decode()
 
-# Display the video without controls
-st.markdown(video_html.format(video_base64), unsafe_allow_html=True)
+# Served by Streamlit's media endpoint under a stable content-hashed URL, so the
+# browser fetches and caches it once instead of receiving an inline base64 copy
+# of the whole video on every interaction
+st.video(load_static_asset("art.mp4"), format="video/mp4", autoplay=True, loop=True, muted=True)
 
 # After the header
 st.markdown("""
@@ -99,50 +84,108 @@ st.markdown("""
 # Initialize session state
 if 'journal_entry' not in st.session_state:
     st.session_state.journal_entry = None
+if 'trace' not in st.session_state:
+    st.session_state.trace = None
 if 'input_text' not in st.session_state:
     st.session_state.input_text = None
-if 'audio_path' not in st.session_state:
-    st.session_state.audio_path = None
+if 'audio_input' not in st.session_state:
+    st.session_state.audio_input = None  # sample file path or uploaded bytes
+if 'active_job' not in st.session_state:
+    st.session_state.active_job = None  # this session's in-flight entry: job ID, input label, audio
+if 'job_error' not in st.session_state:
+    st.session_state.job_error = None
+if 'user_id' not in st.session_state:
+    # Entries are stored per session, so concurrent users never see each other's results
+    st.session_state.user_id = uuid.uuid4().hex
 
 # Sidebar options
 st.sidebar.title("Input Options")
 input_option = st.sidebar.radio("Choose input method:", ["Upload Audio", "Sample Audio Files", "Text Input"])
 
-def run_mood_detection(input_type, input_value=None):
-    """Run the mood detection agent with the specified input"""
-    with st.spinner("Processing your entry... This may take a minute..."):
+# Uploads longer than about a minute of 16 kHz audio are transcribed in chunks with early results
+STREAM_THRESHOLD_BYTES = int(os.getenv("STREAM_THRESHOLD_BYTES", str(2 * 1024 * 1024)))
+JOB_POLL_SECONDS = float(os.getenv("MOOD_APP_POLL_SECONDS", "0.5"))
+
+
+@st.cache_resource
+def get_job_service():
+    # One service per Streamlit server, shared by every session
+    return get_service()
+
+
+def submit_entry(input_type, input_value, label):
+    """Queue this session's entry and return at once; job_status() shows progress and picks up the result."""
+    if st.session_state.active_job is not None:
+        st.warning("Your previous entry is still being analyzed.")
+        return
+    service = get_job_service()
+    user_id = st.session_state.user_id
+    audio = None
+    try:
         if input_type == "upload_audio":
-            # Save uploaded file to temp file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-                tmp.write(input_value.getvalue())
-                tmp_filename = tmp.name
-            
-            st.session_state.audio_path = tmp_filename
-            subprocess.run(["python", "main.py", tmp_filename], capture_output=True)
-            
+            # The upload's bytes are decoded in memory, no temp file round trip
+            audio = input_value.getvalue()
+            job_id = service.submit_audio(audio, user_id=user_id, stream=len(audio) > STREAM_THRESHOLD_BYTES)
         elif input_type == "sample_audio":
-            st.session_state.audio_path = input_value
-            subprocess.run(["python", "main.py", input_value], capture_output=True)
-            
-        elif input_type == "text":
-            # Create a temp file with the text
-            with tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".txt") as tmp:
-                tmp.write(input_value)
-                tmp_filename = tmp.name
-            
-            # Modify command to handle text input
-            os.environ["JOURNAL_TEXT"] = input_value  # Pass via environment variable
-            subprocess.run(["python", "main.py"], capture_output=True)
-            os.unlink(tmp_filename)
-        
-        # Load the results
-        try:
-            with open("logs/journal_entry.json", "r") as f:
-                st.session_state.journal_entry = json.load(f)
-                return True
-        except FileNotFoundError:
-            st.error("Error: Journal entry file not found. The analysis might have failed.")
-            return False
+            audio = input_value
+            job_id = service.submit_audio(os.path.abspath(input_value), user_id=user_id)
+        else:
+            job_id = service.submit_text(input_value, user_id=user_id)
+    except RateLimited as e:
+        st.warning(f"You're sending entries faster than we can analyze them. Try again in {e.retry_after:.0f} s.")
+        return
+    except ServiceBusy:
+        st.warning("The service is busy right now. Please try again in a moment.")
+        return
+    st.session_state.job_error = None
+    # Only this session's handle; the inputs travel with the job, never through shared state
+    st.session_state.active_job = {"id": job_id, "label": label, "audio": audio}
+
+
+def render_progress(job):
+    # Whatever the pipeline has published so far: transcript, then mood, then the reflections as they are written
+    progress = job.progress or {}
+    if progress.get("mood"):
+        st.info(f"Detected mood: {progress['mood']} ({int(float(progress['confidence']) * 100)}% confidence)"
+                + ("" if progress.get("reflections_done") else " - writing reflections..."))
+        for i, prompt in enumerate(progress.get("reflections") or [], 1):
+            st.markdown(f"**Reflection #{i}:** _{prompt}_")
+    elif job.partial:
+        # Long recordings are streamed, so show the early estimate while the rest is processed
+        st.info(f"Early estimate: {job.partial.get('mood', 'Unknown')} "
+                f"({int(float(job.partial.get('confidence', 0.5)) * 100)}% confidence) - refining...")
+    elif job.kind == "audio" and progress.get("transcript"):
+        st.info("Transcript ready, detecting your mood...")
+        st.caption(progress["transcript"])
+    else:
+        st.info("Processing your entry... This may take a minute.")
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_status():
+    # Reruns on its own every JOB_POLL_SECONDS while a job is in flight, without blocking the script
+    # thread or rerunning the rest of the page; a full rerun shows the result once it's in
+    active = st.session_state.active_job
+    if active is None:
+        return
+    job = get_job_service().get(active["id"])
+    if job is None:
+        st.session_state.active_job = None
+        st.session_state.job_error = "The entry was lost, please submit it again."
+        st.rerun()
+    if not job.finished:
+        render_progress(job)
+        return
+    st.session_state.active_job = None
+    if job.error:
+        st.session_state.job_error = job.error
+    else:
+        st.session_state.journal_entry = job.result
+        st.session_state.input_text = active["label"]
+        st.session_state.audio_input = active["audio"]
+        # Stage timings for the debug panel (None with TRACING=0)
+        st.session_state.trace = job.trace.summary() if job.trace is not None else None
+    st.rerun()
 
 # Handle different input methods
 if input_option == "Upload Audio":
@@ -155,9 +198,7 @@ if input_option == "Upload Audio":
         if uploaded_file is not None:
             st.audio(uploaded_file)
             if st.button("Analyze Uploaded Audio"):
-                success = run_mood_detection("upload_audio", uploaded_file)
-                if success:
-                    st.session_state.input_text = "Audio file analysis"
+                submit_entry("upload_audio", uploaded_file, "Audio file analysis")
     
     with record_tab:
         st.write("Record your voice to analyze your mood:")
@@ -182,9 +223,7 @@ if input_option == "Upload Audio":
         if recorded_file is not None:
             st.audio(recorded_file)
             if st.button("Analyze This Recording"):
-                success = run_mood_detection("upload_audio", recorded_file)
-                if success:
-                    st.session_state.input_text = "Recorded audio analysis"
+                submit_entry("upload_audio", recorded_file, "Recorded audio analysis")
 
 elif input_option == "Sample Audio Files":
     # Find sample audio files
@@ -194,9 +233,7 @@ elif input_option == "Sample Audio Files":
         selected_file = st.sidebar.selectbox("Select a sample audio file:", sample_files)
         st.sidebar.audio(selected_file)
         if st.sidebar.button("Analyze Mood"):
-            success = run_mood_detection("sample_audio", selected_file)
-            if success:
-                st.session_state.input_text = f"Analysis of {selected_file}"
+            submit_entry("sample_audio", selected_file, f"Analysis of {selected_file}")
     else:
         st.sidebar.warning("No sample .wav files found in the current directory.")
 
@@ -208,18 +245,23 @@ elif input_option == "Text Input":
     )
     
     if st.sidebar.button("Analyze Mood"):
-        success = run_mood_detection("text", journal_text)
-        if success:
-            st.session_state.input_text = journal_text
+        submit_entry("text", journal_text, journal_text)
+
+if st.session_state.active_job is not None:
+    job_status()
+if st.session_state.job_error:
+    st.error(f"Error: The analysis failed. {st.session_state.job_error}")
 
 # Display results if available
 if st.session_state.journal_entry:
     journal = st.session_state.journal_entry
+    if journal.get('tier') == "local-fallback":
+        st.info("The AI service is unavailable right now, so this analysis comes from the local mood classifier.")
     
     # Display audio if available
-    if st.session_state.audio_path and os.path.exists(st.session_state.audio_path):
+    if st.session_state.audio_input is not None:
         st.subheader("Audio Input")
-        st.audio(st.session_state.audio_path)
+        st.audio(st.session_state.audio_input)
     
     # Display text input if available
     if st.session_state.input_text:
@@ -344,6 +386,17 @@ if st.session_state.journal_entry:
         st.json(journal)
     # Debug information (MOVED INSIDE THE if block)
     with st.expander("Debug Information", expanded=False):
+        trace = st.session_state.trace
+        if trace and trace["stages"]:
+            st.write(f"Trace `{trace['trace_id']}`: {trace['duration_ms'] / 1000:.2f} s end to end")
+            stages = pd.DataFrame(trace["stages"])
+            stages["stage"] = ["\u2003" * depth + name for depth, name in zip(stages["depth"], stages["name"])]
+            st.dataframe(stages[["stage", "offset_ms", "duration_ms", "rss_delta_mb", "thread"]],
+                         hide_index=True, use_container_width=True)
+            top_level = stages[stages["depth"] == 0]
+            st.bar_chart(top_level.set_index("name")["duration_ms"], horizontal=True)
+            if trace["profile"]:
+                st.write(f"Profile of this slow request: `{trace['profile']}`")
         st.write("Journal Entry Keys:", list(journal.keys()))
         if 'mood_analysis' in journal:
             st.write("Mood Analysis Keys:", list(journal['mood_analysis'].keys()))
@@ -354,6 +407,27 @@ else:
 
 
 
+# Mood history for this session, from the incrementally maintained aggregates
+analytics = get_analytics()
+history_summary = analytics.summary(st.session_state.user_id)
+if history_summary["entries"]:
+    st.markdown("<h2 class='sub-header'>Mood History</h2>", unsafe_allow_html=True)
+    streaks = analytics.streaks(st.session_state.user_id)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Entries", history_summary["entries"], f"{history_summary['days']} days")
+    col2.metric("Current streak", f"{streaks['current_days']} days", f"longest {streaks['longest_days']}")
+    if streaks["current_mood"]:
+        col3.metric("Current mood run", streaks["current_mood"].title(), f"{streaks['current_mood_days']} days")
+
+    period = st.radio("Group by", ["day", "week"], horizontal=True, key="history_period")
+    frequency = analytics.frequency(st.session_state.user_id, period=period)
+    st.bar_chart(pd.DataFrame(frequency["counts"], index=frequency["periods"], columns=frequency["moods"]))
+
+    timeline = analytics.timeline(st.session_state.user_id)
+    st.markdown("Confidence-weighted mood mix per day")
+    st.area_chart(pd.DataFrame(timeline["shares"], index=timeline["dates"], columns=timeline["moods"]))
+
+
 # Add information about the project
 st.sidebar.markdown("---")
 st.sidebar.markdown("### About")
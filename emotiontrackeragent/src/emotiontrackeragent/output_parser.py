@@ -0,0 +1,265 @@
+import json
+import re
+
+from .progress import partial_reflections
+
+DEFAULT_MOOD = "Unknown"
+DEFAULT_CONFIDENCE = 0.5
+MAX_CANDIDATES = 16  # '{' positions tried before giving up on prose-heavy output
+
+_decoder = json.JSONDecoder()
+_MOOD_LINE = re.compile(r"mood[^:\n]{0,20}:\s*\**\s*([A-Za-z][A-Za-z -]{0,30}?)\s*(?:\*|\(|,|\.|\n|$)", re.IGNORECASE)
+_CONFIDENCE_LINE = re.compile(r"confidence[^:\n]{0,20}:\s*\**\s*([0-9]*\.?[0-9]+)\s*(%?)", re.IGNORECASE)
+
+
+class JournalEntry:
+    """Normalized journal entry: the shape the app stores and renders."""
+
+    __slots__ = ("date", "mood", "confidence", "reflections", "summary")
+
+    def __init__(self, date=None, mood=DEFAULT_MOOD, confidence=DEFAULT_CONFIDENCE, reflections=None, summary=None):
+        self.date = date
+        self.mood = mood
+        self.confidence = confidence
+        self.reflections = reflections if reflections is not None else []
+        self.summary = summary
+
+    def to_dict(self):
+        data = {
+            "date": self.date,
+            "mood": self.mood,
+            "confidence": self.confidence,
+            "reflections": self.reflections,
+        }
+        if self.summary:
+            data["summary"] = self.summary
+        return data
+
+    def __eq__(self, other):
+        return isinstance(other, JournalEntry) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"JournalEntry(mood={self.mood!r}, confidence={self.confidence!r}, reflections={len(self.reflections)})"
+
+
+def _candidate_starts(text):
+    # A ```json fence is the most likely place; after that, every '{' in order
+    fence = text.find("```json")
+    if fence != -1:
+        start = text.find("{", fence)
+        if start != -1:
+            yield start
+    start = text.find("{")
+    for _ in range(MAX_CANDIDATES):
+        if start == -1:
+            return
+        yield start
+        start = text.find("{", start + 1)
+
+
+def _close_truncated(text):
+    """Best-effort repair of a JSON object cut off mid-stream, in one linear scan.
+
+    Returns candidate strings: the text closed where it stops, then the text
+    cut back to the last complete member and closed there.
+    """
+    stack = []
+    in_string = escaped = False
+    last_comma = None  # (position, closers needed at that point)
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return []  # balanced already, so it wasn't truncated, just invalid
+        elif ch == ",":
+            last_comma = (i, "".join(reversed(stack)))
+    candidates = []
+    tail = text + ('"' if in_string else "")
+    candidates.append(tail.rstrip().rstrip(",:") + "".join(reversed(stack)))
+    if last_comma is not None:
+        candidates.append(text[:last_comma[0]] + last_comma[1])
+    return candidates
+
+
+def extract_json(text):
+    """First JSON object in `text`: fenced or bare, with surrounding prose or trailing text, or truncated."""
+    if not isinstance(text, str) or "{" not in text:
+        return None
+    for start in _candidate_starts(text):
+        try:
+            data, _ = _decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            return data
+        if data is not None:
+            continue
+        body = text[start:]
+        fence_end = body.find("```")
+        if fence_end != -1:
+            body = body[:fence_end]
+        repairs = _close_truncated(body)
+        if not repairs:
+            continue  # balanced but invalid (e.g. "{like this}"), try the next '{'
+        # The object runs to the end of the output, so it was cut off: repair it
+        # rather than falling through to one of its nested objects
+        for candidate in repairs:
+            try:
+                data = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict):
+                return data
+        return None
+    return None
+
+
+def normalize_confidence(value):
+    if isinstance(value, str):
+        value = value.strip()
+        percent = value.endswith("%")
+        try:
+            value = float(value.rstrip("%").strip())
+        except ValueError:
+            return DEFAULT_CONFIDENCE
+        if percent:
+            value /= 100
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return DEFAULT_CONFIDENCE
+    if 1 < value <= 100:
+        value /= 100  # "80" means 80%
+    return min(max(float(value), 0.0), 1.0)
+
+
+def _response_text(value):
+    if isinstance(value, dict):
+        lines = []
+        reason = value.get("reason")
+        for key, sub_value in value.items():
+            if key == "reason":
+                continue
+            lines.append(f"- {key}: {_response_text(sub_value)}")
+        if reason:
+            lines.append(f"  Reason: {reason}")
+        return "\n".join(lines)
+    if isinstance(value, list):
+        return "\n".join(f"- {_response_text(item)}" for item in value)
+    return "" if value is None else str(value)
+
+
+def normalize_reflections(value):
+    """Reflections as a list of {"prompt": str, "response": str}, whatever shape the model used."""
+    reflections = []
+    if isinstance(value, dict):
+        for prompt, response in value.items():
+            reflections.append({"prompt": str(prompt), "response": _response_text(response)})
+    elif isinstance(value, list):
+        for item in value:
+            if isinstance(item, dict):
+                prompt = item.get("prompt", item.get("question", item.get("reflection")))
+                if prompt is None and len(item) == 1:
+                    (prompt, response), = item.items()
+                    reflections.append({"prompt": str(prompt), "response": _response_text(response)})
+                    continue
+                response = item.get("response", item.get("answer", ""))
+                reflections.append({"prompt": "" if prompt is None else str(prompt), "response": _response_text(response)})
+            elif item is not None:
+                reflections.append({"prompt": str(item), "response": ""})
+    elif isinstance(value, str) and value.strip():
+        reflections.append({"prompt": value.strip(), "response": ""})
+    return reflections
+
+
+def entry_from_data(data, entry=None):
+    """Fill a JournalEntry from a decoded dict; fields already set on `entry` are kept."""
+    entry = entry or JournalEntry()
+    if not isinstance(data, dict):
+        return entry
+    # Some models nest the result, e.g. {"journal_entry": {...}} or {"mood_analysis": {...}}
+    for key in ("journal_entry", "entry"):
+        if isinstance(data.get(key), dict):
+            data = {**data[key], **{k: v for k, v in data.items() if k != key}}
+    analysis = data.get("mood_analysis") if isinstance(data.get("mood_analysis"), dict) else {}
+
+    mood = data.get("mood", data.get("detected_mood", analysis.get("detected_mood", analysis.get("mood"))))
+    if entry.mood == DEFAULT_MOOD and isinstance(mood, str) and mood.strip():
+        entry.mood = mood.strip()
+    confidence = data.get("confidence", analysis.get("confidence"))
+    if entry.confidence == DEFAULT_CONFIDENCE and confidence is not None:
+        entry.confidence = normalize_confidence(confidence)
+    if not entry.reflections:
+        entry.reflections = normalize_reflections(data.get("reflections", data.get("prompts")))
+    if entry.summary is None and isinstance(data.get("summary"), str):
+        entry.summary = data["summary"]
+    return entry
+
+
+def parse_text(text, entry=None):
+    """Parse one model output string (fenced JSON, bare JSON, or a plain "Mood: x" answer)."""
+    entry = entry or JournalEntry()
+    data = extract_json(text)
+    if data is not None:
+        return entry_from_data(data, entry)
+    if isinstance(text, str):
+        # Free-text answers, e.g. from the mood task: "Mood: anxious, Confidence: 0.8"
+        if entry.mood == DEFAULT_MOOD:
+            match = _MOOD_LINE.search(text)
+            if match:
+                entry.mood = match.group(1).strip()
+        if entry.confidence == DEFAULT_CONFIDENCE:
+            match = _CONFIDENCE_LINE.search(text)
+            if match:
+                entry.confidence = normalize_confidence(match.group(1) + match.group(2))
+    return entry
+
+
+def _as_dict(output):
+    if isinstance(output, dict):
+        return output
+    if hasattr(output, "model_dump") and callable(output.model_dump):
+        return output.model_dump()
+    if hasattr(output, "dict") and callable(output.dict):
+        return output.dict()
+    return {"raw": str(output)}
+
+
+def parse_crew_output(output, date=None):
+    """Turn a CrewOutput (or its dict form) into a JournalEntry in a single pass.
+
+    The crew's final raw output is parsed first; fields it lacks are filled
+    from the logger task's output, then from the mood task's free text.
+    Reflections the logger dropped are taken from the coach task's answer.
+    """
+    output_dict = _as_dict(output)
+    tasks = output_dict.get("tasks_output") or []
+    sources = [output_dict.get("raw")]
+    if tasks:
+        sources.append(_as_dict(tasks[-1]).get("raw"))
+        sources.append(_as_dict(tasks[0]).get("raw"))
+
+    entry = JournalEntry(date=date)
+    seen = set()
+    for raw in sources:
+        if not raw or raw in seen:
+            continue
+        seen.add(raw)
+        parse_text(raw, entry)
+        if entry.mood != DEFAULT_MOOD and entry.reflections:
+            break
+    if not entry.reflections and len(tasks) > 2:
+        coach = _as_dict(tasks[1]).get("raw")
+        if coach:
+            entry.reflections = parse_text(coach).reflections or normalize_reflections(partial_reflections(coach))
+    return entry
@@ -0,0 +1,205 @@
+"""Incremental results of a request, so a UI can show them before the final entry is parsed.
+
+Inside `listen(callback)` the pipeline calls `callback(event)` as each piece is ready:
+
+    {"type": "transcript", "text": ...}                 the text that goes to the agents
+    {"type": "mood", "mood": ..., "confidence": ...}    the mood task's answer (or the fast call's)
+    {"type": "reflections", "agent": ..., "reflections": [...], "done": False}
+                                                        the coach's prompts so far, re-sent as its
+                                                        tokens stream in; until "done" the last one
+                                                        may be cut off mid-sentence
+    {"type": "restart", "agent": ...}                   a streamed call is being retried, so its
+                                                        partial prompts are void
+
+Every event also carries "at" (epoch seconds). `fold` turns a sequence of events into one
+snapshot dict. Outside `listen` nothing is emitted and no LLM call streams.
+
+Tokens reach the open call's TokenStream through `write_tokens`: the stub LLM writes its
+answer piece by piece, and provider LLMs built with stream=True are forwarded from
+CrewAI's stream-chunk events (`install_provider_streaming`).
+"""
+import contextlib
+import contextvars
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Agents whose answers are streamed token by token; the others are only reported when done
+STREAMED_AGENTS = ("coach_agent",)
+CONTENT_EVENTS = ("mood", "reflections")
+
+_listener = contextvars.ContextVar("progress_listener", default=None)
+_stream = contextvars.ContextVar("token_stream", default=None)
+_install_lock = threading.Lock()
+_provider_streaming = False
+
+_LIST_MARKER = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+")
+
+
+@contextlib.contextmanager
+def listen(callback):
+    """Send the progress events of the enclosed pipeline run to `callback` (None silences them)."""
+    token = _listener.set(callback)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def _send(callback, event):
+    event["at"] = time.time()
+    try:
+        callback(event)
+    except Exception:
+        # A broken listener must not fail the entry it is watching
+        logger.warning("Progress listener failed on a %s event", event["type"], exc_info=True)
+
+
+def emit(type, **data):
+    callback = _listener.get()
+    if callback is not None:
+        _send(callback, {"type": type, **data})
+
+
+def partial_reflections(text):
+    """The reflection prompts in a coach answer that may still be streaming.
+
+    A ReAct answer only counts from "Final Answer:" on (before that the agent is
+    thinking or calling a tool). If any line is numbered or bulleted, only those are
+    prompts, so an intro line like "Here are some questions:" is dropped.
+    """
+    if "Final Answer:" in text:
+        text = text.split("Final Answer:", 1)[1]
+    elif "Thought:" in text or "Action:" in text:
+        return []
+    else:
+        head = text.lstrip()[:8]
+        if head and ("Thought:".startswith(head) or "Action:".startswith(head)):
+            return []  # the first tokens of a ReAct preamble
+    lines = [line for line in text.splitlines() if line.strip()]
+    if any(_LIST_MARKER.match(line) for line in lines):
+        lines = [line for line in lines if _LIST_MARKER.match(line)]
+    prompts = (_LIST_MARKER.sub("", line).strip().strip("*").strip() for line in lines)
+    return [prompt for prompt in prompts if prompt]
+
+
+class TokenStream:
+    """Text of one streamed LLM call, re-parsed into a reflections event whenever its prompts change.
+
+    Chunks may arrive from the resilient wrapper's worker threads. The first thread to write
+    owns the stream and a hedged duplicate request's chunks are ignored; `restart` (before a
+    retry or a fallback) clears it for the next attempt.
+    """
+
+    def __init__(self, agent, callback):
+        self.agent = agent
+        self.text = ""
+        self._callback = callback
+        self._owner = None
+        self._sent = []
+        self._lock = threading.Lock()
+
+    def _publish(self, done):
+        reflections = partial_reflections(self.text)
+        if reflections != self._sent or (done and reflections):
+            self._sent = reflections
+            _send(self._callback, {"type": "reflections", "agent": self.agent, "reflections": reflections,
+                                   "done": done})
+
+    def write(self, chunk):
+        with self._lock:
+            thread = threading.get_ident()
+            if self._owner is None:
+                self._owner = thread
+            elif self._owner != thread:
+                return
+            self.text += chunk
+            self._publish(done=False)
+
+    def restart(self):
+        with self._lock:
+            self._owner = None
+            self.text = ""
+            if self._sent:
+                self._sent = []
+                _send(self._callback, {"type": "restart", "agent": self.agent})
+
+    def finish(self, response):
+        """The call returned; `response` is authoritative, whichever attempt streamed."""
+        with self._lock:
+            self.text = response
+            self._publish(done=True)
+
+
+@contextlib.contextmanager
+def streaming(agent):
+    """Stream the enclosed LLM call of `agent`, if a listener is on and the agent is in STREAMED_AGENTS.
+
+    Yields the TokenStream (call `finish` with the response), or None when not streaming.
+    """
+    callback = _listener.get()
+    if callback is None or agent not in STREAMED_AGENTS:
+        yield None
+        return
+    stream = TokenStream(agent, callback)
+    token = _stream.set(stream)
+    try:
+        yield stream
+    finally:
+        _stream.reset(token)
+
+
+def streaming_active():
+    return _stream.get() is not None
+
+
+def write_tokens(text):
+    stream = _stream.get()
+    if stream is not None and text:
+        stream.write(text)
+
+
+def restart_tokens():
+    stream = _stream.get()
+    if stream is not None:
+        stream.restart()
+
+
+def install_provider_streaming():
+    """Forward CrewAI's LLM stream chunks (LLM(stream=True)) to the calling request's TokenStream.
+
+    CrewAI emits the chunks on its global event bus, synchronously in the thread making the
+    call, so the request's context (and with it its TokenStream) is still current there.
+    """
+    global _provider_streaming
+    with _install_lock:
+        if _provider_streaming:
+            return
+        try:
+            from crewai.utilities.events import crewai_event_bus
+            from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+        except ImportError:
+            logger.warning("This CrewAI version has no stream events; reflections will appear when complete")
+            return
+        crewai_event_bus.on(LLMStreamChunkEvent)(lambda source, event: write_tokens(event.chunk))
+        _provider_streaming = True
+
+
+def fold(snapshot, event):
+    """A new snapshot {transcript, mood, confidence, reflections, reflections_done, first_content_at} with `event` applied."""
+    snapshot = dict(snapshot or {})
+    if event["type"] == "transcript":
+        snapshot["transcript"] = event["text"]
+    elif event["type"] == "mood":
+        snapshot.update(mood=event["mood"], confidence=event["confidence"])
+    elif event["type"] == "reflections":
+        snapshot.update(reflections=event["reflections"], reflections_done=event["done"])
+    elif event["type"] == "restart":
+        snapshot.pop("reflections", None)
+        snapshot.pop("reflections_done", None)
+    if event["type"] in CONTENT_EVENTS:
+        snapshot.setdefault("first_content_at", event["at"])
+    return snapshot
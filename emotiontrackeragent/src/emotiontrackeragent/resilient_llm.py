@@ -0,0 +1,280 @@
+"""Deadlines, retries, hedging and a circuit breaker around LLM calls.
+
+`ResilientLLM` wraps the LLM the agents (or the fast path) call:
+
+- every attempt gets a deadline (LLM_TIMEOUT_SECONDS), and the whole call
+  an overall budget (LLM_TOTAL_TIMEOUT_SECONDS);
+- transient failures are retried up to LLM_MAX_RETRIES times with
+  exponential backoff and full jitter (LLM_BACKOFF_BASE_SECONDS);
+- with LLM_HEDGE_AFTER_SECONDS set, a duplicate request is sent when the
+  first is still running after that long, and whichever answers first wins;
+- after LLM_CIRCUIT_FAILURES consecutive failed calls the circuit opens for
+  LLM_CIRCUIT_RESET_SECONDS and calls go straight to the fallback LLMs
+  (FALLBACK_MODEL); if those fail too, LLMUnavailable is raised so the
+  caller can answer from the local tier.
+
+Attempts of every ResilientLLM run on one shared pool of LLM_MAX_WORKERS
+threads. A request abandoned at its deadline (or a losing hedge) can't be
+stopped and keeps its thread until the provider call returns, which is why
+the provider client gets the same deadline as its own request timeout.
+`metrics()` reports counts, abandoned attempts still running, and latency
+percentiles.
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .progress import restart_tokens
+
+from .token_budget import BaseLLM, WrappedLLM
+
+
+# Client errors that will fail the same way on every retry
+NON_RETRYABLE_STATUS = {400, 401, 403, 404, 413, 422}
+MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "32"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """The thread pool every ResilientLLM runs its attempts on."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="llm-call")
+    return _executor
+
+
+class LLMUnavailable(Exception):
+    """No LLM (primary or fallback) produced an answer within the policy."""
+
+
+class LLMTimeout(LLMUnavailable):
+    pass
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+def _retryable(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status not in NON_RETRYABLE_STATUS
+
+
+def percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return {f"p{p}": None for p in points}
+    ordered = sorted(values)
+    return {f"p{p}": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 4) for p in points}
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; lets one probe through after `reset_seconds`."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                return True  # this caller is the probe
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opens += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class ResilientLLM(WrappedLLM):
+    """Wraps an LLM (anything with `call(messages, ...)`) with the policy described in the module docstring."""
+
+    def __init__(self, llm, fallbacks=(), timeout=30.0, total_timeout=None, max_retries=2, backoff_base=0.5,
+                 backoff_max=8.0, hedge_after=None, circuit=None, executor=None):
+        if BaseLLM is not object:
+            super().__init__(model=getattr(llm, "model", "resilient"), temperature=getattr(llm, "temperature", None))
+        self.llm = llm
+        self.fallbacks = list(fallbacks)
+        self.timeout = timeout
+        self.total_timeout = total_timeout or timeout * (max_retries + 1) * 1.5
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.circuit = circuit or CircuitBreaker()
+        # Attempts run here so a hung provider call can be abandoned at its deadline
+        self._executor = executor or get_executor()
+        self._metrics_lock = threading.Lock()
+        self._latencies = deque(maxlen=2000)
+        self._counts = {"calls": 0, "attempts": 0, "retries": 0, "timeouts": 0, "errors": 0, "hedges": 0,
+                        "hedge_wins": 0, "fallbacks": 0, "short_circuited": 0, "failures": 0,
+                        "abandoned": 0, "abandoned_running": 0}
+
+    def _wrapped(self):
+        # Stop words go to the fallbacks as well
+        return super()._wrapped() + list(self.__dict__.get("fallbacks", ()))
+
+    def _count(self, key, n=1):
+        with self._metrics_lock:
+            self._counts[key] += n
+
+    def _abandon(self, futures):
+        # Requests still queued are dropped; running ones hold their worker until the provider returns
+        for future in futures:
+            if future.cancel():
+                continue
+            self._count("abandoned")
+            self._count("abandoned_running")
+            future.add_done_callback(lambda _: self._count("abandoned_running", -1))
+
+    def _attempt(self, llm, deadline, args, kwargs):
+        """One logical attempt, hedged with a duplicate request if it is slow; returns the first answer."""
+        budget = min(self.timeout, deadline - time.monotonic())
+        if budget <= 0:
+            raise LLMTimeout("LLM call budget exhausted")
+        self._count("attempts")
+        start = time.monotonic()
+        attempt_deadline = start + budget
+        hedge_at = start + self.hedge_after if self.hedge_after and self.hedge_after < budget else None
+        # Each request runs in a copy of the caller's context, so its spans and streamed tokens reach the caller
+        primary = self._executor.submit(contextvars.copy_context().run, llm.call, *args, **kwargs)
+        pending, error = {primary}, None
+        while pending:
+            wake = attempt_deadline if hedge_at is None else min(hedge_at, attempt_deadline)
+            done, pending = wait(pending, timeout=max(0.0, wake - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self._count("hedge_wins")
+                    self._abandon(pending)
+                    return future.result()
+                error = error or future.exception()
+            if not pending:
+                raise error
+            now = time.monotonic()
+            if now >= attempt_deadline:
+                self._count("timeouts")
+                self._abandon(pending)
+                raise LLMTimeout(f"LLM call exceeded {budget:.1f}s")
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                self._count("hedges")
+                pending.add(self._executor.submit(contextvars.copy_context().run, llm.call, *args, **kwargs))
+
+    def _call_with_retries(self, llm, deadline, args, kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._attempt(llm, deadline, args, kwargs)
+            except Exception as e:
+                if not isinstance(e, LLMTimeout):
+                    self._count("errors")
+                if attempt == self.max_retries or not _retryable(e):
+                    raise
+                # Full jitter: spread retries out so clients don't stampede a recovering provider
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if time.monotonic() + delay >= deadline:
+                    raise
+                self._count("retries")
+                restart_tokens()
+                time.sleep(delay)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        args = (messages,)
+        kwargs = dict(kwargs, tools=tools, callbacks=callbacks, available_functions=available_functions)
+        start = time.monotonic()
+        deadline = start + self.total_timeout
+        self._count("calls")
+        try:
+            error = None
+            if self.circuit.allow():
+                try:
+                    result = self._call_with_retries(self.llm, deadline, args, kwargs)
+                    self.circuit.record_success()
+                    return result
+                except Exception as e:
+                    self.circuit.record_failure()
+                    error = e
+            else:
+                self._count("short_circuited")
+                error = CircuitOpen("LLM circuit is open")
+            for fallback in self.fallbacks:
+                self._count("fallbacks")
+                restart_tokens()
+                try:
+                    return self._attempt(fallback, max(deadline, time.monotonic() + self.timeout), args, kwargs)
+                except Exception as e:
+                    error = e
+            self._count("failures")
+            if isinstance(error, LLMUnavailable):
+                raise error
+            raise LLMUnavailable(f"LLM call failed: {error}") from error
+        finally:
+            with self._metrics_lock:
+                self._latencies.append(time.monotonic() - start)
+
+    def metrics(self):
+        with self._metrics_lock:
+            snapshot = dict(self._counts)
+            latencies = list(self._latencies)
+        snapshot["latency_s"] = percentiles(latencies)
+        snapshot["circuit"] = {"state": self.circuit.state, "opens": self.circuit.opens,
+                               "consecutive_failures": self.circuit.failures}
+        return snapshot
+
+    def supports_function_calling(self):
+        return self.llm.supports_function_calling()
+
+    def supports_stop_words(self):
+        return self.llm.supports_stop_words()
+
+    def get_context_window_size(self):
+        return self.llm.get_context_window_size()
+
+
+def _env_float(name, default=None):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def resilient_from_env(llm, fallbacks=()):
+    """Wrap `llm` with the policy configured by the LLM_* environment variables (LLM_RESILIENCE=0 disables)."""
+    if os.getenv("LLM_RESILIENCE", "1") == "0":
+        return llm
+    return ResilientLLM(
+        llm,
+        fallbacks=fallbacks,
+        timeout=_env_float("LLM_TIMEOUT_SECONDS", 30.0),
+        total_timeout=_env_float("LLM_TOTAL_TIMEOUT_SECONDS"),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+        backoff_base=_env_float("LLM_BACKOFF_BASE_SECONDS", 0.5),
+        hedge_after=_env_float("LLM_HEDGE_AFTER_SECONDS"),
+        circuit=CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURES", "5")),
+            reset_seconds=_env_float("LLM_CIRCUIT_RESET_SECONDS", 30.0),
+        ),
+    )
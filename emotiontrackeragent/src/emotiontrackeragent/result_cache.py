@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+DEFAULT_CACHE_PATH = os.getenv("RESULT_CACHE_DB", os.path.join("logs", "cache.db"))
+
+
+def cache_enabled():
+    return os.getenv("RESULT_CACHE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_audio(audio):
+    """Hash of a file path's contents, or of raw upload bytes."""
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(audio).hexdigest()
+    return hash_file(audio)
+
+
+def normalize_text(text):
+    # Whitespace differences shouldn't cause a second LLM run for the same entry
+    return " ".join((text or "").split())
+
+
+def make_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, (str, bytes)):
+            part = json.dumps(part, sort_keys=True, default=str)
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache: an in-memory LRU in front of a persistent SQLite table.
+
+    Values must be JSON-serializable. Entries expire after `ttl_seconds` in
+    both tiers; the memory tier holds at most `max_memory_items` values and
+    the disk tier at most `max_disk_items` (oldest dropped first).
+    """
+
+    def __init__(self, namespace, path=None, max_memory_items=256, max_disk_items=10000, ttl_seconds=7 * 24 * 3600):
+        self.namespace = namespace
+        self.path = path or DEFAULT_CACHE_PATH
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, stored_at REAL NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_age ON cache (namespace, stored_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _expired(self, stored_at, now):
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def _remember(self, key, stored_at, value):
+        with self._lock:
+            self._memory[key] = (stored_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if not self._expired(item[0], now):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return item[1]
+                del self._memory[key]
+
+        row = self._connect().execute(
+            "SELECT stored_at, value FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        if row is not None and not self._expired(row[0], now):
+            value = json.loads(row[1])
+            self._remember(key, row[0], value)
+            with self._lock:
+                self.stats["disk_hits"] += 1
+            return value
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, key, value):
+        stored_at = time.time()
+        self._remember(key, stored_at, value)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, stored_at, value) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, stored_at, json.dumps(value)),
+            )
+            if self.ttl_seconds is not None:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND stored_at < ?",
+                             (self.namespace, stored_at - self.ttl_seconds))
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache WHERE namespace = ? ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_disk_items),
+            )
+        with self._lock:
+            self.stats["writes"] += 1
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def metrics(self):
+        with self._lock:
+            snapshot = dict(self.stats)
+            snapshot["memory_items"] = len(self._memory)
+        lookups = snapshot["memory_hits"] + snapshot["disk_hits"] + snapshot["misses"]
+        snapshot["hit_rate"] = (snapshot["memory_hits"] + snapshot["disk_hits"]) / lookups if lookups else 0.0
+        return snapshot
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace):
+    """Process-wide cache for a namespace ("transcripts", "entries", ...), configured from the environment."""
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = ResultCache(
+                namespace,
+                max_memory_items=int(os.getenv("RESULT_CACHE_MEMORY_ITEMS", "256")),
+                max_disk_items=int(os.getenv("RESULT_CACHE_DISK_ITEMS", "10000")),
+                ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            )
+        return _caches[namespace]
+
+
+def transcript_key(audio, model_size, backend=None, compute_type=None, preprocessing=None):
+    # Backends and quantizations transcribe the same audio differently (defaults as in whisper_backends),
+    # and the silence trim and length cap change what reaches the model
+    from .transcription import preprocess_settings
+    backend = (backend or os.getenv("WHISPER_BACKEND") or "openai").lower()
+    compute_type = compute_type or os.getenv("WHISPER_COMPUTE_TYPE") or None
+    preprocessing = preprocessing or preprocess_settings()
+    return make_key("transcript", hash_audio(audio), model_size, backend, compute_type, preprocessing)
+
+
+def entry_key(journal_text, model, prompts, temperature):
+    return make_key("entry", normalize_text(journal_text), model, prompts, temperature)
@@ -0,0 +1,370 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .progress import fold, listen
+from .tracing import activate, collect, start_trace
+
+
+QUEUED = "queued"
+TRANSCRIBING = "transcribing"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _transcribe_in_worker(audio, model_size=None):
+    # Runs inside a worker process; each worker keeps its own warm model pool
+    # and goes through the shared transcript cache. Its spans go back to the job's trace.
+    from .main import transcribe_audio
+    with collect() as spans:
+        text = transcribe_audio(audio, model_size)
+    return {"text": text, "spans": spans.spans}
+
+
+def _warm_worker(model_size):
+    from .transcription import get_pool
+    get_pool().warm([model_size] if model_size else None)
+
+
+class ServiceBusy(Exception):
+    """Raised by submit_* when the service already has `max_pending` unfinished jobs."""
+
+
+class RateLimited(ServiceBusy):
+    """Raised by submit_* when one user is over their own limits; `retry_after` is in seconds."""
+
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UserRateLimiter:
+    """Per-user limits: at most `per_minute` submissions in any 60 s window and `max_pending` unfinished jobs.
+
+    Jobs without a user ID are not limited here (the service-wide `max_pending` still applies).
+    Not thread-safe on its own; the service calls it under its lock.
+    """
+
+    def __init__(self, per_minute=None, max_pending=None, window_seconds=60.0):
+        self.per_minute = per_minute
+        self.max_pending = max_pending
+        self.window_seconds = window_seconds
+        self._submitted = {}  # user_id -> deque of submission times
+        self._pending = {}  # user_id -> unfinished jobs
+        self._last_sweep = time.monotonic()
+
+    def _sweep(self, now):
+        # Forget users with nothing pending and no submissions in the window, so memory tracks active users
+        for user_id, times in list(self._submitted.items()):
+            if user_id not in self._pending and (not times or now - times[-1] >= self.window_seconds):
+                del self._submitted[user_id]
+        self._last_sweep = now
+
+    def acquire(self, user_id, now=None):
+        if user_id is None:
+            return
+        now = time.monotonic() if now is None else now
+        if now - self._last_sweep >= self.window_seconds:
+            self._sweep(now)
+        if self.max_pending is not None and self._pending.get(user_id, 0) >= self.max_pending:
+            raise RateLimited(f"{self.max_pending} entries already in progress for this user", retry_after=1.0)
+        times = self._submitted.get(user_id)
+        if times is not None:
+            while times and now - times[0] >= self.window_seconds:
+                times.popleft()
+        if self.per_minute is not None:
+            if times is not None and len(times) >= self.per_minute:
+                raise RateLimited(f"more than {self.per_minute} entries per minute for this user",
+                                  retry_after=round(self.window_seconds - (now - times[0]), 1))
+            self._submitted.setdefault(user_id, deque()).append(now)
+        self._pending[user_id] = self._pending.get(user_id, 0) + 1
+
+    def release(self, user_id):
+        if user_id is None:
+            return
+        count = self._pending.pop(user_id, 0) - 1
+        if count > 0:
+            self._pending[user_id] = count
+
+
+class Job:
+    __slots__ = ("id", "kind", "status", "user_id", "input_text", "audio", "partial", "progress", "result", "error",
+                 "submitted_at", "started_at", "finished_at", "trace", "_done")
+
+    def __init__(self, kind, input_text=None, audio=None, user_id=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.user_id = user_id
+        self.input_text = input_text
+        self.audio = audio  # file path or upload bytes, dropped once the job finishes
+        self.partial = None  # early estimate for streamed recordings
+        self.progress = None  # mood and reflections so far, see progress.fold
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.trace = start_trace(self.id, kind=kind, user_id=user_id)  # None with TRACING=0
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def record_progress(self, event):
+        # Replaced whole, so pollers never see a half-updated snapshot
+        self.progress = fold(self.progress, event)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "user_id": self.user_id,
+            "input_text": self.input_text,
+            "partial": self.partial,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "trace": self.trace.summary() if self.trace is not None else None,
+        }
+
+
+class MoodJobService:
+    """In-process job service around `main.run`.
+
+    LLM work runs on a thread pool (it is almost entirely network I/O), while
+    Whisper transcription runs on a process pool so CPU-bound decoding does
+    not hold the GIL for the other sessions. Both pools live as long as the
+    service, so the crew and the Whisper models are only loaded once.
+
+    With `batch_transcription`, short clips from concurrent jobs are instead
+    decoded together by an in-process WhisperBatcher. `max_pending` bounds
+    the number of unfinished jobs; beyond it submit_* raises ServiceBusy.
+    A `user_limiter` (UserRateLimiter) adds per-user limits, so one user
+    can't take every worker; over them submit_* raises RateLimited.
+    """
+
+    def __init__(self, llm_workers=4, transcribe_workers=1, model_size=None, max_finished_jobs=1000,
+                 max_pending=None, batch_transcription=False, max_batch=8, batch_wait_ms=50, user_limiter=None):
+        self.model_size = model_size
+        self.max_finished_jobs = max_finished_jobs
+        self.max_pending = max_pending
+        self.user_limiter = user_limiter
+        self._llm_pool = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="mood-llm")
+        self._transcribe_workers = transcribe_workers
+        self._audio_pool = None
+        self._batcher = None
+        self._batch_options = (max_batch, batch_wait_ms) if batch_transcription else None
+        self._jobs = {}
+        self._finished = []
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_audio_pool(self):
+        with self._lock:
+            if self._audio_pool is None:
+                self._audio_pool = ProcessPoolExecutor(
+                    max_workers=self._transcribe_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                    initargs=(self.model_size,),
+                )
+            return self._audio_pool
+
+    def _get_batcher(self):
+        with self._lock:
+            if self._batcher is None:
+                from .transcription import WhisperBatcher
+                max_batch, wait_ms = self._batch_options
+                self._batcher = WhisperBatcher(self.model_size, max_batch=max_batch, max_wait_ms=wait_ms)
+            return self._batcher
+
+    def _register(self, job):
+        with self._lock:
+            # Bounded queue: shed load early instead of letting latency grow without limit
+            if self.max_pending is not None and self._pending >= self.max_pending:
+                raise ServiceBusy(f"{self._pending} jobs already pending")
+            if self.user_limiter is not None:
+                self.user_limiter.acquire(job.user_id)
+            self._pending += 1
+            self._jobs[job.id] = job
+        return job.id
+
+    @property
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def _finish(self, job, result=None, error=None):
+        if job.finished:
+            return
+        job.result = result
+        job.error = error
+        job.status = FAILED if error else DONE
+        job.finished_at = time.time()
+        job.audio = None
+        if job.trace is not None:
+            job.trace.finish()
+        job._done.set()
+        with self._lock:
+            self._pending -= 1
+            if self.user_limiter is not None:
+                self.user_limiter.release(job.user_id)
+            self._finished.append(job.id)
+            # Keep memory bounded for long-lived servers
+            while len(self._finished) > self.max_finished_jobs:
+                self._jobs.pop(self._finished.pop(0), None)
+
+    def _run_pipeline(self, job):
+        job.status = RUNNING
+        if job.started_at is None:
+            job.started_at = time.time()
+        try:
+            from . import main  # imported once per process, not once per request
+            with activate(job.trace), listen(job.record_progress):
+                result = main.run(job.input_text, request_id=job.id, user_id=job.user_id)
+        except Exception as e:
+            self._finish(job, error=str(e))
+            return
+        # Finished outside the trace's activation, so this thread's profile is complete when it is dumped
+        self._finish(job, result=result)
+
+    def _run_streaming(self, job, model_size):
+        # Streaming transcribes in this thread (chunk by chunk) so partial
+        # transcripts and mood estimates can be published on the job as they land
+        result = None
+        try:
+            from . import main
+            with activate(job.trace), listen(job.record_progress):
+                for event in main.run_streaming(job.audio, request_id=job.id, user_id=job.user_id,
+                                                model_size=model_size):
+                    job.input_text = event["transcript"]
+                    if event["type"] == "partial":
+                        job.status = RUNNING
+                        job.partial = event["entry"]
+                    elif event["type"] == "final":
+                        result = event["entry"]
+        except Exception as e:
+            self._finish(job, error=str(e))
+            return
+        self._finish(job, result=result)
+
+    def _after_transcription(self, job, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            self._finish(job, error=f"Transcription failed: {e}")
+            return
+        # Worker processes send their spans along; the in-process batcher only returns text
+        batched = not isinstance(result, dict)
+        job.input_text = result if batched else result["text"]
+        if job.trace is not None:
+            # Includes the time spent queued for a worker or a batch
+            outer = job.trace.add("transcribe.job", job.started_at, (time.time() - job.started_at) * 1000,
+                                  batched=batched)
+            if not batched:
+                job.trace.adopt(result["spans"], parent_id=outer["span_id"])
+        self._llm_pool.submit(self._run_pipeline, job)
+
+    def submit_text(self, journal_text, user_id=None):
+        job = Job("text", input_text=journal_text, user_id=user_id)
+        self._register(job)
+        self._llm_pool.submit(self._run_pipeline, job)
+        return job.id
+
+    def submit_audio(self, audio, model_size=None, user_id=None, stream=False):
+        """Queue a recording, given as a file path or the raw bytes of an upload."""
+        job = Job("audio", audio=audio, user_id=user_id)
+        self._register(job)
+        job.status = TRANSCRIBING
+        job.started_at = time.time()
+        if stream:
+            self._llm_pool.submit(self._run_streaming, job, model_size or self.model_size)
+            return job.id
+        if self._batch_options is not None and not model_size:
+            future = self._submit_batched(audio)
+        else:
+            future = self._get_audio_pool().submit(_transcribe_in_worker, audio, model_size or self.model_size)
+        future.add_done_callback(lambda f: self._after_transcription(job, f))
+        return job.id
+
+    def _submit_batched(self, audio):
+        from concurrent.futures import Future
+        from .result_cache import cache_enabled, get_cache, transcript_key
+        from .transcription import DEFAULT_MODEL_SIZE
+
+        if not cache_enabled():
+            return self._get_batcher().submit(audio)
+        cache = get_cache("transcripts")
+        key = transcript_key(audio, self.model_size or DEFAULT_MODEL_SIZE)
+        cached = cache.get(key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        future = self._get_batcher().submit(audio)
+        future.add_done_callback(lambda f: f.exception() is None and cache.set(key, f.result()))
+        return future
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout=None):
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        job._done.wait(timeout)
+        return job
+
+    def result(self, job_id, timeout=None):
+        job = self.wait(job_id, timeout)
+        if not job.finished:
+            raise TimeoutError(f"Job {job_id} did not finish within {timeout} seconds")
+        if job.error:
+            raise Exception(job.error)
+        return job.result
+
+    def shutdown(self, wait=True):
+        if self._batcher is not None:
+            self._batcher.stop()
+        self._llm_pool.shutdown(wait=wait)
+        if self._audio_pool is not None:
+            self._audio_pool.shutdown(wait=wait)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """Process-wide service configured from the environment."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = MoodJobService(
+                    llm_workers=int(os.getenv("MOOD_LLM_WORKERS", "4")),
+                    transcribe_workers=int(os.getenv("MOOD_TRANSCRIBE_WORKERS", "1")),
+                    model_size=os.getenv("WHISPER_MODEL"),
+                    max_pending=int(os.getenv("MOOD_MAX_PENDING_JOBS", "0")) or None,
+                    batch_transcription=os.getenv("WHISPER_BATCH", "0") == "1",
+                    max_batch=int(os.getenv("WHISPER_BATCH_SIZE", "8")),
+                    batch_wait_ms=float(os.getenv("WHISPER_BATCH_WAIT_MS", "50")),
+                    # 0 turns either per-user limit off
+                    user_limiter=UserRateLimiter(
+                        per_minute=int(os.getenv("MOOD_USER_JOBS_PER_MINUTE", "10")) or None,
+                        max_pending=int(os.getenv("MOOD_USER_MAX_PENDING", "2")) or None,
+                    ),
+                )
+    return _service
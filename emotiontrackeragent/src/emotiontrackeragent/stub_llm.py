@@ -0,0 +1,135 @@
+import json
+import os
+import re
+import threading
+import time
+
+from .preclassifier import REFLECTION_TEMPLATES
+from .progress import streaming_active, write_tokens
+
+try:
+    from crewai.llms.base_llm import BaseLLM
+except ImportError:  # the fast path and the benchmarks can run the stub without crewai installed
+    BaseLLM = object
+
+
+# Tiny keyword lexicon, only good enough to make the stub's answers depend on the input
+_MOOD_WORDS = {
+    "anxious": ["anxious", "anxiety", "nervous", "worried", "worry", "scared", "panic", "presentation"],
+    "sad": ["sad", "down", "lonely", "distant", "unmotivated", "cry", "empty", "tired"],
+    "happy": ["happy", "great", "accomplished", "excited", "grateful", "joy", "proud", "good day"],
+    "angry": ["angry", "furious", "annoyed", "frustrated", "unfair", "hate"],
+    "overwhelmed": ["overwhelmed", "too much", "stressed", "pressure", "swamped"],
+}
+
+
+def estimate_tokens(text):
+    # Rough provider-agnostic estimate (~4 characters per token)
+    return max(1, len(text) // 4) if text else 0
+
+
+def classify(text):
+    """Deterministic (mood, confidence) for a piece of text."""
+    lowered = (text or "").lower()
+    scores = {mood: sum(lowered.count(word) for word in words) for mood, words in _MOOD_WORDS.items()}
+    best = max(sorted(scores), key=lambda mood: scores[mood])
+    total = sum(scores.values())
+    if total == 0:
+        return "neutral", 0.5
+    return best, round(min(0.95, 0.55 + 0.4 * scores[best] / total), 2)
+
+
+def _message_text(messages):
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(m.get("content", "")) for m in messages)
+
+
+class StubLLM(BaseLLM):
+    """Deterministic offline stand-in for the Gemini LLM.
+
+    It recognises the mood, coach and logger tasks (and the fast-path
+    prompt) from the messages it is sent, answers from a keyword lexicon,
+    sleeps `latency_s + per_token_s * completion_tokens` to imitate a
+    provider (word by word when the call is streamed, see progress.py),
+    and counts calls and tokens so benchmarks can compare modes.
+    Select it with MOOD_LLM=stub.
+    """
+
+    def __init__(self, model="stub", temperature=None, latency_s=None, per_token_s=None, **kwargs):
+        if BaseLLM is not object:
+            super().__init__(model=model, temperature=temperature)
+        else:
+            self.model = model
+            self.temperature = temperature
+        self.latency_s = float(os.getenv("STUB_LLM_LATENCY_MS", "0")) / 1000 if latency_s is None else latency_s
+        self.per_token_s = float(os.getenv("STUB_LLM_PER_TOKEN_MS", "0")) / 1000 if per_token_s is None else per_token_s
+        self._usage_lock = threading.Lock()
+        self.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def reset_usage(self):
+        with self._usage_lock:
+            self.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _answer(self, prompt):
+        wants_react = "Final Answer:" in prompt
+        if "Journal input:" in prompt and "detect emotional tone" in prompt:
+            journal_text = prompt.split("Journal input:", 1)[1]
+            mood, confidence = classify(journal_text.split("\n\n", 1)[0])
+            answer = f"Mood: {mood}\nConfidence: {confidence}"
+        elif "reflection questions" in prompt:
+            mood = re.search(r"Mood:\s*(\w+)", prompt)
+            questions = REFLECTION_TEMPLATES.get(mood.group(1).lower() if mood else "neutral", REFLECTION_TEMPLATES["neutral"])
+            answer = "\n".join(f"{i}. {q}" for i, q in enumerate(questions, 1))
+        elif "structured journal entry" in prompt or '"reflections"' in prompt:
+            mood = re.search(r"Mood:\s*(\w+)", prompt)
+            confidence = re.search(r"Confidence:\s*([0-9.]+)", prompt)
+            if mood:
+                mood, confidence = mood.group(1).lower(), float(confidence.group(1)) if confidence else 0.5
+            else:
+                # Fast path: a single call that sees the journal text directly
+                journal_text = prompt.rsplit("Journal entry:", 1)[-1]
+                mood, confidence = classify(journal_text)
+            questions = re.findall(r"^\d+\.\s*(.+)$", prompt, flags=re.MULTILINE) or REFLECTION_TEMPLATES[mood]
+            entry = {
+                "mood": mood,
+                "confidence": confidence,
+                "reflections": [{"prompt": q, "response": ""} for q in questions[:3]],
+            }
+            answer = json.dumps(entry, indent=2)
+            if wants_react:
+                answer = f"```json\n{answer}\n```"
+        else:
+            answer = "I don't have enough context to answer that."
+        return f"Thought: I now can give a great answer\nFinal Answer: {answer}" if wants_react else answer
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        prompt = _message_text(messages)
+        answer = self._answer(prompt)
+        completion_tokens = estimate_tokens(answer)
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            self.usage["prompt_tokens"] += estimate_tokens(prompt)
+            self.usage["completion_tokens"] += completion_tokens
+        if streaming_active():
+            # About the same total delay, but the answer arrives word by word after the first-token latency
+            if self.latency_s > 0:
+                time.sleep(self.latency_s)
+            for piece in re.findall(r"\S+\s*", answer):
+                if self.per_token_s > 0:
+                    time.sleep(self.per_token_s * estimate_tokens(piece))
+                write_tokens(piece)
+            return answer
+        delay = self.latency_s + self.per_token_s * completion_tokens
+        if delay > 0:
+            time.sleep(delay)
+        return answer
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return False
+
+    def get_context_window_size(self):
+        return 32768
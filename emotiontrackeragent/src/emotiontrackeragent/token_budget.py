@@ -0,0 +1,377 @@
+"""Token accounting, input budgets and prompt-prefix caching for the LLM calls.
+
+- `MeteredLLM` wraps the LLM each agent (and the fast path) uses and
+  records prompt/completion tokens per agent into the `Usage` of the entry
+  being processed (see `track_usage`), plus process-wide totals.
+- `fit_to_budget` keeps journal text under MAX_INPUT_TOKENS before it
+  reaches an LLM, by extractive summarization (default) or head+tail
+  truncation (INPUT_BUDGET_STRATEGY=truncate).
+- Prompts keep their static part (agent role/backstory, task
+  instructions, schema) first so provider-side prefix caching can reuse
+  it; for providers that need explicit markers (Anthropic) the system
+  message is marked cacheable.
+
+Token counts are what the provider reported for the completion (see
+`reporting_llm`, or a response with a `usage`); otherwise estimates (~4
+characters per token, or tiktoken when it is installed). Costs come from
+MODEL_PRICES or LLM_PRICE_INPUT/LLM_PRICE_OUTPUT.
+"""
+import contextlib
+import contextvars
+import os
+import re
+import threading
+
+from .preclassifier import lexicon_scores, tokenize
+from .progress import streaming
+from .tracing import span
+
+try:
+    from crewai.llms.base_llm import BaseLLM
+except ImportError:  # the fast path and the benchmarks can run without crewai installed
+    BaseLLM = object
+
+
+MAX_INPUT_TOKENS = int(os.getenv("MAX_INPUT_TOKENS", "2000"))
+INPUT_BUDGET_STRATEGY = os.getenv("INPUT_BUDGET_STRATEGY", "summarize")
+
+# USD per million tokens: (input, output)
+MODEL_PRICES = {
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_encoding = None
+
+
+def estimate_tokens(text):
+    global _encoding
+    if not text:
+        return 0
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def message_tokens(messages):
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    total = 0
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = " ".join(str(block.get("text", "")) for block in content if isinstance(block, dict))
+        total += 4 + estimate_tokens(str(content))  # role and separators
+    return total
+
+
+def model_price(model=None):
+    """(input, output) USD per million tokens for `model`, or None if unknown."""
+    if os.getenv("LLM_PRICE_INPUT") and os.getenv("LLM_PRICE_OUTPUT"):
+        return float(os.getenv("LLM_PRICE_INPUT")), float(os.getenv("LLM_PRICE_OUTPUT"))
+    name = (model or os.getenv("MODEL", "gemini-1.5-flash")).split("/")[-1]
+    # Longest matching prefix, so "gemini-1.5-flash-8b-001" doesn't price as plain flash
+    matches = [key for key in MODEL_PRICES if name.startswith(key)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(prompt_tokens, completion_tokens, model=None):
+    price = model_price(model)
+    if price is None:
+        return None
+    return round((prompt_tokens * price[0] + completion_tokens * price[1]) / 1e6, 8)
+
+
+def _sentences(text):
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+def truncate_to_budget(text, max_tokens):
+    """Keep the opening and the end of the text (where the conclusion usually is), cut at sentences."""
+    sentences = _sentences(text)
+    max_tokens -= estimate_tokens("[...]")
+    head_budget = int(max_tokens * 0.6)
+    head, tail, used = [], [], 0
+    for sentence in sentences:
+        cost = estimate_tokens(sentence)
+        if used + cost > head_budget:
+            break
+        head.append(sentence)
+        used += cost
+    for sentence in reversed(sentences[len(head):]):
+        cost = estimate_tokens(sentence)
+        if used + cost > max_tokens:
+            break
+        tail.insert(0, sentence)
+        used += cost
+    if not head and not tail:
+        return text[:max_tokens * 4]  # one enormous "sentence": fall back to characters
+    return " ".join(head + ["[...]"] + tail)
+
+
+def summarize_to_budget(text, max_tokens):
+    """Extractive summary: the most emotionally loaded sentences, in their original order.
+
+    Sentences are scored by mood-lexicon hits (the signal the agents need),
+    with a small bonus for the opening and closing sentences.
+    """
+    sentences = _sentences(text)
+    scored = []
+    for index, sentence in enumerate(sentences):
+        tokens = tokenize(sentence)
+        score = sum(lexicon_scores(tokens).values()) * 2 + sum(t in ("i", "i'm", "me", "my", "feel", "felt")
+                                                               for t in tokens) * 0.5
+        if index == 0 or index == len(sentences) - 1:
+            score += 1
+        scored.append((score, -index, index, sentence))
+    chosen, used = [], 0
+    for score, _, index, sentence in sorted(scored, reverse=True):
+        cost = estimate_tokens(sentence)
+        if used + cost > max_tokens:
+            continue
+        chosen.append((index, sentence))
+        used += cost
+    if not chosen:
+        return truncate_to_budget(text, max_tokens)
+    return " ".join(sentence for _, sentence in sorted(chosen))
+
+
+def fit_to_budget(text, max_tokens=None, strategy=None):
+    """Return (text, original_tokens); text is shortened only if it is over `max_tokens`."""
+    max_tokens = max_tokens or MAX_INPUT_TOKENS
+    original = estimate_tokens(text)
+    if original <= max_tokens:
+        return text, original
+    if (strategy or INPUT_BUDGET_STRATEGY) == "truncate":
+        return truncate_to_budget(text, max_tokens), original
+    return summarize_to_budget(text, max_tokens), original
+
+
+class Usage:
+    """Token counts for one entry, per agent (or "fast" for the single-call path)."""
+
+    def __init__(self):
+        self.by_agent = {}
+        self.input_tokens = None
+        self.sent_input_tokens = None
+        self._lock = threading.Lock()
+
+    def add(self, label, prompt_tokens, completion_tokens):
+        with self._lock:
+            counts = self.by_agent.setdefault(label, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            counts["calls"] += 1
+            counts["prompt_tokens"] += prompt_tokens
+            counts["completion_tokens"] += completion_tokens
+
+    def note_input(self, original_tokens, sent_tokens):
+        self.input_tokens, self.sent_input_tokens = original_tokens, sent_tokens
+
+    def summary(self, model=None):
+        with self._lock:
+            by_agent = {label: dict(counts) for label, counts in self.by_agent.items()}
+        prompt = sum(c["prompt_tokens"] for c in by_agent.values())
+        completion = sum(c["completion_tokens"] for c in by_agent.values())
+        for counts in by_agent.values():
+            counts["cost_usd"] = estimate_cost(counts["prompt_tokens"], counts["completion_tokens"], model)
+        return {
+            "calls": sum(c["calls"] for c in by_agent.values()),
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "cost_usd": estimate_cost(prompt, completion, model),
+            "input_tokens": self.input_tokens,
+            "input_trimmed": self.input_tokens is not None and self.sent_input_tokens < self.input_tokens,
+            "by_agent": by_agent,
+        }
+
+
+_current_usage = contextvars.ContextVar("token_usage", default=None)
+_totals = Usage()
+
+
+@contextlib.contextmanager
+def track_usage():
+    """Collect the tokens of every metered LLM call made in this context into a fresh Usage."""
+    usage = Usage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+def current_usage():
+    return _current_usage.get()
+
+
+def totals(model=None):
+    """Process-wide token counts since start-up."""
+    return _totals.summary(model)
+
+
+def uses_cache_markers(model):
+    # Anthropic only caches prompt prefixes that are explicitly marked; OpenAI and
+    # Gemini cache long stable prefixes automatically
+    name = (model or "").lower()
+    return "anthropic" in name or "claude" in name
+
+
+def mark_prefix_cache(messages):
+    """Copy of `messages` with the system prompt marked as a cacheable prefix."""
+    marked = []
+    for message in messages:
+        if message.get("role") == "system" and isinstance(message.get("content"), str):
+            message = dict(message, content=[{"type": "text", "text": message["content"],
+                                              "cache_control": {"type": "ephemeral"}}])
+        marked.append(message)
+    return marked
+
+
+_reported_usage = contextvars.ContextVar("reported_usage", default=None)
+_reporting_class = None
+
+
+class _UsageReport:
+    usage = None
+
+
+def report_usage(usage):
+    """Record the usage the provider returned for the LLM call running in this context.
+
+    Only a `MeteredLLM.call` in progress in this context (or in a ResilientLLM attempt
+    copied from it) receives it; outside one, and once the call has returned, it is dropped.
+    """
+    report = _reported_usage.get()
+    if report is not None and usage is not None:
+        report.usage = usage
+
+
+class UsageReporter:
+    """Callback that crewai's LLM.call hands each completion's usage to, before it returns."""
+
+    def log_success_event(self, kwargs=None, response_obj=None, start_time=None, end_time=None):
+        report_usage(response_obj.get("usage") if isinstance(response_obj, dict) else getattr(
+            response_obj, "usage", None))
+
+
+def reporting_llm(**kwargs):
+    """crewai's LLM, reporting the usage of each completion to the metered call above it.
+
+    LLM.call passes the completion's usage to its callbacks itself, in the calling thread.
+    It would also register them with litellm globally, where litellm invokes them later
+    from its own threads and for other requests' completions; the reporter is kept out.
+    """
+    global _reporting_class
+    if _reporting_class is None:
+        from crewai import LLM
+
+        class ReportingLLM(LLM):
+            def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+                return super().call(messages, tools=tools, callbacks=[*(callbacks or []), UsageReporter()],
+                                    available_functions=available_functions, **kwargs)
+
+            def set_callbacks(self, callbacks):
+                callbacks = [callback for callback in callbacks if not isinstance(callback, UsageReporter)]
+                if callbacks:
+                    super().set_callbacks(callbacks)
+
+        _reporting_class = ReportingLLM
+    return _reporting_class(**kwargs)
+
+
+def reported_tokens(usage):
+    """(prompt_tokens, completion_tokens) from a provider usage object or dict, or None."""
+    if usage is None:
+        return None
+    get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+    prompt, completion = get("prompt_tokens"), get("completion_tokens")
+    if isinstance(prompt, int) and isinstance(completion, int):
+        return prompt, completion
+    return None
+
+
+class WrappedLLM(BaseLLM):
+    """Base of the LLM wrappers: unknown attributes and the stop words go to the wrapped `llm`.
+
+    CrewAI's agent executor sets its ReAct stop words ("\\nObservation:") on the agent's LLM,
+    which is the outermost wrapper; they only take effect on the provider LLM underneath.
+    """
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    def _wrapped(self):
+        return [self.__dict__["llm"]] if "llm" in self.__dict__ else []
+
+    @property
+    def stop(self):
+        wrapped = self._wrapped()
+        return getattr(wrapped[0], "stop", None) if wrapped else self.__dict__.get("_stop")
+
+    @stop.setter
+    def stop(self, value):
+        wrapped = self._wrapped()
+        if not wrapped:
+            self.__dict__["_stop"] = value  # BaseLLM.__init__ runs before the wrapped LLM is attached
+        for llm in wrapped:
+            llm.stop = value
+
+
+class MeteredLLM(WrappedLLM):
+    """Counts tokens for calls made through `llm` under `label` (usually the agent name)."""
+
+    def __init__(self, llm, label):
+        if BaseLLM is not object:
+            super().__init__(model=getattr(llm, "model", label), temperature=getattr(llm, "temperature", None))
+        self.llm = llm
+        self.label = label
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        if not isinstance(messages, str) and uses_cache_markers(getattr(self.llm, "model", None)):
+            messages = mark_prefix_cache(messages)
+        # Streamed agents publish their answer as it arrives (see progress.py)
+        report = _UsageReport()
+        token = _reported_usage.set(report)
+        try:
+            with span(f"llm.{self.label}") as attrs, streaming(self.label) as stream:
+                response = self.llm.call(messages, tools=tools, callbacks=callbacks,
+                                         available_functions=available_functions, **kwargs)
+                text = response if isinstance(response, str) else str(response)
+                if stream is not None:
+                    stream.finish(text)
+                reported = reported_tokens(report.usage or getattr(response, "usage", None))
+                if reported is not None:
+                    prompt_tokens, completion_tokens = reported
+                else:
+                    prompt_tokens, completion_tokens = message_tokens(messages), estimate_tokens(text)
+                attrs.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                             usage_source="provider" if reported is not None else "estimate")
+        finally:
+            _reported_usage.reset(token)
+        _totals.add(self.label, prompt_tokens, completion_tokens)
+        usage = _current_usage.get()
+        if usage is not None:
+            usage.add(self.label, prompt_tokens, completion_tokens)
+        return response
+
+    def supports_function_calling(self):
+        return self.llm.supports_function_calling()
+
+    def supports_stop_words(self):
+        return self.llm.supports_stop_words()
+
+    def get_context_window_size(self):
+        return self.llm.get_context_window_size()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Tokens and estimated LLM cost per journal entry, from the journal store.
+
+    python -m emotiontrackeragent.token_report [--user-id ID] [--from 2025-01-01] [--to 2025-01-31] [--limit 50] [--json]
+
+Lists every LLM-analysed entry with its prompt/completion tokens and cost,
+then totals per agent and the average per entry. Entries answered by the
+local tier or the cache (tier "cache", zero calls) cost nothing and are only
+counted, per tier.
+"""
+import argparse
+import json
+from collections import Counter
+
+from .journal_store import get_store
+
+
+def build_report(rows):
+    entries, per_agent = [], {}
+    free = Counter()
+    for row in rows:
+        usage = row["entry"].get("usage")
+        if not usage or not usage.get("calls"):
+            free[row["entry"].get("tier") or "unknown"] += 1
+            continue
+        entries.append({
+            "id": row["id"],
+            "date": row["date"],
+            "calls": usage["calls"],
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "cost_usd": usage.get("cost_usd"),
+            "input_trimmed": usage.get("input_trimmed", False),
+        })
+        for agent, counts in usage.get("by_agent", {}).items():
+            totals = per_agent.setdefault(agent, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0})
+            for key in ("calls", "prompt_tokens", "completion_tokens"):
+                totals[key] += counts[key]
+            totals["cost_usd"] += counts.get("cost_usd") or 0.0
+    count = len(entries)
+    total_cost = sum(e["cost_usd"] or 0.0 for e in entries)
+    return {
+        "llm_entries": count,
+        "free_entries": sum(free.values()),
+        "free_by_tier": dict(free),
+        "trimmed_entries": sum(e["input_trimmed"] for e in entries),
+        "prompt_tokens": sum(e["prompt_tokens"] for e in entries),
+        "completion_tokens": sum(e["completion_tokens"] for e in entries),
+        "cost_usd": round(total_cost, 6),
+        "avg_tokens_per_entry": round(sum(e["prompt_tokens"] + e["completion_tokens"] for e in entries) / count, 1)
+        if count else None,
+        "avg_cost_per_entry_usd": round(total_cost / count, 8) if count else None,
+        "per_agent": per_agent,
+        "entries": entries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id")
+    parser.add_argument("--from", dest="date_from")
+    parser.add_argument("--to", dest="date_to")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    rows = get_store().list_entries(user_id=args.user_id, date_from=args.date_from, date_to=args.date_to,
+                                    limit=args.limit)
+    report = build_report(rows)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'entry':34} {'date':10} {'calls':>5} {'prompt':>8} {'output':>8} {'cost $':>10}")
+    for e in report["entries"]:
+        cost = f"{e['cost_usd']:.6f}" if e["cost_usd"] is not None else "?"
+        print(f"{e['id']:34} {e['date']:10} {e['calls']:>5} {e['prompt_tokens']:>8} {e['completion_tokens']:>8} "
+              f"{cost:>10}{'  (trimmed)' if e['input_trimmed'] else ''}")
+    print()
+    for agent, totals in sorted(report["per_agent"].items()):
+        print(f"{agent:16} calls={totals['calls']:<5} prompt={totals['prompt_tokens']:<8} "
+              f"output={totals['completion_tokens']:<8} cost=${totals['cost_usd']:.6f}")
+    print(f"\n{report['llm_entries']} LLM entries ({report['trimmed_entries']} trimmed to budget), "
+          f"{report['free_entries']} answered locally or from cache {report['free_by_tier']}; total ${report['cost_usd']:.6f}, "
+          f"avg {report['avg_tokens_per_entry']} tokens / ${report['avg_cost_per_entry_usd']} per entry")
+
+
+if __name__ == "__main__":
+    main()
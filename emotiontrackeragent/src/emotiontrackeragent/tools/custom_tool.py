@@ -1,19 +1,40 @@
 from crewai.tools import BaseTool
-from typing import Type
+from typing import Literal, Optional, Type
 from pydantic import BaseModel, Field
 
+from ..journal_index import answer, current_user, get_journal_indexes
 
-class MyCustomToolInput(BaseModel):
-    """Input schema for MyCustomTool."""
-    argument: str = Field(..., description="Description of the argument.")
+NO_HISTORY = "No journal history is available for this user."
 
-class MyCustomTool(BaseTool):
-    name: str = "Name of my tool"
+
+class JournalSearchInput(BaseModel):
+    """Input schema for JournalSearchTool."""
+    action: Literal["entries", "trend", "search"] = Field(
+        ..., description="'entries': entries by mood and/or date range; 'trend': confidence over time; "
+                         "'search': entries containing the words in `query`.")
+    query: Optional[str] = Field(None, description="Words to look for (action 'search' only).")
+    mood: Optional[str] = Field(None, description="Only entries with this mood, e.g. 'anxious'.")
+    days: Optional[int] = Field(None, description="Only the last N days (instead of date_from/date_to).")
+    date_from: Optional[str] = Field(None, description="First date, YYYY-MM-DD.")
+    date_to: Optional[str] = Field(None, description="Last date, YYYY-MM-DD.")
+    limit: int = Field(5, description="Maximum number of entries to return (1-10).")
+
+
+class JournalSearchTool(BaseTool):
+    name: str = "Journal search"
     description: str = (
-        "Clear description for what this tool is useful for, your agent will need this information to use it."
+        "Look up the user's past journal entries: entries with a mood in a date range, the trend of "
+        "mood confidence over time, or entries mentioning some words. Returns one short line per entry."
     )
-    args_schema: Type[BaseModel] = MyCustomToolInput
+    args_schema: Type[BaseModel] = JournalSearchInput
 
-    def _run(self, argument: str) -> str:
-        # Implementation goes here
-        return "this is an example of a tool output, ignore it and move along."
+    def _run(self, action: str, query: Optional[str] = None, mood: Optional[str] = None,
+             days: Optional[int] = None, date_from: Optional[str] = None, date_to: Optional[str] = None,
+             limit: int = 5) -> str:
+        user_id = current_user()
+        if user_id is None:
+            # Anonymous requests (CLI, batch, API without user_id) have no history of their own
+            return NO_HISTORY
+        # Served from in-memory indexes of the current user's entries (see journal_index.py)
+        index = get_journal_indexes().index(user_id)
+        return answer(index, action, query, mood, days, date_from, date_to, limit)
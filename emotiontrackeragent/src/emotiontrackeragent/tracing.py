@@ -0,0 +1,317 @@
+"""Per-request tracing: timed spans for each pipeline stage, exported as JSON lines.
+
+A trace covers one journal entry (one service job, or one `main.run` call
+outside the service). Code marks its stages with `span(name, **attrs)`;
+spans record wall time, the thread they ran on and the change in process
+RSS, and nest under whichever span is open in the same context. Outside a
+trace, `span` does nothing.
+
+Finished traces are appended to TRACE_LOG (logs/traces.jsonl), one span per
+line, and, when OTEL_EXPORTER_OTLP_ENDPOINT is set and the opentelemetry SDK
+is installed, sent to that collector as well. TRACING=0 turns all of it off.
+
+With PROFILE_SLOW_MS set, every request is also profiled (cProfile, or
+pyinstrument with PROFILER=pyinstrument) and the profile of any request
+slower than that is written to PROFILE_DIR (logs/profiles).
+
+RSS is process-wide, so with concurrent requests a span's memory delta also
+includes whatever the other requests allocated meanwhile.
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+TRACE_LOG = os.getenv("TRACE_LOG", os.path.join("logs", "traces.jsonl"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("logs", "profiles"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILER = os.getenv("PROFILER", "cprofile")
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("trace_span", default=None)
+_export_lock = threading.Lock()
+# cProfile and pyinstrument can't run two profilers at once in one process, so requests take turns
+_profile_lock = threading.Lock()
+_otel_tracer = None
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def tracing_enabled():
+    return os.getenv("TRACING", "1").lower() not in ("0", "false", "no", "off")
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # peak, where /proc is missing
+
+
+class Trace:
+    """Spans of one request. Spans may be added from several threads (and merged in from worker processes)."""
+
+    def __init__(self, trace_id=None, **attrs):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.attrs = attrs
+        self.start = time.time()
+        self.end = None
+        self.spans = []
+        self.profile_path = None
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def add(self, name, start, duration_ms, parent_id=None, span_id=None, **attrs):
+        record = {
+            "span_id": span_id or uuid.uuid4().hex[:16],
+            "parent_id": parent_id,
+            "name": name,
+            "start": start,
+            "duration_ms": round(duration_ms, 3),
+            "attrs": attrs,
+        }
+        with self._lock:
+            self.spans.append(record)
+        return record
+
+    def adopt(self, spans, parent_id=None):
+        """Merge spans recorded by another process (see `collect`), re-rooting its top-level spans."""
+        for record in spans:
+            record = dict(record)
+            if record["parent_id"] is None:
+                record["parent_id"] = parent_id
+            with self._lock:
+                self.spans.append(record)
+
+    @property
+    def duration_ms(self):
+        return ((self.end or time.time()) - self.start) * 1000
+
+    @contextlib.contextmanager
+    def activate(self, profile=True):
+        """Make this the current trace in this thread, profiling the work done here if enabled."""
+        token = _current_trace.set(self)
+        span_token = _current_span.set(None)
+        profiler = _start_profiler() if profile and PROFILE_SLOW_MS else None
+        try:
+            yield self
+        finally:
+            if profiler is not None:
+                self._profiles.append(_stop_profiler(profiler))
+            _current_span.reset(span_token)
+            _current_trace.reset(token)
+
+    def finish(self, export=True):
+        if self.end is not None:
+            return
+        self.end = time.time()
+        if self._profiles and self.duration_ms >= PROFILE_SLOW_MS:
+            self.profile_path = _dump_profiles(self.trace_id, self._profiles)
+        self._profiles = []
+        if export and tracing_enabled():
+            _export(self)
+
+    def summary(self):
+        """Stage breakdown for display: spans in start order with their nesting depth."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        depth = {}
+        stages = []
+        for record in spans:
+            depth[record["span_id"]] = depth.get(record["parent_id"], -1) + 1
+            stages.append({
+                "name": record["name"],
+                "depth": depth[record["span_id"]],
+                "offset_ms": round((record["start"] - self.start) * 1000, 1),
+                "duration_ms": record["duration_ms"],
+                "rss_delta_mb": record["attrs"].get("rss_delta_mb"),
+                "thread": record["attrs"].get("thread"),
+            })
+        return {
+            "trace_id": self.trace_id,
+            "duration_ms": round(self.duration_ms, 1),
+            "profile": self.profile_path,
+            "stages": stages,
+        }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def start_trace(trace_id=None, **attrs):
+    """A new trace that isn't active anywhere yet; activate it per thread with `Trace.activate()`."""
+    return Trace(trace_id, **attrs) if tracing_enabled() else None
+
+
+def activate(started):
+    """`started.activate()`, or a no-op for the None that `start_trace` returns with tracing off."""
+    return started.activate() if started is not None else contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def trace(trace_id=None, **attrs):
+    """Trace the enclosed request, unless it is already part of one (then this is a no-op)."""
+    if _current_trace.get() is not None or not tracing_enabled():
+        yield _current_trace.get()
+        return
+    new = Trace(trace_id, **attrs)
+    try:
+        with new.activate():
+            yield new
+    finally:
+        new.finish()
+
+
+@contextlib.contextmanager
+def collect():
+    """Record spans without exporting them, e.g. in a worker process that hands them back to the parent."""
+    new = Trace()
+    with new.activate(profile=False):
+        yield new
+    new.finish(export=False)
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as a stage of the current trace. Yields the attrs dict, for results."""
+    current = _current_trace.get()
+    if current is None:
+        yield attrs
+        return
+    parent = _current_span.get()
+    span_id = uuid.uuid4().hex[:16]
+    token = _current_span.set(span_id)
+    start = time.time()
+    begin = time.perf_counter()
+    rss_before = _rss_bytes()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - begin) * 1000
+        _current_span.reset(token)
+        attrs["rss_delta_mb"] = round((_rss_bytes() - rss_before) / 2 ** 20, 2)
+        attrs["thread"] = threading.current_thread().name
+        current.add(name, start, duration_ms, parent_id=parent, span_id=span_id, **attrs)
+
+
+def _export(finished):
+    lines = [json.dumps(dict(record, trace_id=finished.trace_id, trace_attrs=finished.attrs))
+             for record in sorted(finished.spans, key=lambda s: s["start"])]
+    try:
+        directory = os.path.dirname(TRACE_LOG)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _export_lock, open(TRACE_LOG, "a") as f:
+            f.write("\n".join(lines) + "\n")
+    except OSError:
+        logger.warning("Could not write trace %s to %s", finished.trace_id, TRACE_LOG, exc_info=True)
+    if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        _export_otel(finished)
+
+
+def _get_otel_tracer():
+    global _otel_tracer
+    if _otel_tracer is None:
+        with _export_lock:
+            if _otel_tracer is None:
+                try:
+                    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                    from opentelemetry.sdk.resources import Resource
+                    from opentelemetry.sdk.trace import TracerProvider
+                    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+                except ImportError:
+                    logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but the opentelemetry SDK and "
+                                   "OTLP HTTP exporter are not installed; traces go to %s only", TRACE_LOG)
+                    _otel_tracer = False
+                    return _otel_tracer
+                provider = TracerProvider(resource=Resource.create({
+                    "service.name": os.getenv("OTEL_SERVICE_NAME", "emotiontrackeragent")}))
+                # The exporter reads the endpoint and headers from the standard OTEL_* variables
+                provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                _otel_tracer = provider.get_tracer("emotiontrackeragent")
+    return _otel_tracer
+
+
+def _export_otel(finished):
+    tracer = _get_otel_tracer()
+    if not tracer:
+        return
+    from opentelemetry import trace as otel_trace
+
+    # Spans are replayed after the fact with their recorded times; parents always start before children
+    root = tracer.start_span("request", start_time=int(finished.start * 1e9),
+                             attributes={"trace_id": finished.trace_id, **_otel_attrs(finished.attrs)})
+    started = {None: root}
+    for record in sorted(finished.spans, key=lambda s: s["start"]):
+        parent = started.get(record["parent_id"], root)
+        otel_span = tracer.start_span(record["name"], context=otel_trace.set_span_in_context(parent),
+                                      start_time=int(record["start"] * 1e9), attributes=_otel_attrs(record["attrs"]))
+        otel_span.end(end_time=int((record["start"] + record["duration_ms"] / 1000) * 1e9))
+        started[record["span_id"]] = otel_span
+    root.end(end_time=int(finished.end * 1e9))
+
+
+def _otel_attrs(attrs):
+    return {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+            for key, value in attrs.items() if value is not None}
+
+
+def _start_profiler():
+    if not _profile_lock.acquire(blocking=False):
+        return None  # another request is being profiled right now
+    try:
+        if PROFILER == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode="disabled")
+            profiler.start()
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+    except Exception:
+        _profile_lock.release()
+        logger.warning("Could not start the %s profiler", PROFILER, exc_info=True)
+        return None
+
+
+def _stop_profiler(profiler):
+    try:
+        if PROFILER == "pyinstrument":
+            profiler.stop()
+        else:
+            profiler.disable()
+    finally:
+        _profile_lock.release()
+    return profiler
+
+
+def _dump_profiles(trace_id, profiles):
+    """Write a slow request's profile(s); returns the path of the first file."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if PROFILER == "pyinstrument":
+        paths = []
+        for index, profiler in enumerate(profiles):
+            paths.append(os.path.join(PROFILE_DIR, f"{trace_id}-{index}.html"))
+            with open(paths[-1], "w") as f:
+                f.write(profiler.output_html())
+        return paths[0]
+    import pstats
+    # Segments of one request that ran on different threads are merged into one stats file
+    stats = pstats.Stats(profiles[0])
+    for profiler in profiles[1:]:
+        stats.add(profiler)
+    path = os.path.join(PROFILE_DIR, f"{trace_id}.prof")
+    stats.dump_stats(path)
+    return path
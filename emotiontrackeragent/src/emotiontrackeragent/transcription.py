@@ -0,0 +1,539 @@
+import os
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+
+from .tracing import span
+
+
+DEFAULT_MODEL_SIZE = os.getenv("WHISPER_MODEL", "small")
+SAMPLE_RATE = 16000  # what Whisper expects
+STREAM_WINDOW_SECONDS = float(os.getenv("WHISPER_STREAM_WINDOW_SECONDS", "30"))
+MAX_AUDIO_SECONDS = float(os.getenv("WHISPER_MAX_AUDIO_SECONDS", "900"))
+OVERLONG_AUDIO = os.getenv("WHISPER_OVERLONG_AUDIO", "truncate")  # or "reject"
+SILENCE_DB = float(os.getenv("WHISPER_SILENCE_DB", "-40"))  # relative to the loudest frame
+
+
+def _env_list(name, default):
+    value = os.getenv(name)
+    if not value:
+        return default
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class WhisperModelPool:
+    """Keeps loaded Whisper models in memory so each size is only loaded once per process.
+
+    Models are evicted when they have been idle for longer than `idle_seconds`
+    (checked by a background reaper thread, so an idle process lets go of them
+    too) or when more than `max_models` are resident (least recently used first).
+    Models come from `backend` (see whisper_backends; WHISPER_BACKEND by
+    default) unless a plain `loader(size)` is given.
+
+    Inference on one model is serialized: openai-whisper installs kv-cache hooks
+    on the model for each decode, so concurrent decodes would corrupt each other.
+    """
+
+    def __init__(self, allowed_sizes=None, max_models=1, idle_seconds=900, loader=None, backend=None):
+        self.allowed_sizes = set(allowed_sizes) if allowed_sizes else None
+        self.max_models = max(1, int(max_models))
+        self.idle_seconds = float(idle_seconds)
+        self._loader = loader
+        self._backend = backend
+        self._models = OrderedDict()  # size -> (model, last_used)
+        self._lock = threading.Lock()
+        self._size_locks = {}
+        self._inference_locks = {}
+        self._reaper = None
+        self._metrics = {
+            "loads": 0,
+            "load_seconds": 0.0,
+            "evictions": 0,
+            "transcriptions": 0,
+            "inference_seconds": 0.0,
+            "per_size": {},
+        }
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            from .whisper_backends import make_backend
+            self._backend = make_backend()
+        return self._backend
+
+    def _load_model(self, size):
+        if self._loader is not None:
+            return self._loader(size)
+        return self.backend.load(size)
+
+    def _size_metrics(self, size):
+        return self._metrics["per_size"].setdefault(size, {
+            "loads": 0,
+            "last_load_seconds": 0.0,
+            "transcriptions": 0,
+            "inference_seconds": 0.0,
+        })
+
+    def _evict_locked(self, now):
+        # Drop idle models first, then trim to the LRU cap
+        for size, (_, last_used) in list(self._models.items()):
+            if now - last_used > self.idle_seconds:
+                del self._models[size]
+                self._metrics["evictions"] += 1
+        while len(self._models) > self.max_models:
+            self._models.popitem(last=False)
+            self._metrics["evictions"] += 1
+
+    def _start_reaper_locked(self):
+        if self._reaper is not None or self.idle_seconds <= 0:
+            return
+        interval = min(max(self.idle_seconds / 2, 1.0), 60.0)
+
+        def reap():
+            while True:
+                time.sleep(interval)
+                self.evict_idle()
+
+        self._reaper = threading.Thread(target=reap, name="whisper-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def inference_lock(self, size=None):
+        """Lock to hold while running the `size` model (see the class docstring)."""
+        with self._lock:
+            return self._inference_locks.setdefault(size or DEFAULT_MODEL_SIZE, threading.Lock())
+
+    def get(self, size=None):
+        size = size or DEFAULT_MODEL_SIZE
+        if self.allowed_sizes is not None and size not in self.allowed_sizes:
+            raise ValueError(f"Whisper model size '{size}' is not enabled (allowed: {sorted(self.allowed_sizes)})")
+
+        with self._lock:
+            now = time.monotonic()
+            self._evict_locked(now)
+            if size in self._models:
+                model, _ = self._models.pop(size)
+                self._models[size] = (model, now)
+                return model
+            size_lock = self._size_locks.setdefault(size, threading.Lock())
+
+        # Load outside the pool lock so other sizes stay usable while this one loads
+        with size_lock:
+            with self._lock:
+                if size in self._models:
+                    model, _ = self._models.pop(size)
+                    self._models[size] = (model, time.monotonic())
+                    return model
+            start = time.perf_counter()
+            with span("whisper.load", size=size):
+                model = self._load_model(size)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._metrics["loads"] += 1
+                self._metrics["load_seconds"] += elapsed
+                size_metrics = self._size_metrics(size)
+                size_metrics["loads"] += 1
+                size_metrics["last_load_seconds"] = elapsed
+                self._models[size] = (model, time.monotonic())
+                self._evict_locked(time.monotonic())
+                self._start_reaper_locked()
+            return model
+
+    def transcribe(self, audio, size=None, **options):
+        size = size or DEFAULT_MODEL_SIZE
+        model = self.get(size)
+        if self._loader is None:
+            options = {**self.backend.options, **options}
+        with span("whisper.transcribe", size=size), self.inference_lock(size):
+            start = time.perf_counter()
+            result = model.transcribe(audio, **options)
+            elapsed = time.perf_counter() - start
+        with self._lock:
+            self._metrics["transcriptions"] += 1
+            self._metrics["inference_seconds"] += elapsed
+            size_metrics = self._size_metrics(size)
+            size_metrics["transcriptions"] += 1
+            size_metrics["inference_seconds"] += elapsed
+        return result
+
+    def warm(self, sizes=None):
+        for size in sizes or [DEFAULT_MODEL_SIZE]:
+            self.get(size)
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_locked(time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def resident_sizes(self):
+        with self._lock:
+            return list(self._models.keys())
+
+    def metrics(self):
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot["per_size"] = {size: dict(values) for size, values in self._metrics["per_size"].items()}
+            snapshot["resident"] = list(self._models.keys())
+            if self._loader is None and self._backend is not None:
+                snapshot["backend"] = {"name": self._backend.name, "compute_type": self._backend.compute_type}
+            return snapshot
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide pool configured from the environment."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = WhisperModelPool(
+                    allowed_sizes=_env_list("WHISPER_POOL_SIZES", None),
+                    max_models=int(os.getenv("WHISPER_POOL_MAX_MODELS", "1")),
+                    idle_seconds=float(os.getenv("WHISPER_POOL_IDLE_SECONDS", "900")),
+                )
+    return _pool
+
+
+def _pcm_reader(audio_path, read_size):
+    """Yield raw 16 kHz mono s16le PCM from ffmpeg, `read_size` bytes at a time."""
+    proc = subprocess.Popen(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", audio_path,
+         "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        while True:
+            data = proc.stdout.read(read_size)
+            if not data:
+                break
+            yield data
+    except BaseException:
+        # The consumer stopped early (GeneratorExit, e.g. truncation at WHISPER_MAX_AUDIO_SECONDS),
+        # which is not a decode error: stop ffmpeg and skip its exit status
+        proc.kill()
+        proc.stdout.close()
+        proc.stderr.close()
+        proc.wait()
+        raise
+    proc.stdout.close()
+    stderr = proc.stderr.read().decode(errors="replace")
+    proc.stderr.close()
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {audio_path}: {stderr.strip()}")
+
+
+def _quietest_split(samples, search_from, frame=480):
+    """Index of the start of the lowest-energy 30 ms frame at or after `search_from`."""
+    import numpy as np
+    tail = samples[search_from:]
+    frames = len(tail) // frame
+    if frames < 2:
+        return len(samples)
+    energy = np.square(tail[:frames * frame].reshape(frames, frame)).mean(axis=1)
+    return search_from + int(np.argmin(energy)) * frame
+
+
+class AudioTooLong(ValueError):
+    pass
+
+
+def _decode_wav(data):
+    """(float32 mono samples, sample rate) from PCM WAV bytes, or None if it needs ffmpeg."""
+    import io
+    import wave
+    import numpy as np
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None  # float WAV, compressed formats, ...
+    if width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = (raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)) << 8 >> 8
+    elif width in (1, 2, 4):
+        ints = np.frombuffer(frames, dtype={1: np.uint8, 2: np.int16, 4: np.int32}[width])
+    else:
+        return None
+    if channels > 1:
+        # Downmix straight from the integer samples, so there is never a float copy of every channel
+        samples = ints[:len(ints) - len(ints) % channels].reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    else:
+        samples = ints.astype(np.float32)
+    if width == 1:
+        samples -= 128  # 8-bit WAV is unsigned
+    samples *= 1.0 / 2 ** (8 * width - 1)
+    return samples, rate
+
+
+def _resample(samples, rate):
+    import numpy as np
+    if rate == SAMPLE_RATE or not len(samples):
+        return samples
+    if rate > SAMPLE_RATE:
+        # Box filter as a cheap anti-aliasing low-pass before dropping samples
+        width = int(np.ceil(rate / SAMPLE_RATE))
+        samples = np.convolve(samples, np.full(width, 1.0 / width, dtype=np.float32), mode="same")
+    # Interpolate in blocks so the float64 position arrays stay small for long recordings
+    step = rate / SAMPLE_RATE
+    out = np.empty(int(len(samples) / step), dtype=np.float32)
+    block = SAMPLE_RATE * 30
+    for start in range(0, len(out), block):
+        positions = np.arange(start, min(start + block, len(out))) * step
+        lo = int(positions[0])
+        hi = min(len(samples), int(positions[-1]) + 2)
+        out[start:start + len(positions)] = np.interp(positions, np.arange(lo, hi), samples[lo:hi])
+    return out
+
+
+def _decode_ffmpeg(source):
+    import numpy as np
+    if isinstance(source, str):
+        command, data = ["ffmpeg", "-nostdin", "-i", source], None
+    else:
+        command, data = ["ffmpeg", "-i", "pipe:0"], bytes(source)
+    proc = subprocess.run(
+        command + ["-loglevel", "error", "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"],
+        input=data,
+        capture_output=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode audio: {proc.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(proc.stdout, dtype=np.int16).astype(np.float32) / 32768
+
+
+def load_audio(source):
+    """16 kHz mono float32 samples from a file path, the raw bytes of an upload, or a decoded array.
+
+    PCM WAV is decoded in-process; anything else goes through one ffmpeg
+    call fed from memory, so uploads never need a temporary file.
+    """
+    import numpy as np
+    if isinstance(source, np.ndarray):
+        return source.astype(np.float32, copy=False)
+    if isinstance(source, str):
+        if not source.lower().endswith(".wav"):
+            return _decode_ffmpeg(source)
+        with open(source, "rb") as f:
+            source = f.read()
+    decoded = _decode_wav(source)
+    if decoded is None:
+        return _decode_ffmpeg(source)
+    return _resample(*decoded)
+
+
+def trim_silence(samples, threshold_db=None, frame=480, padding_seconds=0.2):
+    """Drop leading and trailing 30 ms frames quieter than `threshold_db` below the loudest one."""
+    import numpy as np
+    frames = len(samples) // frame
+    if frames == 0:
+        return samples
+    energy = np.sqrt(np.square(samples[:frames * frame].reshape(frames, frame)).mean(axis=1))
+    peak = energy.max()
+    if peak == 0:
+        return samples[:0]
+    threshold_db = SILENCE_DB if threshold_db is None else threshold_db
+    voiced = np.flatnonzero(energy >= peak * 10 ** (threshold_db / 20))
+    padding = int(padding_seconds * SAMPLE_RATE)
+    return samples[max(0, voiced[0] * frame - padding):min(len(samples), (voiced[-1] + 1) * frame + padding)]
+
+
+def limit_length(samples, max_seconds=None, policy=None):
+    """Truncate (or, with policy "reject", refuse) audio longer than `max_seconds`."""
+    max_samples = int((max_seconds or MAX_AUDIO_SECONDS) * SAMPLE_RATE)
+    if len(samples) <= max_samples:
+        return samples
+    if (policy or OVERLONG_AUDIO) == "reject":
+        raise AudioTooLong(f"Audio is {len(samples) / SAMPLE_RATE:.0f}s long; the limit is {max_samples // SAMPLE_RATE}s")
+    return samples[:max_samples]
+
+
+def preprocess_settings():
+    """What `preprocess_audio` does to the audio beyond decoding, for keying results derived from it."""
+    return {"silence_db": SILENCE_DB, "max_seconds": MAX_AUDIO_SECONDS, "overlong": OVERLONG_AUDIO}
+
+
+def preprocess_audio(source, trim=True, max_seconds=None):
+    """Decode once to a 16 kHz float32 buffer, trim silence and cap the length, ready for the model."""
+    import numpy as np
+    with span("audio.preprocess") as attrs:
+        samples = load_audio(source)
+        if trim:
+            samples = trim_silence(samples)
+        samples = np.ascontiguousarray(limit_length(samples, max_seconds))
+        attrs["audio_seconds"] = round(len(samples) / SAMPLE_RATE, 2)
+    return samples
+
+
+def _sample_blocks(audio, block_samples):
+    import numpy as np
+    if isinstance(audio, str):
+        # Paths are decoded incrementally, so arbitrarily long files stay within one window of memory
+        limit = int(MAX_AUDIO_SECONDS * SAMPLE_RATE)
+        decoded = 0
+        for data in _pcm_reader(audio, read_size=block_samples * 2):
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+            if decoded + len(samples) > limit:
+                if OVERLONG_AUDIO == "reject":
+                    raise AudioTooLong(f"Audio is longer than the {MAX_AUDIO_SECONDS:.0f}s limit")
+                samples = samples[:limit - decoded]
+            decoded += len(samples)
+            if len(samples):
+                yield samples
+            if decoded >= limit:
+                return
+    else:
+        yield preprocess_audio(audio)
+
+
+def iter_audio_chunks(audio, window_seconds=None, search_fraction=0.2):
+    """Yield (start_seconds, float32 samples) windows of about `window_seconds` each.
+
+    `audio` is a file path (decoded incrementally, so memory stays bounded by
+    one window no matter how long the recording is), raw upload bytes, or an
+    already-decoded array. Each cut is moved to the quietest frame in the
+    last `search_fraction` of the window (a cheap energy VAD), so words are
+    rarely split across chunks.
+    """
+    import numpy as np
+    window = int((window_seconds or STREAM_WINDOW_SECONDS) * SAMPLE_RATE)
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = 0
+    for samples in _sample_blocks(audio, window):
+        buffer = np.concatenate([buffer, samples])
+        while len(buffer) >= window:
+            cut = _quietest_split(buffer[:window], int(window * (1 - search_fraction)))
+            yield offset / SAMPLE_RATE, buffer[:cut]
+            offset += cut
+            buffer = buffer[cut:]
+    if len(buffer):
+        yield offset / SAMPLE_RATE, buffer
+
+
+def transcribe_stream(audio, size=None, window_seconds=None):
+    """Transcribe a recording chunk by chunk, yielding each chunk's text as soon as it is ready.
+
+    Yields dicts with "index", "start", "end", "text" (this chunk) and
+    "transcript" (everything so far). The tail of the previous chunk is
+    passed as Whisper's initial prompt to keep the text coherent across cuts.
+    """
+    pool = get_pool()
+    parts = []
+    for index, (start, samples) in enumerate(iter_audio_chunks(audio, window_seconds)):
+        previous = " ".join(parts)[-200:] or None
+        text = pool.transcribe(samples, size=size, initial_prompt=previous)["text"].strip()
+        if text:
+            parts.append(text)
+        yield {
+            "index": index,
+            "start": start,
+            "end": start + len(samples) / SAMPLE_RATE,
+            "text": text,
+            "transcript": " ".join(parts),
+        }
+
+
+class WhisperBatcher:
+    """Dynamic micro-batching of Whisper inference across concurrent requests.
+
+    Requests queue up for at most `max_wait_ms` (or until `max_batch` are
+    waiting), then every clip that fits in one 30 s Whisper window is decoded
+    in a single batched forward pass. Longer clips fall back to a regular
+    `transcribe` call. `submit` returns a concurrent.futures.Future.
+    """
+
+    def __init__(self, size=None, max_batch=8, max_wait_ms=50, pool=None):
+        import queue
+        self.size = size or DEFAULT_MODEL_SIZE
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._pool = pool or get_pool()
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self.stats = {"batches": 0, "batched_items": 0, "long_items": 0}
+        self._thread = threading.Thread(target=self._loop, name="whisper-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, audio):
+        from concurrent.futures import Future
+        future = Future()
+        self._queue.put((audio, future))
+        return future
+
+    def _collect(self):
+        import queue
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return [item for item in batch if item is not None]
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if batch:
+                self._run(batch)
+
+    def _run(self, batch):
+        model = self._pool.get(self.size)
+        # Only openai-whisper models can be batch-decoded; other backends go one clip at a time
+        batchable = hasattr(model, "dims")
+        if batchable:
+            import whisper
+        short, mels = [], []
+        for source, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                audio = preprocess_audio(source)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            if not len(audio):
+                future.set_result("")  # nothing but silence
+                continue
+            if not batchable or len(audio) > 30 * SAMPLE_RATE:
+                self.stats["long_items"] += 1
+                try:
+                    future.set_result(self._pool.transcribe(audio, size=self.size)["text"])
+                except Exception as e:
+                    future.set_exception(e)
+                continue
+            mels.append(whisper.log_mel_spectrogram(whisper.pad_or_trim(audio),
+                                                    n_mels=model.dims.n_mels))
+            short.append(future)
+
+        if not short:
+            return
+        try:
+            import torch
+            mel_batch = torch.stack(mels).to(model.device)
+            options = whisper.DecodingOptions(fp16=model.device.type == "cuda")
+            # Same model as the pool's transcribe calls, so the same lock
+            with torch.no_grad(), self._pool.inference_lock(self.size):
+                results = whisper.decode(model, mel_batch, options)
+            self.stats["batches"] += 1
+            self.stats["batched_items"] += len(short)
+            for future, result in zip(short, results):
+                future.set_result(result.text.strip())
+        except Exception as e:
+            for future in short:
+                if not future.done():
+                    future.set_exception(e)
+
+    def stop(self):
+        self._stopped.set()
+        self._queue.put(None)
@@ -0,0 +1,92 @@
+"""Pluggable speech-to-text backends for the Whisper model pool.
+
+A backend turns a model size into a loaded model whose
+`transcribe(audio, **options)` returns a dict with at least "text", which
+is the interface `WhisperModelPool` relies on. Select one with:
+
+    WHISPER_BACKEND        openai (default) or faster (faster-whisper / CTranslate2)
+    WHISPER_COMPUTE_TYPE   openai: float32 | float16; faster: int8 (default), int8_float16, float16, float32
+    WHISPER_THREADS        CPU threads for inference (0 = library default)
+    WHISPER_DEVICE         cpu, cuda or auto (default)
+"""
+import os
+
+
+BACKENDS = ("openai", "faster")
+
+
+class OpenAIWhisperBackend:
+    """The reference openai-whisper implementation (PyTorch)."""
+
+    name = "openai"
+
+    def __init__(self, compute_type=None, threads=0, device=None):
+        self.compute_type = compute_type or "float32"
+        if self.compute_type not in ("float32", "float16"):
+            raise ValueError(f"openai-whisper supports float32 or float16, not {self.compute_type!r}; "
+                             f"use WHISPER_BACKEND=faster for int8")
+        self.threads = threads
+        self.device = None if device in (None, "auto") else device
+
+    @property
+    def options(self):
+        # Without this whisper tries fp16 and warns on every CPU call before falling back
+        return {"fp16": self.compute_type == "float16"}
+
+    def load(self, size):
+        import whisper  # heavy import, only paid the first time a model is needed
+        if self.threads:
+            import torch
+            torch.set_num_threads(self.threads)
+        return whisper.load_model(size, device=self.device)
+
+
+class _FasterWhisperModel:
+    # Adapts faster-whisper's (segments, info) generator to the openai-whisper result dict
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, initial_prompt=None, **options):
+        options.pop("fp16", None)
+        segments, info = self.model.transcribe(audio, initial_prompt=initial_prompt, **options)
+        segments = list(segments)  # decoding happens lazily while iterating
+        return {
+            "text": "".join(segment.text for segment in segments),
+            "language": info.language,
+            "segments": [{"start": s.start, "end": s.end, "text": s.text} for s in segments],
+        }
+
+
+class FasterWhisperBackend:
+    """CTranslate2 Whisper (faster-whisper), with int8-quantized weights on CPU by default."""
+
+    name = "faster"
+
+    def __init__(self, compute_type=None, threads=0, device=None):
+        self.compute_type = compute_type or "int8"
+        self.threads = threads
+        self.device = device or "auto"
+        self.options = {}
+
+    def load(self, size):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("WHISPER_BACKEND=faster needs the faster-whisper package "
+                              "(pip install faster-whisper)") from e
+        return _FasterWhisperModel(WhisperModel(size, device=self.device, compute_type=self.compute_type,
+                                                cpu_threads=self.threads))
+
+
+def make_backend(name=None, compute_type=None, threads=None, device=None):
+    """Backend from explicit arguments, falling back to the WHISPER_* environment variables."""
+    name = (name or os.getenv("WHISPER_BACKEND") or "openai").lower()
+    compute_type = compute_type or os.getenv("WHISPER_COMPUTE_TYPE") or None
+    threads = int(os.getenv("WHISPER_THREADS", "0")) if threads is None else threads
+    device = device or os.getenv("WHISPER_DEVICE") or None
+    if name == "openai":
+        return OpenAIWhisperBackend(compute_type, threads, device)
+    if name in ("faster", "faster-whisper", "ctranslate2"):
+        return FasterWhisperBackend(compute_type, threads, device)
+    raise ValueError(f"Unknown WHISPER_BACKEND {name!r}; expected one of {BACKENDS}")
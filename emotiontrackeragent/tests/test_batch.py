@@ -0,0 +1,36 @@
+import json
+
+from emotiontrackeragent import batch
+
+
+def test_empty_text_file_fails_alone(tmp_path, monkeypatch):
+    source = tmp_path / "entries"
+    source.mkdir()
+    (source / "a.txt").write_text("Had a calm walk by the river.", encoding="utf-8")
+    (source / "b.txt").write_text("", encoding="utf-8")
+    (source / "c.txt").write_text("Work was stressful today.", encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+
+    runner = batch.BatchRunner(str(output), concurrency=2)
+
+    def analyze(item, text):
+        runner._append(runner.output_path, {"id": item["id"], "text": text, "entry": {"mood": "calm"}})
+        runner._count("completed")
+
+    monkeypatch.setattr(runner, "_analyze", analyze)
+    stats = runner.run(list(batch.load_items(str(source))))
+
+    assert stats["completed"] == 2
+    assert stats["failed"] == 1
+    assert stats["transcribed"] == 0
+    with open(output, encoding="utf-8") as f:
+        assert sorted(json.loads(line)["id"] for line in f) == ["a", "c"]
+
+
+def test_invalid_reason():
+    assert batch.invalid_reason({"id": "a", "text": "hello"}) is None
+    assert batch.invalid_reason({"id": "a", "audio": "/tmp/a.wav"}) is None
+    assert batch.invalid_reason({"id": "a", "text": "  \n"}) == "empty text"
+    assert batch.invalid_reason({"id": "a", "text": None}) == "empty text"
+    assert batch.invalid_reason({"id": "a", "audio": ""}) == "empty audio path"
+    assert batch.invalid_reason({"id": "a"}) == "needs 'audio' or 'text'"
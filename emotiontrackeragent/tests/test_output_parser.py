@@ -0,0 +1,26 @@
+from emotiontrackeragent.output_parser import parse_crew_output
+
+COACH = """Thought: I now know the final answer
+Final Answer:
+1. What made the presentation feel so high-stakes?
+2. When have you handled a similar situation well?"""
+
+
+def test_reflections_fall_back_to_the_coach_task():
+    logger_json = '```json\n{"date": "2025-01-01", "mood": "anxious", "confidence": 0.8}\n```'
+    output = {"raw": logger_json, "tasks_output": [{"raw": "Mood: anxious"}, {"raw": COACH}, {"raw": logger_json}]}
+
+    entry = parse_crew_output(output)
+
+    assert entry.mood == "anxious"
+    assert [r["prompt"] for r in entry.reflections] == [
+        "What made the presentation feel so high-stakes?",
+        "When have you handled a similar situation well?",
+    ]
+
+
+def test_logger_reflections_win_over_the_coach_task():
+    logger_json = '{"mood": "sad", "confidence": 0.7, "reflections": ["What would comfort you tonight?"]}'
+    output = {"raw": logger_json, "tasks_output": [{"raw": "Mood: sad"}, {"raw": COACH}, {"raw": logger_json}]}
+
+    assert [r["prompt"] for r in parse_crew_output(output).reflections] == ["What would comfort you tonight?"]
@@ -0,0 +1,25 @@
+import random
+
+from emotiontrackeragent.preclassifier import MoodClassifier, tokenize
+
+
+def test_temperature_is_calibrated_on_held_out_entries():
+    # Labels unrelated to the words: the training entries are memorized, but nothing generalizes
+    rng = random.Random(0)
+    words = [f"word{i}" for i in range(400)]
+    texts = [" ".join(rng.sample(words, 8)) for _ in range(200)]
+    labels = [rng.choice(["anxious", "sad", "happy", "angry"]) for _ in texts]
+
+    model = MoodClassifier().fit(texts, labels)
+    in_sample, _ = model._calibrate([(model._scores(tokenize(text)), label) for text, label in zip(texts, labels)], 1)
+
+    assert model.temperature > in_sample
+    assert model.calibration["held_out"] == len(texts)
+    assert model.calibration["mean_confidence"] < 0.5
+    assert MoodClassifier.from_dict(model.to_dict()).calibration == model.calibration
+
+
+def test_untrained_model_is_not_calibrated():
+    model = MoodClassifier().fit([], [])
+    assert model.temperature == 1.0
+    assert model.calibration is None
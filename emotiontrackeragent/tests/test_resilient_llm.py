@@ -0,0 +1,39 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from emotiontrackeragent.resilient_llm import LLMUnavailable, ResilientLLM
+
+
+class HangingLLM:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def call(self, messages, **kwargs):
+        self.release.wait(5)
+        return "late"
+
+
+def test_instances_share_one_executor():
+    assert ResilientLLM(HangingLLM())._executor is ResilientLLM(HangingLLM())._executor
+
+
+def test_abandoned_attempts_are_counted_until_they_return():
+    llm = HangingLLM()
+    resilient = ResilientLLM(llm, timeout=0.05, max_retries=0, executor=ThreadPoolExecutor(max_workers=2))
+
+    with pytest.raises(LLMUnavailable):
+        resilient.call([{"role": "user", "content": "hi"}])
+    metrics = resilient.metrics()
+    assert metrics["timeouts"] == 1
+    assert metrics["abandoned"] == 1
+    assert metrics["abandoned_running"] == 1
+
+    llm.release.set()
+    deadline = time.monotonic() + 5
+    while resilient.metrics()["abandoned_running"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert resilient.metrics()["abandoned_running"] == 0
+    assert resilient.metrics()["abandoned"] == 1
@@ -0,0 +1,64 @@
+import contextvars
+import threading
+
+from emotiontrackeragent.token_budget import MeteredLLM, UsageReporter, estimate_tokens, message_tokens, track_usage
+
+MESSAGES = [{"role": "user", "content": "I felt calm after the walk."}]
+
+
+class ProviderLLM:
+    """Answers "calm"; like litellm's logging, it fires a success callback from another thread after returning."""
+
+    def __init__(self, usage=None, late_usage=None, copy_context=False):
+        self.usage = usage
+        self.late_usage = late_usage
+        self.copy_context = copy_context
+        self.returned = threading.Event()
+        self.late = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        if self.usage is not None:
+            UsageReporter().log_success_event(response_obj={"usage": self.usage})
+        if self.late_usage is not None:
+            def fire():
+                self.returned.wait(5)
+                UsageReporter().log_success_event(response_obj={"usage": self.late_usage})
+
+            target = contextvars.copy_context().run if self.copy_context else (lambda fn: fn())
+            thread = threading.Thread(target=target, args=(fire,))
+            thread.start()
+            self.late.append(thread)
+        return "calm"
+
+    def finish_late_callbacks(self):
+        self.returned.set()
+        for thread in self.late:
+            thread.join(5)
+
+
+def metered_call(provider):
+    with track_usage() as usage:
+        MeteredLLM(provider, "mood_agent").call(MESSAGES)
+    provider.finish_late_callbacks()
+    counts = usage.by_agent["mood_agent"]
+    return counts["prompt_tokens"], counts["completion_tokens"]
+
+
+def estimated():
+    return message_tokens(MESSAGES), estimate_tokens("calm")
+
+
+def test_reported_usage_is_used():
+    assert metered_call(ProviderLLM(usage={"prompt_tokens": 123, "completion_tokens": 7})) == (123, 7)
+
+
+def test_late_callback_on_another_thread_is_ignored():
+    late = {"prompt_tokens": 999, "completion_tokens": 999}
+    for copy_context in (False, True):
+        provider = ProviderLLM(usage={"prompt_tokens": 123, "completion_tokens": 7}, late_usage=late,
+                               copy_context=copy_context)
+        assert metered_call(provider) == (123, 7)
+        # Nothing reported in the call itself: estimates, never the late numbers or a previous call's
+        provider = ProviderLLM(late_usage=late, copy_context=copy_context)
+        assert metered_call(provider) == estimated()
+        assert metered_call(ProviderLLM()) == estimated()